@@ -1,19 +1,40 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, ValidationError
-import uuid
-from google.cloud.firestore import SERVER_TIMESTAMP
+from typing import List, Optional
+import asyncio
 from google.api_core.exceptions import GoogleAPICallError
 
 from app.core.dependencies import get_current_user, get_user_document_from_firestore
-from app.core.db import db
-from app.genkit_flows.ats_scoring import atsScoring, AtsResult
+from app.core.limiter import model_token_budget
+from app.core.repositories import analysis_repository, opportunity_repository
+from app.core.job_registry import job_registry
+from app.genkit_flows.ats_scoring import atsScoring, AtsResult, score_resume_against_jobs
 
 router = APIRouter()
 
+# Upper bound on the number of jobs in one batch request
+MAX_BATCH_JOBS = 30
+
 class AtsScoreRequest(BaseModel):
-    job_description: str
+    job_description: Optional[str] = None
+    job_description_id: Optional[str] = None
+
+class AtsBatchScoreRequest(BaseModel):
+    job_descriptions: List[str] = []
+    opportunity_ids: List[str] = []
+
+class AtsBatchResultItem(BaseModel):
+    rank: Optional[int] = None
+    opportunityId: Optional[str] = None
+    jobIndex: Optional[int] = None
+    jobDescriptionId: Optional[str] = None
+    analysisId: Optional[str] = None
+    result: Optional[AtsResult] = None
+    error: Optional[str] = None
 
-@router.post("/ats-score/{document_id}")
+# Estimated model tokens: the stored resume and prompts, plus the job
+# description(s) in the body, each sent to several extraction calls
+@router.post("/ats-score/{document_id}", dependencies=[Depends(model_token_budget.dependency(prompt_tokens=8000, input_multiplier=4))])
 async def get_ats_score(
     document_id: str,
     request: AtsScoreRequest,
@@ -29,29 +50,150 @@ async def get_ats_score(
         if not resume_text:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The selected document has no text content to analyze.")
 
+        # Resolve the job description to its canonical registry entry; a
+        # submitted description is always scored as submitted
+        if request.job_description_id:
+            job_entry = await job_registry.get(user['uid'], request.job_description_id)
+            if not job_entry:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job description not found.")
+            job_description = job_entry["text"]
+        elif request.job_description:
+            job_entry = await job_registry.resolve(user['uid'], request.job_description)
+            job_description = request.job_description
+        else:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide a job_description or a job_description_id.")
+
         # Call the main atsScoring Genkit flow
         analysis_result: AtsResult = await atsScoring.run(
             resumeText=resume_text,
-            jobDescription=request.job_description
+            jobDescription=job_description,
+            jobEntry=job_entry
         )
 
         # Save the analysis result for tracking
-        doc_ref = db.collection("users").document(user['uid']).collection("documents").document(document_id)
-        analysis_id = str(uuid.uuid4())
-        analysis_ref = doc_ref.collection("analyses").document(analysis_id)
-        analysis_data = {
-            "id": analysis_id,
-            "createdAt": SERVER_TIMESTAMP,
-            "jobDescription": request.job_description,
+        await analysis_repository.create(user['uid'], document_id, {
+            "jobDescriptionId": job_entry["id"],
             "result": analysis_result.model_dump() # Save the Pydantic model as a dict
-        }
-        await analysis_ref.set(analysis_data)
+        })
         
         return analysis_result
     
+    except HTTPException:
+        raise
     except ValidationError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.errors())
     except GoogleAPICallError as e:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Google Cloud API error: {e}")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred during ATS analysis: {str(e)}")
+
+async def _resolve_job_entry(uid: str, job: dict) -> None:
+    """
+    Attaches the user's canonical registry entry to a batch job, or an error
+    if it cannot be resolved. Jobs with their own text keep it for scoring.
+    """
+    try:
+        if job.get("jobDescriptionId"):
+            entry = await job_registry.get(uid, job["jobDescriptionId"])
+        else:
+            entry = await job_registry.resolve(uid, job["jobDescription"])
+    except GoogleAPICallError as e:
+        job["error"] = f"Google Cloud API error: {e}"
+        return
+    if not entry:
+        job["error"] = "Job description not found."
+        return
+    job["jobDescriptionId"] = entry["id"]
+    job["jobDescription"] = job.get("jobDescription") or entry["text"]
+    job["jobEntry"] = entry
+
+async def _collect_batch_jobs(uid: str, request: AtsBatchScoreRequest) -> List[dict]:
+    """
+    Resolves the batch request into a list of jobs, each mapped to its
+    canonical job description entry. Opportunities are read in a single
+    `get_all` round-trip; those without job description text are returned
+    with an error instead of a description.
+    """
+    jobs = [{"jobIndex": i, "jobDescription": jd} for i, jd in enumerate(request.job_descriptions)]
+    if request.opportunity_ids:
+        opportunities = await opportunity_repository.get_many(uid, request.opportunity_ids)
+        for opportunity_id, opportunity in opportunities.items():
+            job_description = (opportunity or {}).get("jobDescription") or (opportunity or {}).get("description")
+            job = {"opportunityId": opportunity_id, "jobDescription": job_description}
+            if opportunity and opportunity.get("jobDescriptionId"):
+                job["jobDescriptionId"] = opportunity["jobDescriptionId"]
+            elif not opportunity:
+                job["error"] = "Opportunity not found."
+            elif not job_description:
+                job["error"] = "Opportunity has no job description text."
+            jobs.append(job)
+    await asyncio.gather(*(_resolve_job_entry(uid, job) for job in jobs if not job.get("error")))
+    return jobs
+
+@router.post("/ats-score/{document_id}/batch", dependencies=[Depends(model_token_budget.dependency(prompt_tokens=8000, input_multiplier=8))])
+async def get_batch_ats_scores(
+    document_id: str,
+    request: AtsBatchScoreRequest,
+    document: dict = Depends(get_user_document_from_firestore),
+    user: dict = Depends(get_current_user)
+) -> List[AtsBatchResultItem]:
+    """
+    Scores one resume document against many job descriptions and/or saved
+    opportunities. The resume is analyzed once, all analyses are saved in a
+    single Firestore batch, and the results are returned ranked by score.
+    """
+    try:
+        resume_text = document.get("content") or document.get("extractedText")
+        if not resume_text:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The selected document has no text content to analyze.")
+
+        job_count = len(request.job_descriptions) + len(request.opportunity_ids)
+        if job_count == 0 or job_count > MAX_BATCH_JOBS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Provide between 1 and {MAX_BATCH_JOBS} job descriptions or opportunity IDs.")
+
+        jobs = await _collect_batch_jobs(user['uid'], request)
+        scorable = [job for job in jobs if not job.get("error")]
+
+        # Extract the resume once and fan out the per-job analysis
+        results = await score_resume_against_jobs(
+            resume_text,
+            [job["jobDescription"] for job in scorable],
+            jobEntries=[job["jobEntry"] for job in scorable],
+        ) if scorable else []
+
+        # Save every successful analysis in a single batched write
+        saved = []
+        for job, result in zip(scorable, results):
+            if isinstance(result, Exception):
+                job["error"] = f"An unexpected error occurred during ATS analysis: {str(result)}"
+                continue
+            job["result"] = result
+            saved.append(job)
+        analyses = []
+        for job in saved:
+            analysis_data = {
+                "jobDescriptionId": job["jobDescriptionId"],
+                "result": job["result"].model_dump()
+            }
+            if job.get("opportunityId"):
+                analysis_data["opportunityId"] = job["opportunityId"]
+            analyses.append(analysis_data)
+        analysis_ids = await analysis_repository.create_many(user['uid'], document_id, analyses)
+        for job, analysis_id in zip(saved, analysis_ids):
+            job["analysisId"] = analysis_id
+
+        # Rank successful results by overall score, failures last
+        scored = sorted((job for job in jobs if job.get("result")), key=lambda job: job["result"].overallScore, reverse=True)
+        failed = [job for job in jobs if not job.get("result")]
+        ranked = [AtsBatchResultItem(rank=rank, **{k: v for k, v in job.items() if k not in ("jobDescription", "jobEntry")}) for rank, job in enumerate(scored, start=1)]
+        ranked += [AtsBatchResultItem(**{k: v for k, v in job.items() if k not in ("jobDescription", "jobEntry")}) for job in failed]
+        return ranked
+
+    except HTTPException:
+        raise
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.errors())
+    except GoogleAPICallError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Google Cloud API error: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An unexpected error occurred during batch ATS analysis: {str(e)}")
@@ -1,23 +1,22 @@
-import uuid
 import shutil
 from pathlib import Path
 import os
 import asyncio
-from typing import List, Literal
+from functools import lru_cache
+from typing import List, Literal, get_args
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
 from starlette.responses import StreamingResponse
-from google.cloud.firestore import SERVER_TIMESTAMP
 from google.api_core.exceptions import GoogleAPICallError, NotFound
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
 from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML, CSS
 import io
-import pdfplumber
-import docx
 
 from app.core.dependencies import get_current_user, get_user_document_from_firestore
-from app.core.db import db
-from app.genkit_flows.extract_resume_entities import extract_resume_entities
+from app.core.limiter import model_token_budget
+from app.core.repositories import document_repository, profile_repository, user_repository
+from app.core.streaming import SSE_HEADERS, SSE_MEDIA_TYPE, sse_comment, sse_event
+from app.genkit_flows.cover_letter_generator import stream_tailored_cover_letter
+from app.genkit_flows.document_generator import stream_tailored_resume
 
 router = APIRouter()
 
@@ -26,11 +25,26 @@ env = Environment(loader=FileSystemLoader(str(template_root_dir)))
 
 Theme = Literal["professional", "modern", "creative"]
 
+class CoverLetterStreamRequest(BaseModel):
+    profile_variation_id: str
+    job_analysis: dict
+
+class TailoredResumeStreamRequest(BaseModel):
+    profile_variation_id: str
+    comparison_analysis: dict
+
+# WeasyPrint, pdfplumber and python-docx are slow to import, so they are
+# imported on first use rather than with the router
+
 def parse_pdf(file_path: str) -> str:
+    import pdfplumber
+
     with pdfplumber.open(file_path) as pdf:
         return "".join(page.extract_text() for page in pdf.pages if page.extract_text())
 
 def parse_docx(file_path: str) -> str:
+    import docx
+
     doc = docx.Document(file_path)
     return "\\n".join(para.text for para in doc.paragraphs)
 
@@ -47,6 +61,33 @@ async def upload_and_parse_files(
     # This is a placeholder for the actual implementation
     pass
 
+@lru_cache(maxsize=None)
+def _stylesheet(theme: str) -> "CSS":
+    """Parses a theme's stylesheet once per process."""
+    from weasyprint import CSS
+
+    return CSS(filename=str(template_root_dir / theme / "style.css"))
+
+def render_pdf(content: str, theme: str) -> bytes:
+    """
+    Renders document content to PDF with a theme's template and stylesheet.
+    CPU-bound, so async callers should run it in a worker thread.
+    """
+    from weasyprint import HTML
+
+    theme_dir = template_root_dir / theme
+    template = env.get_template(f"{theme}/template.html")
+    html_content = template.render(content=content)
+    return HTML(string=html_content, base_url=str(theme_dir)).write_pdf(stylesheets=[_stylesheet(theme)])
+
+def warm_pdf_renderer() -> None:
+    """
+    Compiles every theme's template, parses its stylesheet and renders a
+    throwaway PDF, so fonts are loaded before the first real PDF request.
+    """
+    for theme in get_args(Theme):
+        render_pdf("", theme)
+
 @router.get("/{document_id}/download-pdf")
 async def download_document_as_pdf(
     document_id: str,
@@ -63,10 +104,8 @@ async def download_document_as_pdf(
         if not html_template_path.exists() or not css_path.exists():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Theme '{theme}' not found.")
 
-        template = env.get_template(f"{theme}/template.html")
-        html_content = template.render(content=content)
-        stylesheet = CSS(filename=str(css_path))
-        pdf_bytes = HTML(string=html_content, base_url=str(theme_dir)).write_pdf(stylesheets=[stylesheet])
+        # Render off the event loop so other requests are not blocked
+        pdf_bytes = await asyncio.to_thread(render_pdf, content, theme)
         
         response = StreamingResponse(io.BytesIO(pdf_bytes), media_type="application/pdf")
         original_filename = document.get("originalFilename", "document").split('.')[0]
@@ -74,7 +113,84 @@ async def download_document_as_pdf(
         
         return response
 
+    except HTTPException:
+        raise
     except (FileNotFoundError, GoogleAPICallError) as e:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Error accessing template files or cloud storage: {e}")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An error occurred while generating the PDF: {e}")
+
+async def _get_profile_variation(uid: str, profile_variation_id: str) -> dict:
+    """Fetches the specified user profile variation or raises a 404."""
+    profile = await profile_repository.get_variation(uid, profile_variation_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile variation not found.")
+    return profile
+
+def _stream_generated_document(uid: str, doc_type: str, profile_variation_id: str, chunks) -> StreamingResponse:
+    """
+    Relays generated text chunks as SSE `chunk` events. Once the stream
+    completes, the full text is saved to the user's documents collection and
+    a final `done` event carries the new document's ID.
+    """
+    async def event_stream():
+        # Flush the response headers right away to keep time-to-first-byte low
+        yield sse_comment("stream-open")
+        parts = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield sse_event({"text": chunk}, event="chunk")
+
+            document = await document_repository.create(uid, {
+                "type": doc_type,
+                "content": "".join(parts),
+                "originalFilename": f"{doc_type}.txt",
+                "generatedFrom": {"profileVariationId": profile_variation_id},
+            })
+            yield sse_event({"id": document["id"], "type": doc_type}, event="done")
+        except Exception as e:
+            yield sse_event({"detail": f"An error occurred while generating the document: {e}"}, event="error")
+        finally:
+            # Stops the model stream and frees its slot when the client disconnects
+            await chunks.aclose()
+
+    return StreamingResponse(event_stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+@router.post("/cover-letter/stream", dependencies=[Depends(model_token_budget.dependency(prompt_tokens=4000))])
+async def stream_cover_letter(
+    request: CoverLetterStreamRequest,
+    user: dict = Depends(get_current_user),
+):
+    """
+    Streams a tailored cover letter as Server-Sent Events while it is being
+    generated, then saves it as a new document.
+    """
+    uid = user["uid"]
+    try:
+        base_profile_data = await _get_profile_variation(uid, request.profile_variation_id)
+        user_doc = await user_repository.get(uid, field_paths=["voice_profile"])
+        voice_profile = (user_doc or {}).get("voice_profile")
+    except GoogleAPICallError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Google Cloud API error: {e}")
+
+    chunks = stream_tailored_cover_letter(base_profile_data, request.job_analysis, voice_profile)
+    return _stream_generated_document(uid, "cover_letter", request.profile_variation_id, chunks)
+
+@router.post("/tailored-resume/stream", dependencies=[Depends(model_token_budget.dependency(prompt_tokens=4000))])
+async def stream_tailored_resume_document(
+    request: TailoredResumeStreamRequest,
+    user: dict = Depends(get_current_user),
+):
+    """
+    Streams a tailored resume as Server-Sent Events while it is being
+    generated, then saves it as a new document.
+    """
+    uid = user["uid"]
+    try:
+        base_profile_data = await _get_profile_variation(uid, request.profile_variation_id)
+    except GoogleAPICallError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Google Cloud API error: {e}")
+
+    chunks = stream_tailored_resume(base_profile_data, request.comparison_analysis)
+    return _stream_generated_document(uid, "resume", request.profile_variation_id, chunks)
@@ -2,7 +2,6 @@ from fastapi import APIRouter, Depends, HTTPException, Request, Header, status
 from starlette.responses import RedirectResponse
 from google_auth_oauthlib.flow import Flow
 from app.core.dependencies import get_current_user
-from app.core.db import db
 from app.core.secrets import save_user_secret, delete_user_secret
 from app.genkit_flows.email_scanner import scan_user_emails
 from app.core.limiter import strict_limiter
@@ -1,77 +1,85 @@
 from fastapi import APIRouter, Depends, HTTPException, Body, Request
 from app.core.dependencies import get_current_user
-from app.core.db import db
-from app.core.limiter import limiter
-from app.genkit_flows.job_analyzer import analyze_job_description
+from app.core.repositories import document_repository
+from app.core.limiter import limiter, model_token_budget
+from app.core.job_registry import job_registry
+from app.core.json_stream import loads_tolerant
+from app.genkit_flows.job_analyzer import analyze_job_description, PROMPT_VERSION as JOB_ANALYSIS_VERSION
 from app.genkit_flows.resume_analyzer import compare_resume_to_job
 from pydantic import BaseModel
-import json
+from typing import Optional
 
 router = APIRouter()
 
 class ResumeComparisonRequest(BaseModel):
     document_id: str
-    job_description_text: str
+    job_description_text: Optional[str] = None
+    job_description_id: Optional[str] = None
 
-def get_user_uid_for_limiter(request: Request) -> str:
+async def _analyze_job_entry(job_entry: dict, job_description: str) -> dict:
     """
-    Custom key function for slowapi to use the authenticated user's UID.
-    This assumes the get_current_user dependency has already been resolved
-    and the uid is available in the request state, which is a common pattern.
-    We'll ensure our dependency does this.
+    Returns the analysis of a canonical job description, running the Genkit
+    flow on the submitted text only the first time the user submits the job
+    (or a near duplicate of it).
     """
-    # This is a bit of a workaround to get the uid into the key function.
-    # A more robust solution might involve a custom dependency that sets request.state.user
-    # For now, we assume the dependency adds it.
-    # Let's adjust the main dependency to do this.
-    return request.state.user_uid
+    analysis_result_str = await job_registry.get_or_compute(
+        job_entry,
+        "analysis",
+        JOB_ANALYSIS_VERSION,
+        lambda: analyze_job_description.run(job_description),
+    )
+    return loads_tolerant(analysis_result_str)
 
-
-@router.post("/analyze")
+@router.post("/analyze", dependencies=[Depends(model_token_budget.dependency(prompt_tokens=500))])
 async def analyze_job(
-    uid: str = Depends(get_current_user),
+    user: dict = Depends(get_current_user),
     job_description: str = Body(..., embed=True),
 ):
     """
-    Analyzes a job description using a Genkit flow.
+    Analyzes a job description using a Genkit flow. The description is
+    registered in the user's job description store, and the response
+    includes its `jobDescriptionId` for later requests.
     """
     try:
-        # Call the Genkit flow to analyze the job description
-        analysis_result_str = await analyze_job_description.run(job_description)
-
-        # Convert the string result to a JSON object
-        analysis_result = json.loads(analysis_result_str)
+        # Resolve the canonical job description and reuse its stored analysis
+        job_entry = await job_registry.resolve(user["uid"], job_description)
+        analysis_result = await _analyze_job_entry(job_entry, job_description)
         
-        return analysis_result
+        return {**analysis_result, "jobDescriptionId": job_entry["id"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
 
-@router.post("/compare-resume")
+@router.post("/compare-resume", dependencies=[Depends(model_token_budget.dependency(prompt_tokens=3000, input_multiplier=2))])
 @limiter.limit("5/minute")
 async def compare_resume(
-    request: Request, # Add Request to access its state
+    request: Request,
     body: ResumeComparisonRequest,
-    uid: str = Depends(get_current_user),
+    user: dict = Depends(get_current_user),
 ):
     """
     Orchestrates the analysis of a job description and comparison with a user's resume.
     """
-    # Manually store uid in request state for the limiter to access
-    request.state.user_uid = uid
-    
     try:
-        # Step A: Analyze the job description
-        job_analysis_str = await analyze_job_description.run(body.job_description_text)
-        job_analysis_data = json.loads(job_analysis_str)
+        # Step A: Analyze the canonical job description
+        if body.job_description_id:
+            job_entry = await job_registry.get(user["uid"], body.job_description_id)
+            if not job_entry:
+                raise HTTPException(status_code=404, detail="Job description not found")
+            job_description = job_entry["text"]
+        elif body.job_description_text:
+            job_entry = await job_registry.resolve(user["uid"], body.job_description_text)
+            job_description = body.job_description_text
+        else:
+            raise HTTPException(status_code=400, detail="Provide job_description_text or job_description_id.")
+        job_analysis_data = await _analyze_job_entry(job_entry, job_description)
 
         # Step B: Fetch the user's resume text from Firestore
-        doc_ref = db.collection("users").document(uid).collection("documents").document(body.document_id)
-        doc = doc_ref.get()
-        if not doc.exists:
+        document = await document_repository.get(user["uid"], body.document_id, field_paths=["extractedText"])
+        if document is None:
             raise HTTPException(status_code=404, detail="Resume document not found")
         
-        resume_text = doc.to_dict().get("extractedText")
+        resume_text = document.get("extractedText")
         if not resume_text:
             raise HTTPException(status_code=400, detail="Resume has no extracted text.")
 
@@ -80,8 +88,10 @@ async def compare_resume(
             resume_text=resume_text,
             job_analysis_data=job_analysis_data
         )
-        comparison_result = json.loads(comparison_result_str)
+        comparison_result = loads_tolerant(comparison_result_str)
 
         return comparison_result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred during comparison: {e}")
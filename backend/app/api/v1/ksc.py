@@ -1,21 +1,71 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from starlette.responses import StreamingResponse
 from pydantic import BaseModel, ValidationError
 from typing import List
-import uuid
+import asyncio
+import os
 from google.cloud.firestore import SERVER_TIMESTAMP
 from google.api_core.exceptions import GoogleAPICallError, NotFound
 
 from app.core.dependencies import get_current_user
-from app.core.db import db
-from app.genkit_flows.ksc_generator import generateKscResponse, STAR_Response
+from app.core.limiter import model_token_budget
+from app.core.repositories import document_repository, profile_repository
+from app.core.streaming import NDJSON_MEDIA_TYPE, ndjson_line
+from app.genkit_flows.ksc_generator import generateKscResponse, stream_ksc_response, STAR_Response
 
 router = APIRouter()
 
+# Maximum number of STAR responses generated in parallel for a single request
+KSC_MAX_CONCURRENCY = int(os.getenv("KSC_MAX_CONCURRENCY", "4"))
+
 class KscGenerateRequest(BaseModel):
     profile_variation_id: str
     ksc_statements: List[str]
 
-@router.post("/generate")
+async def _get_profile_variation(uid: str, profile_variation_id: str) -> dict:
+    """Fetches the specified user profile variation or raises a 404."""
+    profile = await profile_repository.get_variation(uid, profile_variation_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile variation not found.")
+    return profile
+
+async def _generate_star_response(semaphore: asyncio.Semaphore, user_profile_data: dict, statement: str) -> dict:
+    """Calls the Genkit flow for a single statement, bounded by the semaphore."""
+    async with semaphore:
+        star_response: STAR_Response = await generateKscResponse.run(
+            user_profile_data=user_profile_data,
+            ksc_statement=statement
+        )
+    return {"ksc": statement, "response": star_response.model_dump()}
+
+def _format_ksc_text(generated_responses: List[dict]) -> str:
+    """Formats the generated responses into a clean text document."""
+    formatted_text = ""
+    for item in generated_responses:
+        statement = item['ksc']
+        response = item['response']
+        formatted_text += f"**Key Selection Criterion:**\n{statement}\n\n"
+        formatted_text += f"**Situation:**\n{response['situation']}\n\n"
+        formatted_text += f"**Task:**\n{response['task']}\n\n"
+        formatted_text += f"**Action:**\n{response['action']}\n\n"
+        formatted_text += f"**Result:**\n{response['result']}\n\n"
+        formatted_text += "---\n\n"
+    return formatted_text
+
+async def _save_ksc_document(uid: str, request: KscGenerateRequest, generated_responses: List[dict]) -> dict:
+    """Saves the compiled text as a new document in Firestore and returns its record."""
+    return await document_repository.create(uid, {
+        "type": "ksc",
+        "content": _format_ksc_text(generated_responses),
+        "originalFilename": "ksc_response.txt",
+        "generatedFrom": {
+            "profileVariationId": request.profile_variation_id,
+            "kscStatements": request.ksc_statements
+        }
+    })
+
+# Estimated model tokens: the profile variation is sent once per criterion
+@router.post("/generate", dependencies=[Depends(model_token_budget.dependency(prompt_tokens=3000, input_multiplier=10))])
 async def generate_ksc_responses(
     request: KscGenerateRequest,
     user: dict = Depends(get_current_user)
@@ -28,55 +78,20 @@ async def generate_ksc_responses(
     try:
         uid = user["uid"]
         # 1. Fetch the specified user profile variation
-        profile_ref = db.collection("users").document(uid).collection("profiles").document(request.profile_variation_id)
-        profile_doc = await profile_ref.get()
-        if not profile_doc.exists:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile variation not found.")
-        user_profile_data = profile_doc.to_dict()
-
-        # 2. Loop through KSC statements and generate responses
-        generated_responses = []
-        for statement in request.ksc_statements:
-            # Call the Genkit flow for each statement
-            star_response: STAR_Response = await generateKscResponse.run(
-                user_profile_data=user_profile_data,
-                ksc_statement=statement
-            )
-            generated_responses.append({"ksc": statement, "response": star_response.model_dump()})
-
-        # 3. Format the generated responses into a clean text document
-        formatted_text = ""
-        for item in generated_responses:
-            statement = item['ksc']
-            response = item['response']
-            formatted_text += f"**Key Selection Criterion:**\n{statement}\n\n"
-            formatted_text += f"**Situation:**\n{response['situation']}\n\n"
-            formatted_text += f"**Task:**\n{response['task']}\n\n"
-            formatted_text += f"**Action:**\n{response['action']}\n\n"
-            formatted_text += f"**Result:**\n{response['result']}\n\n"
-            formatted_text += "---\n\n"
-
-        # 4. Save the compiled text as a new document in Firestore
-        doc_id = str(uuid.uuid4())
-        doc_ref = db.collection("users").document(uid).collection("documents").document(doc_id)
-        
-        new_doc_data = {
-            "id": doc_id,
-            "type": "ksc",
-            "content": formatted_text,
-            "createdAt": SERVER_TIMESTAMP,
-            "originalFilename": "ksc_response.txt",
-            "generatedFrom": {
-                "profileVariationId": request.profile_variation_id,
-                "kscStatements": request.ksc_statements
-            }
-        }
-        
-        await doc_ref.set(new_doc_data)
+        user_profile_data = await _get_profile_variation(uid, request.profile_variation_id)
+
+        # 2. Generate the responses in parallel; gather keeps the criterion order
+        semaphore = asyncio.Semaphore(KSC_MAX_CONCURRENCY)
+        generated_responses = await asyncio.gather(*(
+            _generate_star_response(semaphore, user_profile_data, statement)
+            for statement in request.ksc_statements
+        ))
 
-        # 5. Return the newly created document record
-        return new_doc_data
+        # 3. Save the compiled document and return the newly created record
+        return await _save_ksc_document(uid, request, generated_responses)
 
+    except HTTPException:
+        raise
     except ValidationError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.errors())
     except NotFound:
@@ -85,3 +100,65 @@ async def generate_ksc_responses(
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Google Cloud API error: {e}")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An error occurred while generating KSC responses: {str(e)}")
+
+@router.post("/generate/stream", dependencies=[Depends(model_token_budget.dependency(prompt_tokens=3000, input_multiplier=10))])
+async def stream_ksc_responses(
+    request: KscGenerateRequest,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Streaming variant of `/generate`. Emits NDJSON "criterion_partial"
+    records with the STAR fields completed so far, one "criterion" record
+    per criterion once its STAR response is complete, then the saved
+    Firestore document record. The saved document keeps the original
+    criterion order.
+    """
+    uid = user["uid"]
+    try:
+        user_profile_data = await _get_profile_variation(uid, request.profile_variation_id)
+    except NotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile variation not found.")
+    except GoogleAPICallError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Google Cloud API error: {e}")
+
+    async def event_stream():
+        semaphore = asyncio.Semaphore(KSC_MAX_CONCURRENCY)
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def generate(index: int, statement: str):
+            try:
+                async with semaphore:
+                    # Forward each partial response; the last one is the complete response
+                    previous = None
+                    async for star_response in stream_ksc_response(user_profile_data, statement):
+                        if previous is not None:
+                            await events.put(("criterion_partial", index, {"ksc": statement, "response": previous.model_dump(exclude_none=True)}))
+                        previous = star_response
+                await events.put(("criterion", index, {"ksc": statement, "response": previous.model_dump()}))
+            except Exception as e:
+                await events.put(("error", index, e))
+
+        tasks = [asyncio.create_task(generate(i, s)) for i, s in enumerate(request.ksc_statements)]
+        generated_responses = [None] * len(tasks)
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event, index, item = await events.get()
+                if event == "error":
+                    raise item
+                if event == "criterion":
+                    generated_responses[index] = item
+                    remaining -= 1
+                yield ndjson_line({"event": event, "index": index, **item})
+
+            new_doc_data = await _save_ksc_document(uid, request, generated_responses)
+            document = {k: v for k, v in new_doc_data.items() if v is not SERVER_TIMESTAMP}
+            yield ndjson_line({"event": "document", "document": document})
+        except Exception as e:
+            yield ndjson_line({"event": "error", "detail": f"An error occurred while generating KSC responses: {str(e)}"})
+        finally:
+            # Also runs when the client disconnects and the stream is closed early
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(event_stream(), media_type=NDJSON_MEDIA_TYPE)
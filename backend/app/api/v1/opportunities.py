@@ -1,27 +1,78 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from starlette.responses import StreamingResponse
+from google.api_core.exceptions import GoogleAPICallError
+from typing import List, Optional
+import os
+
 from app.core.dependencies import get_current_user
-from app.core.db import db
+from app.core.repositories import opportunity_repository
+from app.core.streaming import NDJSON_MEDIA_TYPE, ndjson_line
 
 router = APIRouter()
 
+# --- Configuration ---
+OPPORTUNITIES_PAGE_SIZE = int(os.getenv("OPPORTUNITIES_PAGE_SIZE", "50"))
+OPPORTUNITIES_MAX_PAGE_SIZE = int(os.getenv("OPPORTUNITIES_MAX_PAGE_SIZE", "200"))
+# Documents read per Firestore query while exporting
+OPPORTUNITIES_EXPORT_PAGE_SIZE = int(os.getenv("OPPORTUNITIES_EXPORT_PAGE_SIZE", "500"))
+
+def _fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parses the comma-separated `fields` projection parameter."""
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()] or None
+
 @router.get("/")
-async def list_opportunities(uid: str = Depends(get_current_user)):
+async def list_opportunities(
+    user: dict = Depends(get_current_user),
+    limit: int = Query(OPPORTUNITIES_PAGE_SIZE, ge=1, le=OPPORTUNITIES_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    company: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. for list views"),
+):
     """
-    Lists all job opportunities found for the authenticated user.
+    Lists the job opportunities found for the authenticated user, newest
+    first, one page at a time. Pass the returned `nextCursor` to get the next
+    page; it is null on the last page.
     """
     try:
-        opportunities_ref = db.collection('opportunities')
-        # Create a query against the collection
-        query = opportunities_ref.where('user_id', '==', uid).order_by('found_at', direction='DESCENDING')
-        
-        docs = query.stream()
-        
-        opportunities = []
-        for doc in docs:
-            opportunity_data = doc.to_dict()
-            opportunity_data['id'] = doc.id
-            opportunities.append(opportunity_data)
-            
-        return opportunities
+        items, next_cursor = await opportunity_repository.page(
+            user["uid"], limit, cursor, status=status_filter, company=company, fields=_fields(fields)
+        )
+        return {"items": items, "nextCursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except GoogleAPICallError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Google Cloud API error: {e}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An error occurred: {e}")
+
+@router.get("/export")
+async def export_opportunities(
+    user: dict = Depends(get_current_user),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    company: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """
+    Streams every matching opportunity as NDJSON, one record per line, with
+    the same filters and projection as the listing. Records are read from
+    Firestore page by page, so memory use does not grow with the export.
+    """
+    opportunities = opportunity_repository.stream(
+        user["uid"], status=status_filter, company=company, fields=_fields(fields), page_size=OPPORTUNITIES_EXPORT_PAGE_SIZE
+    )
+
+    async def export_stream():
+        try:
+            async for opportunity in opportunities:
+                yield ndjson_line(opportunity)
+        except Exception as e:
+            yield ndjson_line({"event": "error", "detail": f"An error occurred while exporting opportunities: {e}"})
+
+    return StreamingResponse(
+        export_stream(),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": "attachment; filename=opportunities.ndjson"},
+    )
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.core.dependencies import get_current_user
-from app.core.db import db
+from app.core.limiter import model_token_budget
+from app.core.repositories import user_repository
 from app.models.profile import ProfileUpdate, ProfileVariationCreate
 from app.genkit_flows.voice_profiler import generateVoiceProfile
 import math
@@ -9,12 +10,14 @@ router = APIRouter()
 
 # ... (existing GET and PUT endpoints for profile) ...
 
-@router.post("/generate-voice-profile")
-async def generate_and_save_voice_profile(uid: str = Depends(get_current_user)):
+# Estimated model tokens: excerpts of every uploaded document are summarized
+@router.post("/generate-voice-profile", dependencies=[Depends(model_token_budget.dependency(prompt_tokens=20000))])
+async def generate_and_save_voice_profile(user: dict = Depends(get_current_user)):
     """
     Analyzes a user's documents to generate a voice profile and saves it
     to their main profile document in Firestore.
     """
+    uid = user["uid"]
     try:
         # 1. Call the existing Genkit flow, passing in the user's UID
         voice_profile_data = await generateVoiceProfile.run(uid)
@@ -23,10 +26,9 @@ async def generate_and_save_voice_profile(uid: str = Depends(get_current_user)):
             raise HTTPException(status_code=404, detail="Could not generate voice profile. Ensure you have uploaded at least one resume or document.")
 
         # 2. Save the resulting JSON object to the user's profile
-        user_doc_ref = db.collection("users").document(uid)
-        user_doc_ref.set({
+        await user_repository.merge(uid, {
             "voice_profile": voice_profile_data.dict()  # Use .dict() if it's a Pydantic model
-        }, merge=True)
+        })
 
         # 3. Return the newly generated voice_profile data
         return voice_profile_data
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from app.core.dependencies import get_current_user
-from app.core.db import db
+from app.core.repositories import user_repository
 
 router = APIRouter()
 
@@ -12,20 +12,18 @@ class ThemePreference(BaseModel):
 @router.put("/theme")
 async def save_theme_preference(
     theme_data: ThemePreference,
-    uid: str = Depends(get_current_user),
+    user: dict = Depends(get_current_user),
 ):
     """
     Saves the user's preferred PDF theme to their profile.
     """
     try:
-        user_ref = db.collection("users").document(uid)
-        
-        # Use set with merge=True to create or update the preferences map
-        user_ref.set({
+        # Merge to create or update the preferences map
+        await user_repository.merge(user["uid"], {
             "preferences": {
                 "themeId": theme_data.theme_id
             }
-        }, merge=True)
+        })
         
         return {"status": "success", "message": f"Theme preference set to '{theme_data.theme_id}'."}
     except Exception as e:
@@ -1,3 +1,10 @@
 from google.cloud import firestore
 
-db = firestore.Client()
+from app.core.lazy import LazyClient
+
+# Built on first use or during the startup warm-up, not at import time.
+# `db` serves the flows and caches that run in worker threads; request
+# handlers go through the async repositories in app.core.repositories, which
+# share the single `async_db` client (and its gRPC channel) per process.
+db = LazyClient(firestore.Client)
+async_db = LazyClient(firestore.AsyncClient)
@@ -1,21 +1,18 @@
-    from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-import firebase_admin
-from firebase_admin import auth, credentials
-from app.core.db import db
+from app.core.repositories import document_repository
+from app.core.security import AuthenticationError, verify_request_async
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
+    """
+    Returns the decoded Firebase ID token of the request. Reuses the claims
+    already verified for this request by the authentication middleware.
+    """
     try:
-        # Initialize Firebase Admin SDK
-        if not firebase_admin._apps:
-            cred = credentials.ApplicationDefault()
-            firebase_admin.initialize_app(cred)
-
-        decoded_token = auth.verify_id_token(token)
-        return decoded_token
-    except Exception as e:
+        return await verify_request_async(request, token)
+    except AuthenticationError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid authentication credentials: {e}",
@@ -26,9 +23,7 @@ async def get_user_document_from_firestore(document_id: str, current_user: dict
     """
     Fetches a user-owned document from Firestore and handles not-found errors.
     """
-    uid = current_user["uid"]
-    doc_ref = db.collection("users").document(uid).collection("documents").document(document_id)
-    doc = await doc_ref.get()
-    if not doc.exists:
+    document = await document_repository.get(current_user["uid"], document_id)
+    if document is None:
         raise HTTPException(status_code=404, detail="Document not found")
-    return doc.to_dict()
+    return document
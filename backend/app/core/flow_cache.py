@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+FLOW_CACHE_ENABLED = os.getenv("FLOW_CACHE_ENABLED", "true").lower() == "true"
+FLOW_CACHE_MAX_ENTRIES = int(os.getenv("FLOW_CACHE_MAX_ENTRIES", "512"))
+FLOW_CACHE_TTL_SECONDS = int(os.getenv("FLOW_CACHE_TTL_SECONDS", "3600"))
+FLOW_CACHE_PERSISTENT = os.getenv("FLOW_CACHE_PERSISTENT", "true").lower() == "true"
+FLOW_CACHE_PERSISTENT_TTL_SECONDS = int(os.getenv("FLOW_CACHE_PERSISTENT_TTL_SECONDS", str(30 * 24 * 3600)))
+FLOW_CACHE_COLLECTION = os.getenv("FLOW_CACHE_COLLECTION", "flowCache")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes free text before hashing so that copies of the same resume or
+    job ad that only differ in unicode forms or whitespace share a cache key.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+
+def content_key(namespace: str, version: str, *parts: Any) -> str:
+    """
+    Builds a content-addressed key from a namespace, a prompt/schema version
+    and the (normalized) inputs.
+    """
+    normalized = [normalize_text(p) if isinstance(p, str) else p for p in parts]
+    payload = json.dumps([namespace, version, normalized], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """A thread-safe in-process LRU cache with size and TTL eviction."""
+
+    def __init__(self, max_entries: int = FLOW_CACHE_MAX_ENTRIES, ttl_seconds: int = FLOW_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FirestoreCacheTier:
+    """
+    Persistent cache tier stored in a top-level Firestore collection.
+    Entries carry an `expiresAt` field, which can also be used as the
+    collection's Firestore TTL policy field.
+    """
+
+    def __init__(self, collection: str = FLOW_CACHE_COLLECTION, ttl_seconds: int = FLOW_CACHE_PERSISTENT_TTL_SECONDS):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+
+    def _ref(self, key: str):
+        # Imported lazily so the cache can be used without a Firestore client
+        from app.core.db import db
+
+        return db.collection(self.collection).document(key)
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            doc = self._ref(key).get()
+        except Exception as e:
+            logger.warning("Flow cache read failed for %s: %s", key, e)
+            return None
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        expires_at = data.get("expiresAt")
+        if expires_at and expires_at < datetime.now(timezone.utc):
+            return None
+        return data.get("value")
+
+    def set(self, key: str, namespace: str, version: str, value: Any) -> None:
+        from google.cloud.firestore import SERVER_TIMESTAMP
+
+        try:
+            self._ref(key).set({
+                "namespace": namespace,
+                "version": version,
+                "value": value,
+                "createdAt": SERVER_TIMESTAMP,
+                "expiresAt": datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds),
+            })
+        except Exception as e:
+            logger.warning("Flow cache write failed for %s: %s", key, e)
+
+
+class FlowResultCache:
+    """
+    Two-tier (in-process LRU + Firestore) cache for Genkit flow results,
+    keyed by a hash of the normalized flow inputs and a prompt/schema version.
+    """
+
+    def __init__(self, memory: LRUCache, persistent: Optional[FirestoreCacheTier] = None, enabled: bool = True):
+        self.memory = memory
+        self.persistent = persistent
+        self.enabled = enabled
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = Lock()
+
+    def _count(self, namespace: str, counter: str) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(namespace, {"memory_hits": 0, "persistent_hits": 0, "misses": 0})
+            stats[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters per flow plus the current LRU size."""
+        with self._stats_lock:
+            flows = {namespace: dict(counters) for namespace, counters in self._stats.items()}
+        return {"memory_entries": len(self.memory), "flows": flows}
+
+    def lookup(self, namespace: str, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count(namespace, "memory_hits")
+            return value
+        if self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                self._count(namespace, "persistent_hits")
+                return value
+        self._count(namespace, "misses")
+        return None
+
+    def store(self, namespace: str, version: str, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, namespace, version, value)
+
+    def cached(self, namespace: str, version: str, model: Optional[Type[BaseModel]] = None) -> Callable:
+        """
+        Decorator that serves a flow's result from the cache when the same
+        normalized inputs were seen before under the same `version`.
+        Bump `version` whenever the prompt or output schema changes.
+        """
+
+        def encode(result: Any) -> Any:
+            return result.model_dump() if isinstance(result, BaseModel) else result
+
+        def decode(value: Any) -> Any:
+            return model.model_validate(value) if model is not None else value
+
+        def decorator(fn: Callable) -> Callable:
+            signature = inspect.signature(fn)
+
+            def key_for(args, kwargs) -> str:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                return content_key(namespace, version, *bound.arguments.values())
+
+            if inspect.iscoroutinefunction(fn):
+
+                @wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await fn(*args, **kwargs)
+                    key = key_for(args, kwargs)
+                    value = await asyncio.to_thread(self.lookup, namespace, key)
+                    if value is not None:
+                        return decode(value)
+                    result = await fn(*args, **kwargs)
+                    if result is not None:
+                        await asyncio.to_thread(self.store, namespace, version, key, encode(result))
+                    return result
+
+                return async_wrapper
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                key = key_for(args, kwargs)
+                value = self.lookup(namespace, key)
+                if value is not None:
+                    return decode(value)
+                result = fn(*args, **kwargs)
+                if result is not None:
+                    self.store(namespace, version, key, encode(result))
+                return result
+
+            return wrapper
+
+        return decorator
+
+
+flow_cache = FlowResultCache(
+    memory=LRUCache(),
+    persistent=FirestoreCacheTier() if FLOW_CACHE_PERSISTENT else None,
+    enabled=FLOW_CACHE_ENABLED,
+)
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from typing import Any, Awaitable, Callable, List, Optional, Set, Type
+
+from google.api_core.exceptions import AlreadyExists
+from pydantic import BaseModel
+
+from app.core.flow_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+JOB_REGISTRY_COLLECTION = os.getenv("JOB_REGISTRY_COLLECTION", "jobDescriptions")
+# Smallest estimated Jaccard similarity (of word 3-shingles) at which two ads
+# count as the same job
+JOB_REGISTRY_MIN_SIMILARITY = float(os.getenv("JOB_REGISTRY_MIN_SIMILARITY", "0.8"))
+# Ads shorter than this (in words) only match exact copies; shingle overlap is too noisy below it
+JOB_REGISTRY_MIN_WORDS = int(os.getenv("JOB_REGISTRY_MIN_WORDS", "40"))
+JOB_REGISTRY_CANDIDATE_LIMIT = int(os.getenv("JOB_REGISTRY_CANDIDATE_LIMIT", "20"))
+
+# MinHash signature of 64 values, split into 16 LSH bands of 4 rows. Two ads
+# with a Jaccard similarity of 0.8 share at least one band with ~99.9%
+# probability, while unrelated ads practically never do.
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+SHINGLE_SIZE = 3
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % (_MERSENNE_PRIME - 1) + 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME,
+    )
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def canonical_text(text: str) -> str:
+    """Normalizes a job ad for exact-duplicate detection (unicode, whitespace, case)."""
+    return normalize_text(text).casefold()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(canonical_text(text).encode("utf-8")).hexdigest()
+
+
+def _shingles(text: str) -> Set[str]:
+    words = _WORD_PATTERN.findall(canonical_text(text))
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> List[int]:
+    """
+    MinHash signature of the text's word 3-shingles. The fraction of equal
+    values between two signatures estimates the Jaccard similarity of the
+    ads, so reposts with a changed date, salary line or footer stay close.
+    """
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for shingle in _shingles(text)
+    ]
+    if not hashes:
+        return [_MERSENNE_PRIME] * MINHASH_PERMUTATIONS
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def lsh_bands(signature: List[int]) -> List[str]:
+    """Hashes each band of a MinHash signature into a tag, used as an `array_contains_any` index."""
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    bands = []
+    for band in range(LSH_BANDS):
+        values = ",".join(str(v) for v in signature[band * rows:(band + 1) * rows])
+        bands.append(f"{band}:{hashlib.blake2b(values.encode(), digest_size=8).hexdigest()}")
+    return bands
+
+
+def estimated_similarity(a: List[int], b: List[int]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / MINHASH_PERMUTATIONS
+
+
+class JobDescriptionRegistry:
+    """
+    Canonical store of a user's job descriptions, kept in a subcollection of
+    the user's document. Every ad the user submits is resolved to one entry,
+    exact copies by content hash and near duplicates by MinHash LSH, so
+    analyses derived from the text are computed once per job and shared by
+    every endpoint. Entries are never shared between users: ads can come from
+    private email, and a near duplicate is still another submission's text.
+    """
+
+    def __init__(self, collection: str = JOB_REGISTRY_COLLECTION):
+        self.collection = collection
+
+    def _collection(self, uid: str):
+        # Imported lazily so the fingerprinting helpers work without a Firestore client
+        from app.core.db import db
+
+        return db.collection("users").document(uid).collection(self.collection)
+
+    def _find_near_duplicate(self, uid: str, signature: List[int]) -> Optional[dict]:
+        query = (
+            self._collection(uid)
+            .where("lshBands", "array_contains_any", lsh_bands(signature))
+            .limit(JOB_REGISTRY_CANDIDATE_LIMIT)
+        )
+        best, best_similarity = None, JOB_REGISTRY_MIN_SIMILARITY
+        for doc in query.stream():
+            similarity = estimated_similarity(signature, doc.get("minhash"))
+            if similarity >= best_similarity:
+                best, best_similarity = doc.to_dict(), similarity
+        return best
+
+    def _resolve(self, uid: str, text: str) -> dict:
+        from google.cloud.firestore import SERVER_TIMESTAMP
+
+        # 1. Exact copy of one of the user's ads
+        entry_id = content_hash(text)
+        ref = self._collection(uid).document(entry_id)
+        doc = ref.get()
+        if doc.exists:
+            return {**doc.to_dict(), "uid": uid}
+
+        # 2. Near duplicate of one of the user's ads
+        signature = minhash(text)
+        long_enough = len(_WORD_PATTERN.findall(text)) >= JOB_REGISTRY_MIN_WORDS
+        if long_enough:
+            match = self._find_near_duplicate(uid, signature)
+            if match is not None:
+                return {**match, "uid": uid}
+
+        # 3. New job: register it under its content hash
+        entry = {
+            "id": entry_id,
+            "text": normalize_text(text),
+            "minhash": signature,
+            "lshBands": lsh_bands(signature) if long_enough else [],
+            "derived": {},
+            "createdAt": SERVER_TIMESTAMP,
+        }
+        try:
+            ref.create(entry)
+        except AlreadyExists:
+            # Registered concurrently by another request
+            return {**ref.get().to_dict(), "uid": uid}
+        return {**entry, "createdAt": None, "uid": uid}
+
+    async def resolve(self, uid: str, text: str) -> dict:
+        """Returns the user's canonical entry for a job description, registering it if new."""
+        return await asyncio.to_thread(self._resolve, uid, text)
+
+    async def get(self, uid: str, entry_id: str) -> Optional[dict]:
+        doc = await asyncio.to_thread(self._collection(uid).document(entry_id).get)
+        return {**doc.to_dict(), "uid": uid} if doc.exists else None
+
+    async def get_or_compute(
+        self,
+        entry: dict,
+        name: str,
+        version: str,
+        compute: Callable[[], Awaitable[Any]],
+        model: Optional[Type[BaseModel]] = None,
+    ) -> Any:
+        """
+        Returns the derived result `name` (e.g. an analysis) stored on the
+        entry under `version`, computing and persisting it on a miss. A failed
+        write is logged and the computed result is still returned.
+        """
+        stored = (entry.get("derived") or {}).get(name)
+        if stored and stored.get("version") == version:
+            return model.model_validate(stored["value"]) if model is not None else stored["value"]
+
+        result = await compute()
+        value = result.model_dump() if isinstance(result, BaseModel) else result
+        derived = {"version": version, "value": value}
+        try:
+            ref = self._collection(entry["uid"]).document(entry["id"])
+            await asyncio.to_thread(ref.update, {f"derived.{name}": derived})
+            entry.setdefault("derived", {})[name] = derived
+        except Exception as e:
+            logger.warning("Failed to store %s for job description %s: %s", name, entry["id"], e)
+        return result
+
+
+job_registry = JobDescriptionRegistry()
@@ -0,0 +1,205 @@
+import json
+import typing
+from functools import lru_cache
+from typing import Any, List, Optional, Type, Union
+
+from pydantic import BaseModel, ValidationError, create_model
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class IncrementalJsonParser:
+    """
+    Tolerant, incremental parser for JSON produced by a language model.
+
+    Chunks are scanned once as they arrive. The scanner skips prose or code
+    fences around the document, drops trailing commas, and remembers the last
+    point at which a value was complete. A snapshot closes the containers
+    still open at that point, so a truncated document (cut mid-string, or
+    mid-array) parses to everything that was complete. Incomplete values are
+    left out rather than guessed.
+
+    With a Pydantic `model`, `feed` returns partial instances of the model
+    (every field optional) as fields complete, and `result` validates the
+    full document against the model.
+    """
+
+    def __init__(self, model: Optional[Type[BaseModel]] = None):
+        self.model = model
+        self._out: List[str] = []
+        self._stack: List[str] = []
+        # For each open object: True while a key is expected, False for a value
+        self._expect_key: List[bool] = []
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        self._in_scalar = False
+        self._started = False
+        self._done = False
+        self._safe_len = 0
+        self._safe_stack: tuple = ()
+        self._emitted_len = -1
+
+    def _mark_safe(self) -> None:
+        self._safe_len = len(self._out)
+        self._safe_stack = tuple(self._stack)
+
+    def _value_done(self) -> None:
+        self._mark_safe()
+        if not self._stack:
+            self._done = True
+
+    def _end_scalar(self) -> None:
+        if self._in_scalar:
+            self._in_scalar = False
+            self._value_done()
+
+    def _drop_trailing_comma(self) -> None:
+        end = len(self._out)
+        while end and self._out[end - 1].isspace():
+            end -= 1
+        if end and self._out[end - 1] == ",":
+            del self._out[end - 1]
+
+    def _scan(self, text: str) -> None:
+        for char in text:
+            if self._done:
+                return
+            if not self._started:
+                # Skip leading prose and code fences up to the document itself
+                if char not in "{[":
+                    continue
+                self._started = True
+
+            if self._in_string:
+                self._out.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if not self._string_is_key:
+                        self._value_done()
+                continue
+
+            if char == '"':
+                self._end_scalar()
+                self._in_string = True
+                self._string_is_key = bool(self._stack) and self._stack[-1] == "{" and self._expect_key[-1]
+                self._out.append(char)
+            elif char in "{[":
+                self._end_scalar()
+                self._stack.append(char)
+                if char == "{":
+                    self._expect_key.append(True)
+                self._out.append(char)
+                self._mark_safe()
+            elif char in "}]":
+                self._end_scalar()
+                if not self._stack:
+                    continue
+                self._drop_trailing_comma()
+                opener = self._stack.pop()
+                if opener == "{":
+                    self._expect_key.pop()
+                self._out.append(_CLOSERS[opener])
+                self._value_done()
+            elif char == ",":
+                self._end_scalar()
+                if self._stack and self._stack[-1] == "{":
+                    self._expect_key[-1] = True
+                self._out.append(char)
+            elif char == ":":
+                self._end_scalar()
+                if self._stack and self._stack[-1] == "{":
+                    self._expect_key[-1] = False
+                self._out.append(char)
+            elif char.isspace():
+                self._end_scalar()
+                self._out.append(char)
+            else:
+                self._in_scalar = True
+                self._out.append(char)
+
+    def repaired_text(self) -> str:
+        """Returns the longest complete prefix of the document, with its open containers closed."""
+        if self._done:
+            return "".join(self._out[:self._safe_len])
+        text = "".join(self._out[:self._safe_len]).rstrip()
+        if text.endswith(","):
+            text = text[:-1]
+        return text + "".join(_CLOSERS[opener] for opener in reversed(self._safe_stack))
+
+    def snapshot(self) -> Any:
+        """Parses everything that is complete so far; None before the first value."""
+        if not self._started or self._safe_len == 0:
+            return None
+        return json.loads(self.repaired_text())
+
+    def feed(self, chunk: str) -> Optional[Any]:
+        """
+        Consumes a chunk and returns the updated partial value (a partial model
+        instance if a model was given), or None if nothing new completed.
+        """
+        self._scan(chunk)
+        if self._safe_len == self._emitted_len or self._safe_len == 0:
+            return None
+        self._emitted_len = self._safe_len
+        data = self.snapshot()
+        if self.model is None:
+            return data
+        try:
+            return partial_model(self.model).model_validate(data)
+        except ValidationError:
+            return None
+
+    def result(self) -> Any:
+        """
+        Returns the final value once the stream has ended. A truncated
+        document yields its complete prefix. Raises ValueError if there is
+        nothing to parse, and ValidationError if a model was given and the
+        document does not satisfy it.
+        """
+        # A scalar at the very end of the stream is complete too
+        self._end_scalar()
+        data = self.snapshot()
+        if data is None:
+            raise ValueError("No JSON document found in the model output.")
+        return self.model.model_validate(data) if self.model is not None else data
+
+
+def loads_tolerant(text: str) -> Any:
+    """
+    `json.loads` that also accepts code fences, surrounding prose, trailing
+    commas and truncated documents, as produced by language models.
+    """
+    try:
+        return json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        pass
+    parser = IncrementalJsonParser()
+    parser.feed(text or "")
+    return parser.result()
+
+
+def _partial_annotation(annotation: Any) -> Any:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return partial_model(annotation)
+    if origin in (list, List) and args:
+        return List[_partial_annotation(args[0])]
+    if origin is Union:
+        return Union[tuple(_partial_annotation(a) for a in args)]
+    return annotation
+
+
+@lru_cache(maxsize=None)
+def partial_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    """Returns a copy of the model in which every field, recursively, is optional."""
+    fields = {
+        name: (Optional[_partial_annotation(field.annotation)], None)
+        for name, field in model.model_fields.items()
+    }
+    return create_model(f"Partial{model.__name__}", **fields)
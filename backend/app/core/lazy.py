@@ -0,0 +1,35 @@
+from threading import Lock
+from typing import Any, Callable, Optional
+
+
+class LazyClient:
+    """
+    Stands in for a Google Cloud client that is built on first use instead of
+    at import time, so importing a module stays cheap and the startup warm-up
+    decides when the client is created. Attribute access is forwarded to the
+    real client.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._client: Optional[Any] = None
+        self._lock = Lock()
+
+    def get(self) -> Any:
+        """Returns the real client, building it if needed."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    @property
+    def initialized(self) -> bool:
+        return self._client is not None
+
+    def override(self, client: Any) -> None:
+        """Replaces the real client, e.g. with an in-memory fake in tests and benchmarks."""
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
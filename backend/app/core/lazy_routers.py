@@ -0,0 +1,89 @@
+import asyncio
+import importlib
+import logging
+from types import ModuleType
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+
+class LazyRouters:
+    """
+    Routers that are imported on the first request to their prefix (or when
+    preloaded in the background) instead of when the app is imported. Their
+    modules pull in the flows, Genkit, WeasyPrint and the Google API clients,
+    none of which /health needs.
+    """
+
+    def __init__(self, app: FastAPI, prefix: str = ""):
+        self.app = app
+        self.prefix = prefix
+        # Route prefix -> (module path, OpenAPI tags) of routers not yet included
+        self._pending: Dict[str, Tuple[str, List[str]]] = {}
+
+    def add(self, prefix: str, module: str, tags: Optional[List[str]] = None) -> None:
+        self._pending[self.prefix + prefix] = (module, tags or [])
+
+    @property
+    def pending(self) -> List[str]:
+        return list(self._pending)
+
+    def match(self, path: str) -> Optional[str]:
+        """Returns the prefix of the pending router that serves `path`, if any."""
+        for prefix in self._pending:
+            if path == prefix or path.startswith(prefix + "/"):
+                return prefix
+        return None
+
+    async def load(self, prefix: str) -> None:
+        """Imports a pending router in a worker thread and includes it in the app."""
+        entry = self._pending.get(prefix)
+        if entry is None:
+            return
+        module_path, tags = entry
+        module = await asyncio.to_thread(importlib.import_module, module_path)
+        # Back on the event loop: only the first of several concurrent loads
+        # of the same router includes it
+        if self._pending.pop(prefix, None) is None:
+            return
+        self.app.include_router(module.router, prefix=prefix, tags=tags)
+        # Rebuild the OpenAPI schema with the new routes on next request
+        self.app.openapi_schema = None
+        logger.debug("Loaded router %s for %s", module_path, prefix)
+
+    async def load_all(self) -> None:
+        """
+        Loads every pending router, e.g. in the background after startup. A
+        router that fails to import is logged and left pending, so the others
+        still load and its own prefix retries on the next request.
+        """
+        for prefix in self.pending:
+            try:
+                await self.load(prefix)
+            except Exception:
+                logger.exception("Failed to load router for %s", prefix)
+
+
+class LazyRouterMiddleware:
+    """
+    ASGI middleware that loads the pending router for the request path before
+    routing. Requests for the OpenAPI schema or docs load every router.
+    """
+
+    def __init__(self, app, routers: LazyRouters, load_all_paths: Tuple[str, ...] = ()):
+        self.app = app
+        self.routers = routers
+        self.load_all_paths = load_all_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self.routers.pending:
+            path = scope["path"]
+            if path in self.load_all_paths:
+                await self.routers.load_all()
+            else:
+                prefix = self.routers.match(path)
+                if prefix is not None:
+                    await self.routers.load(prefix)
+        await self.app(scope, receive, send)
@@ -0,0 +1,161 @@
+import asyncio
+import inspect
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Set to false to skip the warm-up (e.g. in tests); /ready then reports ready at once
+STARTUP_WARMUP_ENABLED = os.getenv("STARTUP_WARMUP_ENABLED", "true").lower() == "true"
+# Upper bound for each component's warm-up
+STARTUP_WARMUP_TIMEOUT_SECONDS = float(os.getenv("STARTUP_WARMUP_TIMEOUT_SECONDS", "30"))
+
+
+class WarmUp:
+    """
+    Initializes clients and assets concurrently in the background at startup.
+    Sync components run in worker threads. The app serves requests (and the
+    /health liveness probe) meanwhile; /ready reports not ready until every
+    component has finished. A component that fails is reported and logged,
+    and is initialized again on first use, as it would be without a warm-up.
+    """
+
+    def __init__(self, timeout: float = STARTUP_WARMUP_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self._components: Dict[str, Callable[[], Any]] = {}
+        self._results: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._total_ms: Optional[float] = None
+
+    def component(self, name: str) -> Callable:
+        """Decorator that registers a sync or async warm-up step."""
+        def decorator(fn: Callable[[], Any]) -> Callable[[], Any]:
+            self._components[name] = fn
+            return fn
+        return decorator
+
+    async def _run_component(self, name: str, fn: Callable[[], Any]) -> None:
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(fn):
+                await asyncio.wait_for(fn(), timeout=self.timeout)
+            else:
+                await asyncio.wait_for(asyncio.to_thread(fn), timeout=self.timeout)
+            result = {"status": "ok"}
+        except Exception as e:
+            logger.warning("Warm-up of %s failed: %r", name, e)
+            result = {"status": "error", "error": repr(e)}
+        result["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        self._results[name] = result
+
+    async def run(self) -> None:
+        start = time.perf_counter()
+        await asyncio.gather(*(self._run_component(name, fn) for name, fn in self._components.items()))
+        self._total_ms = round((time.perf_counter() - start) * 1000, 1)
+        logger.info("Startup warm-up finished in %.0f ms: %s", self._total_ms, self._results)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def skip(self) -> None:
+        """Marks the app ready without warming anything up."""
+        self._results = {name: {"status": "skipped", "ms": 0.0} for name in self._components}
+        self._total_ms = 0.0
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def ready(self) -> bool:
+        return self._total_ms is not None
+
+    def status(self) -> dict:
+        """Readiness and per-component warm-up timings."""
+        components = {name: self._results.get(name, {"status": "pending"}) for name in self._components}
+        return {"ready": self.ready, "total_ms": self._total_ms, "components": components}
+
+
+warm_up = WarmUp()
+
+
+# --- Components ---
+# Modules are imported inside each step so the imports themselves are
+# part of the (concurrent) warm-up.
+
+@warm_up.component("firebase")
+def _firebase() -> None:
+    from app.core.security import init_firebase
+
+    init_firebase()
+
+
+@warm_up.component("signing_keys")
+async def _signing_keys() -> None:
+    from app.core.security import FIREBASE_PROJECT_ID, signing_keys
+
+    if FIREBASE_PROJECT_ID:
+        await signing_keys.refresh()
+
+
+@warm_up.component("firestore")
+def _firestore() -> None:
+    from app.core.db import db
+
+    # Opens the channel and fetches credentials; the document need not exist
+    db.collection("_warmup").document("_warmup").get()
+
+
+@warm_up.component("firestore_async")
+async def _firestore_async() -> None:
+    from app.core.db import async_db
+
+    # Built on the event loop that serves requests, which its channel is bound to
+    await async_db.collection("_warmup").document("_warmup").get()
+
+
+@warm_up.component("secret_manager")
+def _secret_manager() -> None:
+    from app.core.secrets import client
+
+    client.get()
+
+
+@warm_up.component("genkit")
+def _genkit() -> None:
+    from app.core.model_gateway import init_genkit
+
+    init_genkit()
+
+
+@warm_up.component("pdf_renderer")
+def _pdf_renderer() -> None:
+    from app.api.v1.documents import warm_pdf_renderer
+
+    warm_pdf_renderer()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """FastAPI lifespan: starts the warm-up and the signing key refresh, and stops them on shutdown."""
+    from app.core.security import signing_keys
+
+    if STARTUP_WARMUP_ENABLED:
+        warm_up.start()
+    else:
+        warm_up.skip()
+    signing_keys.start()
+    try:
+        yield
+    finally:
+        await warm_up.stop()
+        await signing_keys.stop()
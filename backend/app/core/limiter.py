@@ -1,11 +1,37 @@
+import logging
+import math
+import os
+import time
+from typing import Callable, Optional
+from fastapi import Depends, HTTPException
+from limits import parse
+from limits.storage import Storage, storage_from_string
+from limits.strategies import STRATEGIES
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from starlette.requests import Request
 from starlette.responses import JSONResponse
-from starlette.status import HTTP_401_UNAUTHORIZED
-import firebase_admin
-from firebase_admin import auth, credentials
+from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_429_TOO_MANY_REQUESTS
+from app.core.dependencies import get_current_user
+from app.core.metrics import CHARS_PER_TOKEN
+from app.core.security import AuthenticationError, verify_request
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Where rate limit counters live. "memory://" counts per process; a Redis
+# protocol URI (e.g. "redis://localhost:6379/0", Memorystore, Valkey)
+# shares the limits across every worker and instance.
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+# "moving-window" (exact sliding window), "sliding-window-counter" or "fixed-window"
+RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "moving-window")
+RATE_LIMIT_KEY_PREFIX = os.getenv("RATE_LIMIT_KEY_PREFIX", "careercopilot")
+# Per-user budget of estimated model tokens for LLM-heavy endpoints
+RATE_LIMIT_MODEL_TOKEN_BUDGET = os.getenv("RATE_LIMIT_MODEL_TOKEN_BUDGET", "500000/hour")
+# "sliding-window-counter" or "fixed-window": both keep one counter per key.
+# A moving window stores an entry per unit of cost, i.e. per token here.
+RATE_LIMIT_MODEL_TOKEN_STRATEGY = os.getenv("RATE_LIMIT_MODEL_TOKEN_STRATEGY", "sliding-window-counter")
 
 class NotAuthenticatedException(Exception):
     pass
@@ -26,61 +52,101 @@ def _rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JS
 def key_func_by_user(request: Request) -> str:
     """
     Custom key function for slowapi to use the authenticated user's UID.
-    It extracts the token from the Authorization header and verifies it.
+    It reuses the token verification done by the authentication middleware
+    (verifying the Authorization header itself if the middleware did not run).
     If the token is missing or invalid, it falls back to the remote IP address.
     """
-    # Initialize Firebase Admin SDK if not already done, as this runs before app startup logic
-    if not firebase_admin._apps:
-        try:
-            cred = credentials.ApplicationDefault()
-            firebase_admin.initialize_app(cred)
-        except Exception:
-            # Fallback to IP if Firebase init fails
-            return get_remote_address(request)
-
-    auth_header = request.headers.get("authorization")
-    
-    # The endpoint's own security dependency will handle the final rejection.
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return get_remote_address(request)
-
     try:
-        token = auth_header.split(" ")[1]
-        decoded_token = auth.verify_id_token(token)
         # Return the UID if available, otherwise fallback to IP
-        return decoded_token.get("uid") or get_remote_address(request)
-    except Exception:
-        # If token is invalid/expired, fallback to IP. The endpoint dependency will raise 401.
+        return verify_request(request).get("uid") or get_remote_address(request)
+    except AuthenticationError:
+        # The endpoint's own security dependency will handle the final rejection.
         return get_remote_address(request)
 
 def key_func_by_authenticated_user_only(request: Request) -> str:
     """
     Strict key function for slowapi that requires an authenticated user's UID.
-    It extracts the token from the Authorization header and verifies it.
+    It reuses the token verification done by the authentication middleware.
     If the token is missing or invalid, it raises NotAuthenticatedException.
     This should be used for critical endpoints.
     """
-    if not firebase_admin._apps:
+    try:
+        uid = verify_request(request).get("uid")
+    except AuthenticationError as e:
+        raise NotAuthenticatedException() from e
+    if not uid:
+        raise NotAuthenticatedException()
+    return uid
+
+def _limiter(key_func: Callable[[Request], str]) -> Limiter:
+    # Falls back to per-process counters while the shared storage is unreachable
+    return Limiter(
+        key_func=key_func,
+        storage_uri=RATE_LIMIT_STORAGE_URI,
+        strategy=RATE_LIMIT_STRATEGY,
+        key_prefix=RATE_LIMIT_KEY_PREFIX,
+        in_memory_fallback_enabled=True,
+    )
+
+limiter = _limiter(key_func_by_user)
+strict_limiter = _limiter(key_func_by_authenticated_user_only)
+
+
+class ModelTokenBudget:
+    """
+    Cost-weighted rate limit: each user may spend a budget of estimated model
+    tokens per window, and every request to an LLM-heavy endpoint is charged
+    in proportion to the tokens it is expected to consume. Counters live in
+    the shared limiter storage, so the budget holds across instances.
+    """
+
+    def __init__(
+        self,
+        limit: str = RATE_LIMIT_MODEL_TOKEN_BUDGET,
+        storage: Optional[Storage] = None,
+        strategy: str = RATE_LIMIT_MODEL_TOKEN_STRATEGY,
+    ):
+        if strategy not in ("sliding-window-counter", "fixed-window"):
+            raise ValueError(f"Unsupported model token budget strategy {strategy!r}: use sliding-window-counter or fixed-window")
+        self.limit = parse(limit)
+        self.storage = storage or storage_from_string(RATE_LIMIT_STORAGE_URI)
+        self.strategy = STRATEGIES[strategy](self.storage)
+
+    def charge(self, key: str, cost: int) -> Optional[float]:
+        """
+        Charges `cost` tokens to `key`. Returns None if the budget allows it,
+        or the number of seconds until enough budget frees up.
+        """
         try:
-            cred = credentials.ApplicationDefault()
-            firebase_admin.initialize_app(cred)
+            if self.strategy.hit(self.limit, RATE_LIMIT_KEY_PREFIX, "model-tokens", key, cost=cost):
+                return None
+            stats = self.strategy.get_window_stats(self.limit, RATE_LIMIT_KEY_PREFIX, "model-tokens", key)
+            return max(stats.reset_time - time.time(), 0)
         except Exception as e:
-            raise NotAuthenticatedException() from e
+            # Rate limiting must not take the API down with its storage
+            logger.warning("Model token budget unavailable, allowing request: %s", e)
+            return None
 
-    auth_header = request.headers.get("authorization")
-    
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise NotAuthenticatedException()
+    def dependency(self, prompt_tokens: int, input_multiplier: float = 1.0) -> Callable[..., None]:
+        """
+        Returns a FastAPI dependency that charges an endpoint's estimated token
+        use: the fixed prompt and context it adds (`prompt_tokens`) plus the
+        request payload, which is sent to the model `input_multiplier` times.
+        It depends on `get_current_user`, so only authenticated requests are
+        charged, to the user's own budget.
+        """
+        def charge_model_tokens(request: Request, user: dict = Depends(get_current_user)) -> None:
+            payload_tokens = int(request.headers.get("content-length") or 0) // CHARS_PER_TOKEN
+            cost = max(1, math.ceil(prompt_tokens + payload_tokens * input_multiplier))
+            retry_after = self.charge(user["uid"], cost)
+            if retry_after is not None:
+                raise HTTPException(
+                    status_code=HTTP_429_TOO_MANY_REQUESTS,
+                    detail=f"Rate limit exceeded: model token budget of {self.limit}",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+
+        return charge_model_tokens
 
-    try:
-        token = auth_header.split(" ")[1]
-        decoded_token = auth.verify_id_token(token)
-        uid = decoded_token.get("uid")
-        if not uid:
-            raise NotAuthenticatedException()
-        return uid
-    except Exception as e:
-        raise NotAuthenticatedException() from e
 
-limiter = Limiter(key_func=key_func_by_user)
-strict_limiter = Limiter(key_func=key_func_by_authenticated_user_only)
+model_token_budget = ModelTokenBudget()
@@ -0,0 +1,291 @@
+import inspect
+import os
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# --- Configuration ---
+# Optional per-1000-token prices used to estimate model spend. Leave at 0 to
+# only track token counts.
+MODEL_PROMPT_COST_PER_1K_TOKENS = float(os.getenv("MODEL_PROMPT_COST_PER_1K_TOKENS", "0"))
+MODEL_RESPONSE_COST_PER_1K_TOKENS = float(os.getenv("MODEL_RESPONSE_COST_PER_1K_TOKENS", "0"))
+
+# Rough characters-per-token ratio, used when a response carries no usage data
+CHARS_PER_TOKEN = 4
+
+# Flow and endpoint the current task is working for; read by the model
+# gateway so model calls are attributed to the flow that made them
+_current_flow: ContextVar[str] = ContextVar("current_flow", default="none")
+_current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+
+registry = CollectorRegistry()
+
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+FLOW_DURATION = Histogram(
+    "careercopilot_flow_duration_seconds", "Wall time of Genkit flow runs.",
+    ["flow", "endpoint", "status"], buckets=_LATENCY_BUCKETS, registry=registry,
+)
+FLOW_ERRORS = Counter(
+    "careercopilot_flow_errors_total", "Genkit flow runs that raised, by error class.",
+    ["flow", "endpoint", "error"], registry=registry,
+)
+MODEL_DURATION = Histogram(
+    "careercopilot_model_call_duration_seconds", "Wall time of model calls, per attempt.",
+    ["flow", "endpoint", "status"], buckets=_LATENCY_BUCKETS, registry=registry,
+)
+MODEL_TOKENS = Counter(
+    "careercopilot_model_tokens_total", "Prompt and response tokens of model calls.",
+    ["flow", "endpoint", "kind"], registry=registry,
+)
+MODEL_COST = Counter(
+    "careercopilot_model_cost_total", "Estimated model spend from the configured token prices.",
+    ["flow", "endpoint"], registry=registry,
+)
+MODEL_RETRIES = Counter(
+    "careercopilot_model_retries_total", "Model call retries after transient errors.",
+    ["flow", "endpoint", "error"], registry=registry,
+)
+MODEL_ROUTED = Counter(
+    "careercopilot_model_routed_total", "Routed model answers, by the tier that produced them.",
+    ["flow", "tier"], registry=registry,
+)
+MODEL_ESCALATIONS = Counter(
+    "careercopilot_model_escalations_total", "Routed model calls escalated past a tier, by reason.",
+    ["flow", "tier", "reason"], registry=registry,
+)
+HTTP_DURATION = Histogram(
+    "careercopilot_http_request_duration_seconds", "Wall time of HTTP requests.",
+    ["endpoint", "method", "status"], buckets=_LATENCY_BUCKETS, registry=registry,
+)
+
+
+def _endpoint_of(scope: dict) -> str:
+    # The router stores the matched route on the scope; templates keep label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def current_endpoint() -> str:
+    """Returns the route template of the request being served, e.g. '/api/v1/jobs/analyze'."""
+    scope = _current_scope.get()
+    return _endpoint_of(scope) if scope is not None else "none"
+
+
+def _labels() -> Tuple[str, str]:
+    return _current_flow.get(), current_endpoint()
+
+
+def instrumented(flow: Optional[str] = None) -> Callable:
+    """
+    Decorator that records the wall time and errors of a flow, and makes the
+    flow the owner of any model calls made while it runs. Place it directly
+    under `@genkit.flow` so cache hits and coalesced calls are measured too.
+    Streaming flows (async generators) are measured until they are exhausted
+    or closed.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        name = flow or fn.__name__
+
+        def record(start: float, error: Optional[BaseException]) -> None:
+            endpoint = current_endpoint()
+            status = "error" if error is not None else "ok"
+            FLOW_DURATION.labels(name, endpoint, status).observe(time.perf_counter() - start)
+            if error is not None:
+                FLOW_ERRORS.labels(name, endpoint, type(error).__name__).inc()
+
+        if inspect.isasyncgenfunction(fn):
+
+            @wraps(fn)
+            async def async_gen_wrapper(*args, **kwargs):
+                # The flow is set around each step of the generator rather than
+                # for its whole run, so the consumer's own work between items
+                # is not attributed to it
+                generator = fn(*args, **kwargs)
+                start = time.perf_counter()
+                error = None
+                try:
+                    while True:
+                        token = _current_flow.set(name)
+                        try:
+                            item = await generator.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        finally:
+                            _current_flow.reset(token)
+                        yield item
+                except GeneratorExit:
+                    # The consumer stopped early, e.g. a client disconnect
+                    raise
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    token = _current_flow.set(name)
+                    try:
+                        await generator.aclose()
+                    finally:
+                        _current_flow.reset(token)
+                        record(start, error)
+
+            return async_gen_wrapper
+
+        if inspect.iscoroutinefunction(fn):
+
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                token = _current_flow.set(name)
+                start = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException as e:
+                    record(start, e)
+                    raise
+                finally:
+                    _current_flow.reset(token)
+                record(start, None)
+                return result
+
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            token = _current_flow.set(name)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                record(start, e)
+                raise
+            finally:
+                _current_flow.reset(token)
+            record(start, None)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _usage_tokens(response: Any) -> Tuple[Optional[int], Optional[int]]:
+    """Reads prompt/response token counts from a model response's usage data, if any."""
+    usage = getattr(response, "usage", None) or getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    prompt = getattr(usage, "input_tokens", None) or getattr(usage, "prompt_token_count", None)
+    completion = getattr(usage, "output_tokens", None) or getattr(usage, "candidates_token_count", None)
+    return prompt, completion
+
+
+def record_model_call(duration: float, prompt: str, response: Any = None, response_text: str = None, error: Optional[BaseException] = None) -> None:
+    """
+    Records one model call made by the current flow. Token counts come from
+    the response's usage data, falling back to an estimate from text length.
+    """
+    flow, endpoint = _labels()
+    MODEL_DURATION.labels(flow, endpoint, "error" if error is not None else "ok").observe(duration)
+    if error is not None:
+        return
+
+    prompt_tokens, response_tokens = _usage_tokens(response)
+    if prompt_tokens is None:
+        prompt_tokens = len(prompt) // CHARS_PER_TOKEN
+    if response_tokens is None:
+        if response_text is None and response is not None:
+            try:
+                response_text = response.text()
+            except Exception:
+                response_text = ""
+        response_tokens = len(response_text or "") // CHARS_PER_TOKEN
+
+    MODEL_TOKENS.labels(flow, endpoint, "prompt").inc(prompt_tokens)
+    MODEL_TOKENS.labels(flow, endpoint, "response").inc(response_tokens)
+    cost = (prompt_tokens * MODEL_PROMPT_COST_PER_1K_TOKENS + response_tokens * MODEL_RESPONSE_COST_PER_1K_TOKENS) / 1000
+    if cost:
+        MODEL_COST.labels(flow, endpoint).inc(cost)
+
+
+def record_model_retry(error: BaseException) -> None:
+    flow, endpoint = _labels()
+    MODEL_RETRIES.labels(flow, endpoint, type(error).__name__).inc()
+
+
+def record_model_route(flow: str, tier: str) -> None:
+    MODEL_ROUTED.labels(flow, tier).inc()
+
+
+def record_model_escalation(flow: str, tier: str, reason: str) -> None:
+    MODEL_ESCALATIONS.labels(flow, tier, reason).inc()
+
+
+class _StatsCollector:
+    """Exports the flow cache and single-flight counters at scrape time."""
+
+    def collect(self):
+        # Imported here to keep this module free of import-time dependencies on them
+        from app.core.flow_cache import flow_cache
+        from app.core.singleflight import singleflight
+
+        cache_stats = flow_cache.stats()
+        entries = GaugeMetricFamily("careercopilot_flow_cache_memory_entries", "Entries in the in-process flow cache.")
+        entries.add_metric([], cache_stats["memory_entries"])
+        yield entries
+        lookups = CounterMetricFamily("careercopilot_flow_cache_lookups", "Flow cache lookups by result.", labels=["flow", "result"])
+        for flow, counters in cache_stats["flows"].items():
+            for result, count in counters.items():
+                lookups.add_metric([flow, result], count)
+        yield lookups
+
+        flight_stats = singleflight.stats()
+        in_flight = GaugeMetricFamily("careercopilot_singleflight_in_flight", "Coalesced calls currently in flight.")
+        in_flight.add_metric([], flight_stats["in_flight"])
+        yield in_flight
+        calls = CounterMetricFamily("careercopilot_singleflight_calls", "Single-flight calls by outcome.", labels=["flow", "outcome"])
+        for flow, counters in flight_stats["flows"].items():
+            for outcome, count in counters.items():
+                calls.add_metric([flow, outcome], count)
+        yield calls
+
+
+registry.register(_StatsCollector())
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Returns the current metrics in the Prometheus text format, with its content type."""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times every HTTP request by route template and
+    exposes the request scope to `instrumented` flows, so their metrics carry
+    the endpoint that triggered them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = _current_scope.set(scope)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_scope.reset(token)
+            HTTP_DURATION.labels(_endpoint_of(scope), scope["method"], str(status["code"])).observe(time.perf_counter() - start)
@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import random
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Optional, Type
+
+from pydantic import BaseModel
+
+# --- Configuration ---
+# "live": call Gemini; "record": call Gemini and save every prompt/response
+# pair as a fixture; "replay": answer from the fixtures without network access
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "live")
+MODEL_FIXTURES_DIR = Path(os.getenv("MODEL_FIXTURES_DIR", str(Path(__file__).resolve().parents[2] / "fixtures" / "model_calls")))
+# Artificial latency added to every replayed call, to approximate the live model
+MODEL_REPLAY_LATENCY_MS = float(os.getenv("MODEL_REPLAY_LATENCY_MS", "0"))
+MODEL_REPLAY_JITTER_MS = float(os.getenv("MODEL_REPLAY_JITTER_MS", "0"))
+# Size of the text chunks a replayed stream is split into
+MODEL_REPLAY_STREAM_CHUNK_CHARS = int(os.getenv("MODEL_REPLAY_STREAM_CHUNK_CHARS", "64"))
+
+
+class FixtureNotFoundError(LookupError):
+    """Raised in replay mode when no fixture was recorded for a prompt."""
+
+
+def fixture_key(prompt: str, output_schema: Optional[Type[BaseModel]] = None) -> str:
+    """Identifies a model call by its prompt and output schema."""
+    schema = output_schema.__name__ if output_schema is not None else None
+    payload = json.dumps({"prompt": prompt, "output_schema": schema}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """Stores one JSON file per recorded model call, named after its fixture key."""
+
+    def __init__(self, directory: Path = MODEL_FIXTURES_DIR):
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def load(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save(self, key: str, fixture: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path(key).write_text(json.dumps(fixture, indent=2, default=str), encoding="utf-8")
+
+
+class ReplayResponse:
+    """Stands in for a model response, exposing the `text()` / `output()` the flows use."""
+
+    def __init__(self, text: str, output: Any = None, output_schema: Optional[Type[BaseModel]] = None, usage: Optional[dict] = None):
+        self._text = text
+        self._output = output
+        self._output_schema = output_schema
+        self.usage = _Usage(**usage) if usage else None
+
+    def text(self) -> str:
+        return self._text
+
+    def output(self) -> Any:
+        data = self._output if self._output is not None else json.loads(self._text)
+        return self._output_schema.model_validate(data) if self._output_schema is not None else data
+
+
+class _Usage:
+    def __init__(self, input_tokens: Optional[int] = None, output_tokens: Optional[int] = None):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+
+def _fixture_from_response(prompt: str, output_schema: Optional[Type[BaseModel]], response: Any) -> dict:
+    fixture = {"prompt": prompt, "output_schema": output_schema.__name__ if output_schema else None}
+    try:
+        fixture["text"] = response.text()
+    except Exception:
+        fixture["text"] = None
+    if output_schema is not None:
+        try:
+            output = response.output()
+            fixture["output"] = output.model_dump() if isinstance(output, BaseModel) else output
+        except Exception:
+            fixture["output"] = None
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        fixture["usage"] = {
+            "input_tokens": getattr(usage, "input_tokens", None),
+            "output_tokens": getattr(usage, "output_tokens", None),
+        }
+    return fixture
+
+
+class RecordingModel:
+    """Wraps a live model and saves every prompt/response pair it serves as a fixture."""
+
+    def __init__(self, model: Any, store: FixtureStore):
+        self.model = model
+        self.store = store
+
+    async def _call(self, method: Callable, **kwargs) -> Any:
+        if inspect.iscoroutinefunction(method):
+            return await method(**kwargs)
+        result = await asyncio.to_thread(method, **kwargs)
+        return await result if inspect.isawaitable(result) else result
+
+    async def generate(self, prompt: str, output_schema: Optional[Type[BaseModel]] = None, **kwargs) -> Any:
+        if output_schema is not None:
+            kwargs["output_schema"] = output_schema
+        response = await self._call(self.model.generate, prompt=prompt, **kwargs)
+        fixture = _fixture_from_response(prompt, output_schema, response)
+        await asyncio.to_thread(self.store.save, fixture_key(prompt, output_schema), fixture)
+        return response
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[Any]:
+        chunks = await self._call(self.model.generate_stream, prompt=prompt, **kwargs)
+        return self._record_stream(prompt, chunks)
+
+    async def _record_stream(self, prompt: str, chunks: Any) -> AsyncIterator[Any]:
+        # Imported here: the gateway imports this module at start-up
+        from app.core.model_gateway import _chunk_text
+
+        received = []
+        if hasattr(chunks, "__aiter__"):
+            async for chunk in chunks:
+                received.append(_chunk_text(chunk))
+                yield chunk
+        else:
+            for chunk in chunks:
+                received.append(_chunk_text(chunk))
+                yield chunk
+        fixture = {"prompt": prompt, "output_schema": None, "text": "".join(received)}
+        await asyncio.to_thread(self.store.save, fixture_key(prompt), fixture)
+
+
+class ReplayModel:
+    """
+    Answers model calls from recorded fixtures, after an artificial latency.
+    On a missing fixture it asks `fallback(prompt, output_schema)` for a
+    synthetic fixture if one is configured, and raises otherwise.
+    """
+
+    def __init__(
+        self,
+        store: FixtureStore,
+        latency_ms: float = MODEL_REPLAY_LATENCY_MS,
+        jitter_ms: float = MODEL_REPLAY_JITTER_MS,
+        fallback: Optional[Callable[[str, Optional[Type[BaseModel]]], dict]] = None,
+    ):
+        self.store = store
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fallback = fallback
+
+    async def _sleep(self, share: float = 1.0) -> None:
+        delay_ms = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms * share / 1000)
+
+    def _fixture(self, prompt: str, output_schema: Optional[Type[BaseModel]]) -> dict:
+        key = fixture_key(prompt, output_schema)
+        fixture = self.store.load(key)
+        if fixture is None and self.fallback is not None:
+            fixture = self.fallback(prompt, output_schema)
+        if fixture is None:
+            raise FixtureNotFoundError(
+                f"No recorded model response for fixture {key} in {self.store.directory}. "
+                f"Record it with MODEL_BACKEND=record."
+            )
+        return fixture
+
+    async def generate(self, prompt: str, output_schema: Optional[Type[BaseModel]] = None, **kwargs) -> ReplayResponse:
+        fixture = self._fixture(prompt, output_schema)
+        await self._sleep()
+        return ReplayResponse(
+            text=fixture.get("text") or (json.dumps(fixture["output"]) if fixture.get("output") is not None else ""),
+            output=fixture.get("output"),
+            output_schema=output_schema,
+            usage=fixture.get("usage"),
+        )
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        fixture = self._fixture(prompt, None)
+        return self._replay_stream(fixture.get("text") or "")
+
+    async def _replay_stream(self, text: str) -> AsyncIterator[str]:
+        # The latency is spread over the chunks, like a model generating tokens
+        chunks = [text[i:i + MODEL_REPLAY_STREAM_CHUNK_CHARS] for i in range(0, len(text), MODEL_REPLAY_STREAM_CHUNK_CHARS)] or [""]
+        for chunk in chunks:
+            await self._sleep(1 / len(chunks))
+            yield chunk
+
+
+def select_model(live_model: Any, mode: str = MODEL_BACKEND, store: Optional[FixtureStore] = None) -> Any:
+    """Returns the model the gateway should call for the configured backend mode."""
+    if mode == "live":
+        return live_model
+    store = store or FixtureStore()
+    if mode == "record":
+        return RecordingModel(live_model, store)
+    if mode == "replay":
+        return ReplayModel(store)
+    raise ValueError(f"Unknown MODEL_BACKEND '{mode}'. Use 'live', 'record' or 'replay'.")
@@ -0,0 +1,244 @@
+import asyncio
+import inspect
+import logging
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Optional, Type
+
+import genkit
+from genkit.plugins import googleai
+from dotenv import load_dotenv
+from google.api_core import exceptions as gcp_exceptions
+from pydantic import BaseModel
+
+from app.core import metrics, model_backends
+from app.core.json_stream import IncrementalJsonParser, loads_tolerant
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Default model used by the flows. MODEL_BACKEND=record/replay swaps it for
+# a fixture-recording wrapper or an offline replay of recorded responses.
+gemini_pro = googleai.gemini_pro
+default_model = model_backends.select_model(gemini_pro)
+
+# --- Configuration ---
+MODEL_MAX_CONCURRENCY = int(os.getenv("MODEL_MAX_CONCURRENCY", "32"))
+MODEL_TIMEOUT_SECONDS = float(os.getenv("MODEL_TIMEOUT_SECONDS", "60"))
+MODEL_MAX_RETRIES = int(os.getenv("MODEL_MAX_RETRIES", "3"))
+MODEL_RETRY_BASE_DELAY_SECONDS = float(os.getenv("MODEL_RETRY_BASE_DELAY_SECONDS", "0.5"))
+MODEL_RETRY_MAX_DELAY_SECONDS = float(os.getenv("MODEL_RETRY_MAX_DELAY_SECONDS", "8"))
+
+# Errors worth retrying: timeouts, dropped connections, quota and 5xx responses
+TRANSIENT_ERRORS = (
+    asyncio.TimeoutError,
+    ConnectionError,
+    gcp_exceptions.TooManyRequests,
+    gcp_exceptions.ResourceExhausted,
+    gcp_exceptions.InternalServerError,
+    gcp_exceptions.BadGateway,
+    gcp_exceptions.ServiceUnavailable,
+    gcp_exceptions.GatewayTimeout,
+    gcp_exceptions.DeadlineExceeded,
+)
+
+# Bounds the number of model calls in flight per worker process
+_model_semaphore = asyncio.Semaphore(MODEL_MAX_CONCURRENCY)
+
+# Marks the end of a streamed response
+_END_OF_STREAM = object()
+
+
+def init_genkit() -> None:
+    """
+    Initializes Genkit once per process. Runs during the startup warm-up and,
+    as a fallback, before the first model call. When GEMINI_API_KEY is not
+    set, the plugin falls back to the Application Default Credentials (ADC)
+    of the service account.
+    """
+    if not genkit.get_plugin("googleai"):
+        genkit.init(plugins=[googleai.init(api_key=os.getenv("GEMINI_API_KEY"))])
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    ceiling = min(MODEL_RETRY_MAX_DELAY_SECONDS, MODEL_RETRY_BASE_DELAY_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+async def _invoke(model: Any, kwargs: dict) -> Any:
+    """
+    Runs a single model call without blocking the event loop. Async model
+    clients are awaited directly; synchronous ones run in a worker thread.
+    """
+    if inspect.iscoroutinefunction(model.generate):
+        return await model.generate(**kwargs)
+    result = await asyncio.to_thread(model.generate, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def generate(
+    prompt: str,
+    *,
+    output_schema: Optional[Type[BaseModel]] = None,
+    config: Any = None,
+    model: Any = None,
+    timeout: Optional[float] = None,
+    max_retries: Optional[int] = None,
+) -> Any:
+    """
+    Awaitable replacement for `gemini_pro.generate(...)` used by every flow.
+    Calls are bounded by a shared semaphore, cut off after `timeout` seconds
+    and retried with jittered backoff on transient errors.
+    """
+    init_genkit()
+    model = model or default_model
+    timeout = timeout if timeout is not None else MODEL_TIMEOUT_SECONDS
+    max_retries = max_retries if max_retries is not None else MODEL_MAX_RETRIES
+
+    kwargs = {"prompt": prompt}
+    if output_schema is not None:
+        kwargs["output_schema"] = output_schema
+    if config is not None:
+        kwargs["config"] = config
+
+    attempt = 0
+    while True:
+        # Each attempt is timed on its own, so the backoff between attempts
+        # and the wait for the semaphore don't count as model latency
+        async with _model_semaphore:
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(_invoke(model, kwargs), timeout=timeout)
+            except Exception as e:
+                metrics.record_model_call(time.perf_counter() - start, prompt, error=e)
+                if not isinstance(e, TRANSIENT_ERRORS) or attempt >= max_retries:
+                    raise
+                error = e
+            else:
+                metrics.record_model_call(time.perf_counter() - start, prompt, response)
+                return response
+        delay = _retry_delay(attempt)
+        attempt += 1
+        metrics.record_model_retry(error)
+        logger.warning("Transient model error (%s), retry %d/%d in %.2fs", type(error).__name__, attempt, max_retries, delay)
+        await asyncio.sleep(delay)
+
+
+def structured_output(response: Any, output_schema: Optional[Type[BaseModel]] = None) -> Any:
+    """
+    Returns `response.output()`, falling back to a tolerant parse of the raw
+    text (code fences, trailing commas, truncation) when the strict parse
+    fails, so a minor syntax slip does not force a new generation.
+    """
+    try:
+        output = response.output()
+        if output_schema is None or isinstance(output, output_schema):
+            return output
+        return output_schema.model_validate(output)
+    except Exception as e:
+        try:
+            data = loads_tolerant(response.text())
+            return output_schema.model_validate(data) if output_schema is not None else data
+        except Exception:
+            raise e
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Extracts the text delta from a streamed model chunk."""
+    if isinstance(chunk, str):
+        return chunk
+    text = getattr(chunk, "text", "")
+    return text() if callable(text) else (text or "")
+
+
+async def stream(
+    prompt: str,
+    *,
+    config: Any = None,
+    model: Any = None,
+    timeout: Optional[float] = None,
+    output_schema: Optional[Type[BaseModel]] = None,
+) -> AsyncIterator[str]:
+    """
+    Streams text chunks as the model produces them. `timeout` bounds the
+    wait for each chunk rather than the whole response. Streams are not
+    retried, since chunks may already have been sent to the client.
+    """
+    init_genkit()
+    model = model or default_model
+    timeout = timeout if timeout is not None else MODEL_TIMEOUT_SECONDS
+
+    kwargs = {"prompt": prompt}
+    if output_schema is not None:
+        kwargs["output_schema"] = output_schema
+    if config is not None:
+        kwargs["config"] = config
+
+    start = time.perf_counter()
+    received = []
+    error = None
+    try:
+        async for text in _stream_chunks(model, kwargs, timeout):
+            received.append(text)
+            yield text
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        metrics.record_model_call(time.perf_counter() - start, prompt, response_text="".join(received), error=error)
+
+
+async def _stream_chunks(model: Any, kwargs: dict, timeout: float) -> AsyncIterator[str]:
+    async with _model_semaphore:
+        if inspect.iscoroutinefunction(model.generate_stream):
+            chunks = await asyncio.wait_for(model.generate_stream(**kwargs), timeout=timeout)
+        else:
+            chunks = await asyncio.wait_for(asyncio.to_thread(model.generate_stream, **kwargs), timeout=timeout)
+
+        if hasattr(chunks, "__aiter__"):
+            iterator = chunks.__aiter__()
+
+            async def next_chunk():
+                try:
+                    return await iterator.__anext__()
+                except StopAsyncIteration:
+                    return _END_OF_STREAM
+        else:
+            iterator = iter(chunks)
+
+            async def next_chunk():
+                return await asyncio.to_thread(next, iterator, _END_OF_STREAM)
+
+        while True:
+            chunk = await asyncio.wait_for(next_chunk(), timeout=timeout)
+            if chunk is _END_OF_STREAM:
+                break
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+
+
+async def stream_structured(
+    prompt: str,
+    output_schema: Type[BaseModel],
+    *,
+    config: Any = None,
+    model: Any = None,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[BaseModel]:
+    """
+    Streams a structured response. Yields partial instances of
+    `output_schema` (every field optional) as fields complete, then the
+    validated full instance as the last item.
+    """
+    parser = IncrementalJsonParser(output_schema)
+    async for text in stream(prompt, config=config, model=model, timeout=timeout, output_schema=output_schema):
+        partial = parser.feed(text)
+        if partial is not None:
+            yield partial
+    yield parser.result()
@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from genkit.plugins import googleai
+from pydantic import BaseModel
+
+from app.core import metrics, model_backends, model_gateway
+from app.core.json_stream import loads_tolerant
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+# Name of the faster, cheaper model on the googleai plugin; the strong tier
+# is the gateway's default model
+MODEL_FAST_TIER = os.getenv("MODEL_FAST_TIER", "gemini_flash")
+# Answers scoring below this confidence are retried on the next tier
+MODEL_ROUTING_MIN_CONFIDENCE = float(os.getenv("MODEL_ROUTING_MIN_CONFIDENCE", "0.5"))
+# Per-flow overrides of the tier order as JSON, e.g. '{"extractResumeEntities": ["strong"]}'
+MODEL_ROUTES = json.loads(os.getenv("MODEL_ROUTES", "{}"))
+
+FAST = "fast"
+STRONG = "strong"
+
+# Flows whose output is simple enough for the fast tier to answer first.
+# Flows not listed here always use the strong tier.
+DEFAULT_ROUTES: Dict[str, List[str]] = {
+    "extractJobRequirements": [FAST, STRONG],
+    "extractResumeEntities": [FAST, STRONG],
+    "extract_job_details_from_email": [FAST, STRONG],
+    "suggestKeywordPlacement": [FAST, STRONG],
+    "atsSemanticAnalysis": [FAST, STRONG],
+}
+
+
+def _select_fast_model() -> Optional[Any]:
+    """
+    Returns the fast tier's model, or None when the googleai plugin has no
+    model named MODEL_FAST_TIER. Falling back to the strong model would call
+    it twice on every escalation, so the fast tier is skipped instead.
+    """
+    model = getattr(googleai, MODEL_FAST_TIER, None)
+    if model is None:
+        logger.error("MODEL_FAST_TIER '%s' is not a googleai model; every flow will use the strong tier only", MODEL_FAST_TIER)
+        return None
+    # MODEL_BACKEND=record/replay applies to the fast tier too
+    return model_backends.select_model(model)
+
+
+fast_model = _select_fast_model()
+
+
+def completeness(output: Any) -> float:
+    """Share of the output's top-level fields that are present and non-empty."""
+    data = output.model_dump() if isinstance(output, BaseModel) else output
+    if not isinstance(data, dict) or not data:
+        return 0.0
+    return sum(1 for value in data.values() if value not in (None, "", [], {})) / len(data)
+
+
+class ModelRouter:
+    """
+    Routes each flow's model calls through a list of tiers, cheapest first.
+    An answer is accepted from a tier when it parses, validates against the
+    flow's schema and scores at least `min_confidence`; otherwise, or when
+    the tier's call fails, the call is escalated to the next tier. The last
+    tier's answer (or error) is final.
+    """
+
+    def __init__(self, routes: Dict[str, List[str]], enabled: bool = True, min_confidence: float = MODEL_ROUTING_MIN_CONFIDENCE):
+        self.routes = routes
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+
+    def tiers(self, flow: str) -> List[str]:
+        if not self.enabled:
+            return [STRONG]
+        tiers = self.routes.get(flow) or [STRONG]
+        if fast_model is None:
+            tiers = [tier for tier in tiers if tier != FAST] or [STRONG]
+        return tiers
+
+    @staticmethod
+    def _model(tier: str) -> Any:
+        # None lets the gateway use its default (strong) model
+        return fast_model if tier == FAST else None
+
+    async def generate(
+        self,
+        flow: str,
+        prompt: str,
+        output_schema: Optional[Type[BaseModel]] = None,
+        *,
+        config: Any = None,
+        confidence: Optional[Callable[[Any], float]] = None,
+    ) -> Any:
+        """
+        Generates and parses a structured answer for `flow`. Returns an
+        instance of `output_schema`, or the parsed JSON when no schema is given.
+        """
+        tiers = self.tiers(flow)
+        for index, tier in enumerate(tiers):
+            final = index == len(tiers) - 1
+            try:
+                response = await model_gateway.generate(prompt, output_schema=output_schema, config=config, model=self._model(tier))
+            except Exception as e:
+                if final:
+                    raise
+                logger.warning("Model call for %s failed on the %s tier, escalating: %s", flow, tier, e)
+                metrics.record_model_escalation(flow, tier, "error")
+                continue
+            try:
+                if output_schema is not None:
+                    output = model_gateway.structured_output(response, output_schema)
+                else:
+                    output = loads_tolerant(response.text())
+            except Exception:
+                if final:
+                    raise
+                metrics.record_model_escalation(flow, tier, "invalid")
+                continue
+
+            if not final and confidence is not None and confidence(output) < self.min_confidence:
+                metrics.record_model_escalation(flow, tier, "low_confidence")
+                continue
+            metrics.record_model_route(flow, tier)
+            return output
+
+
+model_router = ModelRouter({**DEFAULT_ROUTES, **MODEL_ROUTES}, enabled=MODEL_ROUTING_ENABLED)
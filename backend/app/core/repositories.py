@@ -0,0 +1,227 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from google.cloud.firestore import SERVER_TIMESTAMP
+
+from app.core.db import async_db
+from app.core.lazy import LazyClient
+
+# Firestore rejects batches with more writes than this
+FIRESTORE_MAX_BATCH_WRITES = 500
+
+Document = Dict[str, Any]
+
+
+class Repository:
+    """
+    Base class of the async Firestore repositories. Every read and write is
+    awaited on the shared AsyncClient, so request handlers never block the
+    event loop on Firestore.
+    """
+
+    def __init__(self, client: LazyClient = async_db):
+        self.client = client
+
+    def _user(self, uid: str):
+        return self.client.collection("users").document(uid)
+
+    @staticmethod
+    async def _get(ref, field_paths: Optional[Iterable[str]] = None) -> Optional[Document]:
+        snapshot = await ref.get(field_paths=field_paths)
+        return snapshot.to_dict() if snapshot.exists else None
+
+    async def _get_many(self, refs: Sequence, field_paths: Optional[Iterable[str]] = None) -> Dict[str, Optional[Document]]:
+        """
+        Reads documents in a single `get_all` round-trip. Returns them by ID
+        in the order requested, with None for documents that do not exist.
+        """
+        if not refs:
+            return {}
+        found = {}
+        async for snapshot in self.client.get_all(list(refs), field_paths=field_paths):
+            found[snapshot.id] = snapshot.to_dict() if snapshot.exists else None
+        return {ref.id: found.get(ref.id) for ref in refs}
+
+    async def _set_many(self, writes: Sequence[Tuple[Any, Document]], merge: bool = False) -> None:
+        """Writes documents in as few batches as Firestore allows."""
+        for start in range(0, len(writes), FIRESTORE_MAX_BATCH_WRITES):
+            batch = self.client.batch()
+            for ref, data in writes[start:start + FIRESTORE_MAX_BATCH_WRITES]:
+                batch.set(ref, data, merge=merge)
+            await batch.commit()
+
+
+class UserRepository(Repository):
+    """Top-level `users/{uid}` documents."""
+
+    async def get(self, uid: str, field_paths: Optional[Iterable[str]] = None) -> Optional[Document]:
+        return await self._get(self._user(uid), field_paths)
+
+    async def create(self, uid: str, data: Document) -> Document:
+        """Creates the user's document; raises `AlreadyExists` if it exists."""
+        ref = self._user(uid)
+        await ref.create(data)
+        return await self._get(ref)
+
+    async def merge(self, uid: str, data: Document) -> None:
+        await self._user(uid).set(data, merge=True)
+
+
+class DocumentRepository(Repository):
+    """Uploaded and generated documents in `users/{uid}/documents`."""
+
+    def _collection(self, uid: str):
+        return self._user(uid).collection("documents")
+
+    async def get(self, uid: str, document_id: str, field_paths: Optional[Iterable[str]] = None) -> Optional[Document]:
+        return await self._get(self._collection(uid).document(document_id), field_paths)
+
+    async def get_many(self, uid: str, document_ids: Sequence[str], field_paths: Optional[Iterable[str]] = None) -> Dict[str, Optional[Document]]:
+        return await self._get_many([self._collection(uid).document(i) for i in document_ids], field_paths)
+
+    async def create(self, uid: str, data: Document) -> Document:
+        """Saves a new document under a generated ID and returns its record."""
+        document_id = str(uuid.uuid4())
+        record = {"id": document_id, **data, "createdAt": SERVER_TIMESTAMP}
+        await self._collection(uid).document(document_id).set(record)
+        return record
+
+
+class ProfileRepository(Repository):
+    """Profile variations in `users/{uid}/profiles`."""
+
+    async def get_variation(self, uid: str, profile_variation_id: str) -> Optional[Document]:
+        return await self._get(self._user(uid).collection("profiles").document(profile_variation_id))
+
+
+class AnalysisRepository(Repository):
+    """ATS analyses of a document in `users/{uid}/documents/{id}/analyses`."""
+
+    def _collection(self, uid: str, document_id: str):
+        return self._user(uid).collection("documents").document(document_id).collection("analyses")
+
+    async def create_many(self, uid: str, document_id: str, analyses: Sequence[Document]) -> List[str]:
+        """Saves the analyses in batched writes and returns their new IDs, in order."""
+        collection = self._collection(uid, document_id)
+        ids = [str(uuid.uuid4()) for _ in analyses]
+        writes = [
+            (collection.document(analysis_id), {"id": analysis_id, "createdAt": SERVER_TIMESTAMP, **analysis})
+            for analysis_id, analysis in zip(ids, analyses)
+        ]
+        await self._set_many(writes)
+        return ids
+
+    async def create(self, uid: str, document_id: str, analysis: Document) -> str:
+        return (await self.create_many(uid, document_id, [analysis]))[0]
+
+
+def encode_cursor(found_at: datetime, opportunity_id: str) -> str:
+    """Opaque cursor pointing just after the given opportunity in listing order."""
+    payload = json.dumps({"foundAt": found_at.isoformat(), "id": opportunity_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of `encode_cursor`; raises ValueError for malformed cursors."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(payload["foundAt"]), str(payload["id"])
+    except Exception as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+class OpportunityRepository(Repository):
+    """
+    Job opportunities found for a user, in `users/{uid}/opportunities`.
+    Listings are ordered by `found_at`, newest first, with the document ID
+    breaking ties. The filtered orderings are backed by the composite
+    indexes in firestore.indexes.json.
+
+    Firestore leaves documents without the ordering field out of ordered
+    queries, so every opportunity must have `found_at`: the scanner sets it
+    on creation, other writers only update existing documents, and
+    `backfill_found_at` repairs documents written before that.
+    """
+
+    def _collection(self, uid: str):
+        return self._user(uid).collection("opportunities")
+
+    async def get_many(self, uid: str, opportunity_ids: Sequence[str]) -> Dict[str, Optional[Document]]:
+        collection = self._collection(uid)
+        return await self._get_many([collection.document(i) for i in opportunity_ids])
+
+    def _query(self, uid: str, status: Optional[str], company: Optional[str], fields: Optional[Sequence[str]]):
+        query = self._collection(uid)
+        if status is not None:
+            query = query.where("status", "==", status)
+        if company is not None:
+            query = query.where("company", "==", company)
+        if fields:
+            # The cursor needs `found_at`, whatever the caller asked for
+            query = query.select(sorted({*fields, "found_at"}))
+        return query.order_by("found_at", direction="DESCENDING").order_by("__name__", direction="DESCENDING")
+
+    async def page(
+        self,
+        uid: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        company: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Document], Optional[str]]:
+        """
+        Returns up to `limit` opportunities after `cursor`, and the cursor of
+        the next page (None on the last page). With `fields`, only those
+        fields (plus `id` and `found_at`) are read.
+        """
+        query = self._query(uid, status, company, fields)
+        if cursor:
+            found_at, opportunity_id = decode_cursor(cursor)
+            query = query.start_after({"found_at": found_at, "__name__": opportunity_id})
+        # One extra document tells whether another page follows
+        items = [{**snapshot.to_dict(), "id": snapshot.id} async for snapshot in query.limit(limit + 1).stream()]
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        return items, encode_cursor(items[-1]["found_at"], items[-1]["id"])
+
+    async def backfill_found_at(self, uid: str) -> int:
+        """
+        Sets `found_at` to the creation time of every opportunity missing it,
+        so it shows up in listings. Returns the number of documents fixed.
+        """
+        writes = [
+            (snapshot.reference, {"found_at": snapshot.create_time})
+            async for snapshot in self._collection(uid).select(["found_at"]).stream()
+            if (snapshot.to_dict() or {}).get("found_at") is None
+        ]
+        await self._set_many(writes, merge=True)
+        return len(writes)
+
+    async def stream(
+        self,
+        uid: str,
+        status: Optional[str] = None,
+        company: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        page_size: int = 500,
+    ) -> AsyncIterator[Document]:
+        """Yields every matching opportunity, reading one page at a time."""
+        cursor = None
+        while True:
+            items, cursor = await self.page(uid, page_size, cursor, status=status, company=company, fields=fields)
+            for item in items:
+                yield item
+            if cursor is None:
+                return
+
+
+user_repository = UserRepository()
+document_repository = DocumentRepository()
+profile_repository = ProfileRepository()
+analysis_repository = AnalysisRepository()
+opportunity_repository = OpportunityRepository()
@@ -2,9 +2,12 @@ from google.cloud import secretmanager
 from google.api_core.exceptions import NotFound
 import os
 
+from app.core.lazy import LazyClient
+
 # Get the project ID from the environment
 GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-client = secretmanager.SecretManagerServiceClient()
+# Built on first use or during the startup warm-up, not at import time
+client = LazyClient(secretmanager.SecretManagerServiceClient)
 
 def save_user_secret(user_id: str, secret_name: str, secret_value: str) -> str:
     """
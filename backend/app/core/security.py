@@ -1 +1,345 @@
-# Security related utilities will go here
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+import firebase_admin
+import httpx
+from firebase_admin import auth, credentials
+from google.auth import jwt
+from starlette.requests import Request
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Maximum number of decoded ID tokens kept per worker process
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+# A cached token is re-verified, including the revocation check, at most this
+# many seconds after it was last verified. 0 disables the cache.
+TOKEN_REVOCATION_WINDOW_SECONDS = float(os.getenv("TOKEN_REVOCATION_WINDOW_SECONDS", "300"))
+# Ask Firebase whether the token (or its user) was revoked when verifying. Off
+# by default: the lookup is a blocking Admin SDK round trip on every cache
+# miss, and a revoked token is still rejected once it expires.
+TOKEN_CHECK_REVOKED = os.getenv("TOKEN_CHECK_REVOKED", "false").lower() == "true"
+# Project whose ID tokens are accepted. Without it, tokens are verified by
+# the Admin SDK in a worker thread instead of locally.
+FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID") or os.getenv("GOOGLE_CLOUD_PROJECT")
+# Google's x509 certificates that sign Firebase ID tokens
+ID_TOKEN_CERTS_URL = os.getenv(
+    "ID_TOKEN_CERTS_URL",
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com",
+)
+# Refresh the certificates this many seconds before the cached copy expires
+SIGNING_KEYS_REFRESH_MARGIN_SECONDS = float(os.getenv("SIGNING_KEYS_REFRESH_MARGIN_SECONDS", "300"))
+# Tokens signed with an unknown key trigger a refresh at most this often
+SIGNING_KEYS_MIN_REFRESH_INTERVAL_SECONDS = float(os.getenv("SIGNING_KEYS_MIN_REFRESH_INTERVAL_SECONDS", "60"))
+TOKEN_CLOCK_SKEW_SECONDS = int(os.getenv("TOKEN_CLOCK_SKEW_SECONDS", "5"))
+
+_firebase_lock = Lock()
+
+
+class AuthenticationError(Exception):
+    """Raised when a request carries no valid Firebase ID token."""
+
+
+def init_firebase() -> None:
+    """Initializes the Firebase Admin SDK once per process with Application Default Credentials."""
+    if firebase_admin._apps:
+        return
+    with _firebase_lock:
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app(credentials.ApplicationDefault())
+
+
+def token_hash(token: str) -> str:
+    # Raw tokens are bearer credentials: never keep them as cache keys
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of decoded ID tokens, keyed by token hash. An entry is
+    dropped when the token expires or when the revocation window since its
+    verification has passed, whichever comes first.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES, revocation_window: float = TOKEN_REVOCATION_WINDOW_SECONDS):
+        self.max_entries = max_entries
+        self.revocation_window = revocation_window
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = token_hash(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        if self.revocation_window <= 0 or self.max_entries <= 0:
+            return
+        expires_at = min(float(claims.get("exp", 0)), time.time() + self.revocation_window)
+        key = token_hash(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token_hash(token), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class SigningKeys:
+    """
+    Google's public certificates for Firebase ID tokens, fetched with an async
+    HTTP client and refreshed in the background before they expire, so that
+    signatures are checked locally without blocking the event loop.
+    """
+
+    def __init__(self, url: str = ID_TOKEN_CERTS_URL, refresh_margin: float = SIGNING_KEYS_REFRESH_MARGIN_SECONDS):
+        self.url = url
+        self.refresh_margin = refresh_margin
+        self.certs: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def fresh(self) -> bool:
+        return bool(self.certs) and time.time() < self._expires_at
+
+    async def refresh(self, force: bool = False) -> None:
+        async with self._lock:
+            now = time.time()
+            if force:
+                if now - self._fetched_at < SIGNING_KEYS_MIN_REFRESH_INTERVAL_SECONDS:
+                    return
+            elif self.fresh() and self._expires_at - now > self.refresh_margin:
+                # Another caller refreshed while this one waited for the lock
+                return
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+            self.certs = response.json()
+            self._fetched_at = time.time()
+            self._expires_at = self._fetched_at + _max_age(response.headers.get("cache-control"))
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+                delay = max(self._expires_at - time.time() - self.refresh_margin, SIGNING_KEYS_MIN_REFRESH_INTERVAL_SECONDS)
+            except Exception as e:
+                logger.warning("Failed to refresh ID token signing keys: %s", e)
+                delay = SIGNING_KEYS_MIN_REFRESH_INTERVAL_SECONDS
+            await asyncio.sleep(delay)
+
+    def start(self) -> None:
+        """Starts refreshing the keys in the background; call from the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _max_age(cache_control: Optional[str]) -> float:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return float(match.group(1)) if match else 3600.0
+
+
+signing_keys = SigningKeys()
+
+
+def _key_id(token: str) -> Optional[str]:
+    """Reads the signing key id from the token header, without verifying anything."""
+    try:
+        header = token.split(".", 1)[0]
+        return json.loads(base64.urlsafe_b64decode(header + "=" * (-len(header) % 4))).get("kid")
+    except Exception:
+        return None
+
+
+def decode_locally(token: str, certs: Dict[str, str], project_id: str) -> dict:
+    """
+    Verifies a Firebase ID token's signature, expiry, audience, issuer and
+    subject against the given certificates, as the Admin SDK does.
+    """
+    claims = jwt.decode(token, certs=certs, audience=project_id, clock_skew_in_seconds=TOKEN_CLOCK_SKEW_SECONDS)
+    if claims.get("iss") != f"https://securetoken.google.com/{project_id}":
+        raise ValueError("ID token has an incorrect issuer.")
+    subject = claims.get("sub")
+    if not isinstance(subject, str) or not subject or len(subject) > 128:
+        raise ValueError("ID token has an invalid subject.")
+    if claims.get("auth_time", 0) > time.time() + TOKEN_CLOCK_SKEW_SECONDS:
+        raise ValueError("ID token has an auth_time in the future.")
+    return {**claims, "uid": subject}
+
+
+def _check_revoked(claims: dict) -> None:
+    """Blocking Admin SDK lookup: rejects tokens of disabled users or issued before a revocation."""
+    init_firebase()
+    user = auth.get_user(claims["uid"])
+    if user.disabled:
+        raise AuthenticationError("The user account is disabled.")
+    valid_after_ms = user.tokens_valid_after_timestamp
+    if valid_after_ms and claims.get("iat", 0) * 1000 < valid_after_ms:
+        raise AuthenticationError("The ID token has been revoked.")
+
+
+def _verify_with_admin_sdk(token: str) -> dict:
+    init_firebase()
+    return auth.verify_id_token(token, check_revoked=TOKEN_CHECK_REVOKED)
+
+
+async def verify_token_async(token: str) -> dict:
+    """
+    Non-blocking `verify_token`. Signatures are checked locally against the
+    pre-fetched signing keys; only the revocation lookup (on cache misses)
+    runs in a worker thread.
+    """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    try:
+        if not FIREBASE_PROJECT_ID:
+            claims = await asyncio.to_thread(_verify_with_admin_sdk, token)
+        else:
+            if not signing_keys.fresh():
+                await signing_keys.refresh()
+            elif _key_id(token) not in signing_keys.certs:
+                # The keys may have rotated since the last refresh
+                await signing_keys.refresh(force=True)
+            claims = decode_locally(token, signing_keys.certs, FIREBASE_PROJECT_ID)
+            if TOKEN_CHECK_REVOKED:
+                await asyncio.to_thread(_check_revoked, claims)
+    except AuthenticationError:
+        raise
+    except Exception as e:
+        raise AuthenticationError(str(e)) from e
+    token_cache.put(token, claims)
+    return claims
+
+
+def verify_token(token: str) -> dict:
+    """Returns the decoded claims of a Firebase ID token, from the cache when possible."""
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    try:
+        claims = _verify_with_admin_sdk(token)
+    except Exception as e:
+        raise AuthenticationError(str(e)) from e
+    token_cache.put(token, claims)
+    return claims
+
+
+def bearer_token(request: Request) -> Optional[str]:
+    auth_header = request.headers.get("authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    return auth_header.split(" ", 1)[1].strip() or None
+
+
+def _request_outcome(request: Request) -> Optional[dict]:
+    """Returns the claims already verified for this request, or re-raises its recorded failure."""
+    error = getattr(request.state, "auth_error", None)
+    if error is not None:
+        raise error
+    return getattr(request.state, "user", None)
+
+
+def _record_outcome(request: Request, claims: Optional[dict] = None, error: Optional[AuthenticationError] = None) -> None:
+    if error is not None:
+        request.state.auth_error = error
+    else:
+        request.state.user = claims
+
+
+def verify_request(request: Request, token: Optional[str] = None) -> dict:
+    """
+    Returns the claims of the request's bearer token. The outcome is stored
+    on `request.state`, so the rate limiter key function and the endpoint's
+    dependency share a single verification (or failure) per request.
+    """
+    claims = _request_outcome(request)
+    if claims is not None:
+        return claims
+    token = token or bearer_token(request)
+    try:
+        if not token:
+            raise AuthenticationError("Not authenticated")
+        claims = verify_token(token)
+    except AuthenticationError as e:
+        _record_outcome(request, error=e)
+        raise
+    _record_outcome(request, claims)
+    return claims
+
+
+async def verify_request_async(request: Request, token: Optional[str] = None) -> dict:
+    """Non-blocking `verify_request`."""
+    claims = _request_outcome(request)
+    if claims is not None:
+        return claims
+    token = token or bearer_token(request)
+    try:
+        if not token:
+            raise AuthenticationError("Not authenticated")
+        claims = await verify_token_async(token)
+    except AuthenticationError as e:
+        _record_outcome(request, error=e)
+        raise
+    _record_outcome(request, claims)
+    return claims
+
+
+class AuthenticationMiddleware:
+    """
+    ASGI middleware that verifies the bearer token, if any, before routing.
+    Verification is async, so the synchronous slowapi key functions and the
+    endpoint dependencies only read the outcome from the request state.
+    Missing or invalid tokens are rejected later by `get_current_user`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            request = Request(scope)
+            if bearer_token(request):
+                try:
+                    await verify_request_async(request)
+                except AuthenticationError:
+                    pass
+        await self.app(scope, receive, send)
@@ -0,0 +1,229 @@
+import asyncio
+import inspect
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from app.core.flow_cache import content_key
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+# Coalesce identical calls across workers through a Firestore lease record
+SINGLEFLIGHT_DISTRIBUTED = os.getenv("SINGLEFLIGHT_DISTRIBUTED", "false").lower() == "true"
+SINGLEFLIGHT_LEASE_COLLECTION = os.getenv("SINGLEFLIGHT_LEASE_COLLECTION", "flowLeases")
+# How long a worker may hold a lease before others assume it died and take over
+SINGLEFLIGHT_LEASE_TTL_SECONDS = int(os.getenv("SINGLEFLIGHT_LEASE_TTL_SECONDS", "120"))
+# How long a finished result stays readable by workers that were waiting on it
+SINGLEFLIGHT_RESULT_TTL_SECONDS = int(os.getenv("SINGLEFLIGHT_RESULT_TTL_SECONDS", "60"))
+SINGLEFLIGHT_POLL_INTERVAL_SECONDS = float(os.getenv("SINGLEFLIGHT_POLL_INTERVAL_SECONDS", "0.5"))
+
+
+class SingleFlightError(Exception):
+    """Raised to callers that waited on another worker's call when that call failed."""
+
+
+class FirestoreLease:
+    """
+    Cross-worker lease stored in a Firestore document per call key. The worker
+    that creates the document runs the call and writes the result (or error)
+    back; other workers poll the document until it finishes or the lease
+    expires, in which case one of them takes over.
+    """
+
+    def __init__(self, collection: str = SINGLEFLIGHT_LEASE_COLLECTION, ttl_seconds: int = SINGLEFLIGHT_LEASE_TTL_SECONDS):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.owner = uuid.uuid4().hex
+
+    def _ref(self, key: str):
+        # Imported lazily so per-process coalescing works without a Firestore client
+        from app.core.db import db
+
+        return db.collection(self.collection).document(key)
+
+    def acquire(self, key: str) -> Optional[dict]:
+        """
+        Tries to take the lease. Returns None if this worker now holds it,
+        or the current lease document if another worker does.
+        """
+        from google.api_core.exceptions import AlreadyExists, FailedPrecondition
+        from app.core.db import db
+
+        ref = self._ref(key)
+        lease = {
+            "status": "running",
+            "owner": self.owner,
+            "expiresAt": datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds),
+        }
+        try:
+            ref.create(lease)
+            return None
+        except AlreadyExists:
+            pass
+
+        snapshot = ref.get()
+        current = snapshot.to_dict() if snapshot.exists else None
+        if current and current["expiresAt"] > datetime.now(timezone.utc):
+            return current
+        # The previous holder died or its result expired: take over, unless
+        # another worker got there first
+        try:
+            if snapshot.exists:
+                ref.set(lease, option=db.write_option(last_update_time=snapshot.update_time))
+            else:
+                ref.create(lease)
+            return None
+        except (AlreadyExists, FailedPrecondition):
+            return ref.get().to_dict()
+
+    def read(self, key: str) -> Optional[dict]:
+        snapshot = self._ref(key).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def release(self, key: str, value: Any = None, error: Optional[str] = None) -> None:
+        try:
+            self._ref(key).set({
+                "status": "error" if error is not None else "done",
+                "owner": self.owner,
+                "value": value,
+                "error": error,
+                "expiresAt": datetime.now(timezone.utc) + timedelta(seconds=SINGLEFLIGHT_RESULT_TTL_SECONDS),
+            })
+        except Exception as e:
+            logger.warning("Failed to release flow lease %s: %s", key, e)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls. The first caller for a key runs the
+    call; callers arriving while it is in flight await the same future and get
+    the same result or exception. With a lease, calls are also coalesced
+    across workers.
+    """
+
+    def __init__(self, lease: Optional[FirestoreLease] = None, enabled: bool = True):
+        self.lease = lease
+        self.enabled = enabled
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = Lock()
+
+    def _count(self, namespace: str, counter: str) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(namespace, {"calls": 0, "executed": 0, "collapsed": 0, "remote_collapsed": 0})
+            stats[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns call counters per namespace and the number of calls in flight."""
+        with self._stats_lock:
+            flows = {namespace: dict(counters) for namespace, counters in self._stats.items()}
+        return {"in_flight": len(self._in_flight), "flows": flows}
+
+    async def do(
+        self,
+        namespace: str,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        model: Optional[Type[BaseModel]] = None,
+    ) -> Any:
+        """Runs `fn` unless an identical call (same namespace and key) is already in flight."""
+        if not self.enabled:
+            return await fn()
+        self._count(namespace, "calls")
+        flight = (namespace, key)
+        task = self._in_flight.get(flight)
+        if task is not None:
+            self._count(namespace, "collapsed")
+        else:
+            # The call runs in its own task, so a caller that is cancelled
+            # (e.g. a client disconnect) does not cancel it for the others
+            task = asyncio.ensure_future(self._run(namespace, key, fn, model))
+            self._in_flight[flight] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(flight, None))
+        return await asyncio.shield(task)
+
+    async def _run(self, namespace: str, key: str, fn: Callable[[], Awaitable[Any]], model: Optional[Type[BaseModel]]) -> Any:
+        if self.lease is None:
+            self._count(namespace, "executed")
+            return await fn()
+
+        while True:
+            try:
+                current = await asyncio.to_thread(self.lease.acquire, key)
+            except Exception as e:
+                # Coalescing is an optimization: never fail the call because of it
+                logger.warning("Flow lease unavailable for %s, running locally: %s", namespace, e)
+                self._count(namespace, "executed")
+                return await fn()
+
+            if current is None:
+                return await self._run_with_lease(namespace, key, fn)
+
+            # Another worker is running the call: wait for its result
+            while current and current["status"] == "running" and current["expiresAt"] > datetime.now(timezone.utc):
+                await asyncio.sleep(SINGLEFLIGHT_POLL_INTERVAL_SECONDS)
+                try:
+                    current = await asyncio.to_thread(self.lease.read, key)
+                except Exception as e:
+                    logger.warning("Flow lease unreadable for %s, running locally: %s", namespace, e)
+                    self._count(namespace, "executed")
+                    return await fn()
+            if current and current["status"] == "done":
+                self._count(namespace, "remote_collapsed")
+                value = current.get("value")
+                return model.model_validate(value) if model is not None and value is not None else value
+            if current and current["status"] == "error":
+                self._count(namespace, "remote_collapsed")
+                raise SingleFlightError(current.get("error"))
+            # The lease expired without a result: try to take it over
+
+    async def _run_with_lease(self, namespace: str, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self._count(namespace, "executed")
+        try:
+            result = await fn()
+        except Exception as e:
+            await self._release(key, None, str(e))
+            raise
+        value = result.model_dump() if isinstance(result, BaseModel) else result
+        await self._release(key, value)
+        return result
+
+    async def _release(self, key: str, value: Any = None, error: Optional[str] = None) -> None:
+        # The call already finished: waiting workers take over once the lease expires
+        try:
+            await asyncio.to_thread(self.lease.release, key, value, error)
+        except Exception as e:
+            logger.warning("Failed to release flow lease %s: %s", key, e)
+
+    def coalesce(self, namespace: str, model: Optional[Type[BaseModel]] = None, ignore: Iterable[str] = ()) -> Callable:
+        """
+        Decorator that coalesces concurrent calls of an async flow whose
+        (normalized) arguments are identical. Arguments named in `ignore`
+        don't take part in the key.
+        """
+        ignore = set(ignore)
+
+        def decorator(fn: Callable) -> Callable:
+            signature = inspect.signature(fn)
+
+            @wraps(fn)
+            async def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = content_key(namespace, "singleflight", *(v for k, v in bound.arguments.items() if k not in ignore))
+                return await self.do(namespace, key, lambda: fn(*args, **kwargs), model)
+
+            return wrapper
+
+        return decorator
+
+
+singleflight = SingleFlight(lease=FirestoreLease() if SINGLEFLIGHT_DISTRIBUTED else None, enabled=SINGLEFLIGHT_ENABLED)
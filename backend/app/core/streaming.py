@@ -0,0 +1,24 @@
+import json
+from typing import Any, Optional
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Disables proxy buffering so each event reaches the client immediately
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def ndjson_line(payload: Any) -> str:
+    """Serializes a payload as a single newline-delimited JSON record."""
+    return json.dumps(payload, default=str) + "\n"
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    """Formats a payload as a Server-Sent Events message."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_comment(text: str) -> str:
+    """Formats an SSE comment, used to flush headers before the first chunk."""
+    return f": {text}\n\n"
@@ -1,30 +1,62 @@
+import asyncio
 import genkit
-from genkit.plugins import googleai
+import logging
 import os
-from dotenv import load_dotenv
+from genkit.plugins import googleai
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
+
+from app.core.flow_graph import FlowGraph
+from app.core.job_registry import job_registry
+from app.core.singleflight import singleflight
+from app.core import model_gateway
+from app.core.metrics import instrumented
+from app.core.model_routing import model_router
 
 # Import the supporting flows
-from .extract_job_requirements import extractJobRequirements, JobRequirements
+from .extract_job_requirements import extractJobRequirements, JobRequirements, PROMPT_VERSION as JOB_REQUIREMENTS_VERSION
 from .extract_resume_entities import extractResumeEntities, ResumeEntities
 from .keyword_placer import suggestKeywordPlacement, KeywordPlacementSuggestion
+from .skill_matcher import match_skills
+from .semantic_similarity import local_semantic_similarity
+
+logger = logging.getLogger(__name__)
 
-# Load environment variables and initialize Genkit if needed
-load_dotenv()
-if not genkit.get_plugin("googleai"):
-    genkit.init(plugins=[googleai.init(api_key=os.getenv("GEMINI_API_KEY"))])
-gemini_pro = googleai.gemini_pro
+# --- Semantic Analysis Mode ---
+# "llm": always ask the model; "local": local NumPy similarity only;
+# "hybrid": local first, escalating to the model when the local score is borderline
+ATS_SEMANTIC_MODE = os.getenv("ATS_SEMANTIC_MODE", "llm")
+ATS_SEMANTIC_MODES = ("llm", "local", "hybrid")
+ATS_SEMANTIC_BORDERLINE_LOW = int(os.getenv("ATS_SEMANTIC_BORDERLINE_LOW", "50"))
+ATS_SEMANTIC_BORDERLINE_HIGH = int(os.getenv("ATS_SEMANTIC_BORDERLINE_HIGH", "80"))
+
+# --- Execution Mode ---
+# "graph": separate model calls for each extraction and analysis step;
+# "fused": one model call returning every model-derived input, with the
+# keyword and formatting scores still computed locally
+ATS_EXECUTION_MODE = os.getenv("ATS_EXECUTION_MODE", "graph")
+ATS_EXECUTION_MODES = ("graph", "fused")
+
+# Maximum number of job descriptions scored in parallel by a batch request
+ATS_BATCH_MAX_CONCURRENCY = int(os.getenv("ATS_BATCH_MAX_CONCURRENCY", "5"))
 
 # --- Helper Functions for Scoring Logic ---
 
-def _calculate_keyword_score(resume_skills: List[str], job_reqs: JobRequirements, profile_keywords: List[str] = None):
-    """Calculates a score based on keyword matching."""
-    required_matched = [skill for skill in job_reqs.requiredSkills if skill.lower() in (s.lower() for s in resume_skills)]
-    preferred_matched = [skill for skill in job_reqs.preferredSkills if skill.lower() in (s.lower() for s in resume_skills)]
+def _calculate_keyword_score(resume_skills: List[str], job_reqs: JobRequirements, profile_keywords: List[str] = None, resume_text: str = None):
+    """
+    Calculates a score based on keyword matching. Skills are compared through
+    the precompiled skill index, so aliases ("JS" / "JavaScript") and
+    multi-word skills found in the resume text count as matches.
+    """
+    # Single pass over the resume skills and text for both skill lists
+    match = match_skills(job_reqs.requiredSkills + job_reqs.preferredSkills, resume_skills, resume_text)
+    matched = set(match["matched"])
+
+    required_matched = [skill for skill in job_reqs.requiredSkills if skill in matched]
+    preferred_matched = [skill for skill in job_reqs.preferredSkills if skill in matched]
     
-    missing_required = [skill for skill in job_reqs.requiredSkills if skill.lower() not in (s.lower() for s in resume_skills)]
-    missing_preferred = [skill for skill in job_reqs.preferredSkills if skill.lower() not in (s.lower() for s in resume_skills)]
+    missing_required = [skill for skill in job_reqs.requiredSkills if skill not in matched]
+    missing_preferred = [skill for skill in job_reqs.preferredSkills if skill not in matched]
 
     # Scoring logic: 80% weight for required, 20% for preferred
     required_score = (len(required_matched) / len(job_reqs.requiredSkills)) * 0.8 if job_reqs.requiredSkills else 0.8
@@ -35,7 +67,8 @@ def _calculate_keyword_score(resume_skills: List[str], job_reqs: JobRequirements
     return {
         "score": min(score, 100),
         "matchedKeywords": required_matched + preferred_matched,
-        "missingKeywords": missing_required + missing_preferred
+        "missingKeywords": missing_required + missing_preferred,
+        "matchPositions": match["positions"]
     }
 
 def _calculate_formatting_score(resume_entities: ResumeEntities):
@@ -51,6 +84,16 @@ class SemanticAnalysis(BaseModel):
     similarityScore: int = Field(description="A score from 0-100 representing how semantically similar the resume is to the job description.")
     explanation: str = Field(description="A brief explanation for the given score.")
 
+class FusedAtsAnalysis(BaseModel):
+    """Every model-derived input of the ATS score, produced by a single call."""
+    jobRequirements: JobRequirements
+    resumeEntities: ResumeEntities
+    semanticAnalysis: SemanticAnalysis
+    keywordPlacementSuggestions: List[KeywordPlacementSuggestion] = Field(
+        default_factory=list,
+        description="Placement suggestions for job skills that the resume does not mention.",
+    )
+
 # --- Main Flow Output Schema ---
 
 class ScoreBreakdown(BaseModel):
@@ -65,38 +108,94 @@ class AtsResult(BaseModel):
     missingKeywords: List[str]
     recommendations: List[str]
     keyword_placement_suggestions: Optional[List[KeywordPlacementSuggestion]] = None
+    # Character offsets of each matched keyword in the resume text
+    keywordMatchPositions: Optional[Dict[str, List[List[int]]]] = None
 
 
-@genkit.flow(output_schema=AtsResult)
-async def atsScoring(resumeText: str, jobDescription: str, profileKeywords: List[str] = None) -> AtsResult:
-    """
-    Performs a comprehensive ATS-style analysis of a resume against a job description.
-    """
-    # Step 1 & 2: Extract structured data from both inputs in parallel
-    job_reqs_future = extractJobRequirements.run(jobDescription=jobDescription)
-    resume_entities_future = extractResumeEntities.run(resumeText=resumeText)
-    job_reqs: JobRequirements = await job_reqs_future
-    resume_entities: ResumeEntities = await resume_entities_future
-
-    # Step 3: Perform Semantic Relevance analysis
+async def _llm_semantic_analysis(resumeText: str, jobDescription: str) -> SemanticAnalysis:
+    """Asks the model for a semantic similarity score between the two texts."""
     semantic_prompt = f"""
     Compare the resume against the job description. Provide a semantic similarity score from 0-100 and a brief explanation.
     Resume: "{resumeText}"
     Job Description: "{jobDescription}"
     """
-    semantic_response = await gemini_pro.generate(
-        prompt=semantic_prompt,
-        output_schema=SemanticAnalysis,
-        config=googleai.GenerationConfig(response_mime_type="application/json")
+    return await model_router.generate(
+        "atsSemanticAnalysis",
+        semantic_prompt,
+        SemanticAnalysis,
+        config=googleai.GenerationConfig(response_mime_type="application/json"),
     )
-    semantic_analysis: SemanticAnalysis = semantic_response.output()
 
-    # Step 4: Perform Keyword Matching
-    keyword_analysis = _calculate_keyword_score(resume_entities.skills, job_reqs, profileKeywords)
+async def _semantic_analysis(resumeText: str, jobDescription: str) -> SemanticAnalysis:
+    """Computes the semantic similarity score according to ATS_SEMANTIC_MODE."""
+    if ATS_SEMANTIC_MODE not in ATS_SEMANTIC_MODES:
+        raise ValueError(f"Unknown ATS_SEMANTIC_MODE '{ATS_SEMANTIC_MODE}'; expected one of {', '.join(ATS_SEMANTIC_MODES)}.")
+    if ATS_SEMANTIC_MODE == "llm":
+        return await _llm_semantic_analysis(resumeText, jobDescription)
+
+    score, explanation = local_semantic_similarity(resumeText, jobDescription)
+    if ATS_SEMANTIC_MODE == "hybrid" and ATS_SEMANTIC_BORDERLINE_LOW <= score <= ATS_SEMANTIC_BORDERLINE_HIGH:
+        return await _llm_semantic_analysis(resumeText, jobDescription)
+    return SemanticAnalysis(similarityScore=score, explanation=explanation)
+
+async def _keyword_placement(resumeText: str, missing_keywords: List[str]) -> Optional[List[KeywordPlacementSuggestion]]:
+    """Gets keyword placement suggestions if there are missing keywords."""
+    if not missing_keywords:
+        return None
+    placement_response = await suggestKeywordPlacement.run(
+        resumeText=resumeText,
+        list_of_missing_keywords=missing_keywords
+    )
+    return placement_response.suggestions if placement_response else None
 
-    # Step 5: Perform Formatting Compliance check
-    formatting_score = _calculate_formatting_score(resume_entities)
+def _job_requirements(jobDescription: str, job_entry: Optional[dict] = None):
+    """
+    Extracts the job requirements, reusing the ones stored on the user's
+    canonical job description entry when the job came through the registry.
+    """
+    if job_entry is None:
+        return extractJobRequirements.run(jobDescription=jobDescription)
+    return job_registry.get_or_compute(
+        job_entry,
+        "requirements",
+        JOB_REQUIREMENTS_VERSION,
+        lambda: extractJobRequirements.run(jobDescription=jobDescription),
+        model=JobRequirements,
+    )
 
+def _build_ats_graph(resumeText: str, jobDescription: str, profileKeywords: List[str] = None, resume_entities: Optional[ResumeEntities] = None, job_entry: Optional[dict] = None) -> FlowGraph:
+    """
+    Builds the ATS pipeline as a dependency graph. The extraction flows and the
+    semantic analysis only depend on the raw texts, so they all start at t=0.
+    Already-extracted `resume_entities` can be passed in to skip that model call.
+    """
+    graph = FlowGraph("atsScoring")
+    graph.add("job_reqs", lambda: _job_requirements(jobDescription, job_entry))
+    if resume_entities is not None:
+        graph.add("resume_entities", lambda: resume_entities)
+    else:
+        graph.add("resume_entities", lambda: extractResumeEntities.run(resumeText=resumeText))
+    graph.add("semantic", lambda: _semantic_analysis(resumeText, jobDescription))
+    graph.add(
+        "keywords",
+        lambda job_reqs, resume_entities: _calculate_keyword_score(resume_entities.skills, job_reqs, profileKeywords, resumeText),
+        deps=["job_reqs", "resume_entities"],
+    )
+    graph.add("formatting", _calculate_formatting_score, deps=["resume_entities"])
+    graph.add(
+        "placement",
+        lambda keywords: _keyword_placement(resumeText, keywords["missingKeywords"]),
+        deps=["keywords"],
+    )
+    return graph
+
+def _combine_results(
+    semantic_analysis: SemanticAnalysis,
+    keyword_analysis: dict,
+    formatting_score: float,
+    placement_suggestions: Optional[List[KeywordPlacementSuggestion]],
+) -> AtsResult:
+    """Combines the individual analyses into the final weighted ATS result."""
     # Step 6: Combine scores using weighted average
     weights = {"keyword": 0.45, "semantic": 0.35, "formatting": 0.20}
     overall_score = (
@@ -105,16 +204,6 @@ async def atsScoring(resumeText: str, jobDescription: str, profileKeywords: List
         formatting_score * weights["formatting"]
     )
 
-    # Step 7: Get keyword placement suggestions if there are missing keywords
-    placement_suggestions = None
-    if keyword_analysis["missingKeywords"]:
-        placement_response = await suggestKeywordPlacement.run(
-            resumeText=resumeText,
-            list_of_missing_keywords=keyword_analysis["missingKeywords"]
-        )
-        if placement_response:
-            placement_suggestions = placement_response.suggestions
-
     # Step 8: Generate actionable recommendations
     recommendations = []
     if keyword_analysis["missingKeywords"]:
@@ -135,5 +224,133 @@ async def atsScoring(resumeText: str, jobDescription: str, profileKeywords: List
         matchedKeywords=keyword_analysis["matchedKeywords"],
         missingKeywords=keyword_analysis["missingKeywords"],
         recommendations=recommendations,
-        keyword_placement_suggestions=placement_suggestions
+        keyword_placement_suggestions=placement_suggestions,
+        keywordMatchPositions=keyword_analysis["matchPositions"]
     )
+
+async def _fused_ats_analysis(resumeText: str, jobDescription: str) -> FusedAtsAnalysis:
+    """Asks the model once for the requirements, entities, semantic score and placement suggestions."""
+    prompt = f"""
+    Act as an applicant tracking system and an expert resume editor. Analyze the resume against the job description
+    and return a single JSON object with:
+    1. "jobRequirements": the required skills, the preferred skills ("a plus", "desired") and the experience level of the job.
+    2. "resumeEntities": every skill in the resume, its work experience (titles, companies, durations) and its education.
+    3. "semanticAnalysis": a 0-100 semantic similarity score between the resume and the job, with a brief explanation.
+    4. "keywordPlacementSuggestions": for each required or preferred skill the resume does not mention, the best place
+       in the resume to add it and an example sentence that naturally incorporates it.
+
+    Resume:
+    ---
+    {resumeText}
+    ---
+
+    Job Description:
+    ---
+    {jobDescription}
+    ---
+    """
+    response = await model_gateway.generate(
+        prompt=prompt,
+        output_schema=FusedAtsAnalysis,
+        config=googleai.GenerationConfig(response_mime_type="application/json")
+    )
+    return model_gateway.structured_output(response, FusedAtsAnalysis)
+
+async def _run_fused_pipeline(resumeText: str, jobDescription: str, profileKeywords: List[str] = None) -> AtsResult:
+    """Scores one resume/job pair from a single fused model call."""
+    analysis = await _fused_ats_analysis(resumeText, jobDescription)
+
+    # The deterministic scores are computed locally, exactly as in graph mode
+    keyword_analysis = _calculate_keyword_score(analysis.resumeEntities.skills, analysis.jobRequirements, profileKeywords, resumeText)
+    formatting_score = _calculate_formatting_score(analysis.resumeEntities)
+
+    # Keep only the suggestions for keywords the local matcher found missing
+    missing = {keyword.casefold() for keyword in keyword_analysis["missingKeywords"]}
+    placement_suggestions = [s for s in analysis.keywordPlacementSuggestions if s.keyword.casefold() in missing]
+
+    return _combine_results(analysis.semanticAnalysis, keyword_analysis, formatting_score, placement_suggestions or None)
+
+def _execution_mode(mode: Optional[str] = None) -> str:
+    """Returns the given (or configured) execution mode, rejecting unknown ones."""
+    mode = mode or ATS_EXECUTION_MODE
+    if mode not in ATS_EXECUTION_MODES:
+        raise ValueError(f"Unknown ATS_EXECUTION_MODE '{mode}'; expected one of {', '.join(ATS_EXECUTION_MODES)}.")
+    return mode
+
+async def _run_ats_pipeline(
+    resumeText: str,
+    jobDescription: str,
+    profileKeywords: List[str] = None,
+    resume_entities: Optional[ResumeEntities] = None,
+    job_entry: Optional[dict] = None,
+    mode: Optional[str] = None,
+) -> AtsResult:
+    """Runs the ATS pipeline for one resume/job pair in the given (or configured) execution mode."""
+    if _execution_mode(mode) == "fused":
+        return await _run_fused_pipeline(resumeText, jobDescription, profileKeywords)
+
+    # Steps 1-5 & 7: Extraction, semantic analysis, keyword matching, formatting
+    # checks and keyword placement, each started as soon as its inputs are ready
+    graph = _build_ats_graph(resumeText, jobDescription, profileKeywords, resume_entities, job_entry)
+    results = await graph.run()
+    logger.debug("atsScoring finished in %.0f ms, node timings: %s", graph.total_ms, graph.timings)
+
+    return _combine_results(results["semantic"], results["keywords"], results["formatting"], results["placement"])
+
+
+@genkit.flow(output_schema=AtsResult)
+@instrumented()
+@singleflight.coalesce("atsScoring", model=AtsResult, ignore=("jobEntry",))
+async def atsScoring(resumeText: str, jobDescription: str, profileKeywords: List[str] = None, jobEntry: Optional[dict] = None) -> AtsResult:
+    """
+    Performs a comprehensive ATS-style analysis of a resume against a job description.
+    Pass the job's registry entry as `jobEntry` to reuse its stored requirements
+    (graph mode only). ATS_EXECUTION_MODE selects the multi-call graph or the
+    single fused model call.
+    """
+    return await _run_ats_pipeline(resumeText, jobDescription, profileKeywords, job_entry=jobEntry)
+
+
+@instrumented("atsScoring")
+@singleflight.coalesce("atsScoring", model=AtsResult, ignore=("resume_entities", "job_entry"))
+async def _score_job(
+    resumeText: str,
+    jobDescription: str,
+    profileKeywords: List[str] = None,
+    resume_entities: Optional[ResumeEntities] = None,
+    job_entry: Optional[dict] = None,
+) -> AtsResult:
+    """
+    One job of a batch, measured and coalesced like `atsScoring`: it shares
+    its key, so a batch job and an identical single request run once.
+    """
+    return await _run_ats_pipeline(resumeText, jobDescription, profileKeywords, resume_entities, job_entry)
+
+
+@instrumented()
+async def score_resume_against_jobs(
+    resumeText: str,
+    jobDescriptions: List[str],
+    profileKeywords: List[str] = None,
+    max_concurrency: int = ATS_BATCH_MAX_CONCURRENCY,
+    jobEntries: Optional[List[Optional[dict]]] = None,
+) -> List[Union[AtsResult, Exception]]:
+    """
+    Scores one resume against many job descriptions. In graph mode the resume
+    entities are extracted once and shared; the per-job pipelines run with
+    bounded concurrency. Results keep the input order; a failed job yields its
+    exception instead of failing the whole batch. `jobEntries`, when given,
+    holds the registry entry of each job description.
+    """
+    # The fused call extracts the entities itself, so there is nothing to share
+    resume_entities = None
+    if _execution_mode() != "fused":
+        resume_entities = await extractResumeEntities.run(resumeText=resumeText)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    jobEntries = jobEntries or [None] * len(jobDescriptions)
+
+    async def score(jobDescription: str, job_entry: Optional[dict]) -> AtsResult:
+        async with semaphore:
+            return await _score_job(resumeText, jobDescription, profileKeywords, resume_entities, job_entry)
+
+    return await asyncio.gather(*(score(jd, entry) for jd, entry in zip(jobDescriptions, jobEntries)), return_exceptions=True)
@@ -1,19 +1,29 @@
 import genkit
+import logging
+from google.api_core.exceptions import NotFound
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from app.core.secrets import get_user_secret
 from app.core.db import db
+from app.core.metrics import instrumented
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
 @genkit.flow()
-def createCalendarEvent(user_id: str, opportunity_data: dict) -> str:
+@instrumented()
+def createCalendarEvent(user_id: str, opportunity_data: dict, save_event_id: bool = True) -> str:
     """
     Creates a Google Calendar event for a job application deadline.
+    With `save_event_id=False` the caller stores the returned event ID itself,
+    e.g. together with the rest of the opportunity in one write.
     """
     creds_json = get_user_secret(user_id, 'google_credentials')
     if not creds_json:
         raise Exception("User has not authenticated with Google.")
 
+    # Imported here: the API discovery client is slow to import
+    from googleapiclient.discovery import build
+
     credentials = Credentials.from_authorized_user_info(creds_json)
     service = build('calendar', 'v3', credentials=credentials)
 
@@ -48,11 +58,15 @@ def createCalendarEvent(user_id: str, opportunity_data: dict) -> str:
 
     created_event = service.events().insert(calendarId='primary', body=event).execute()
     
-    # Save the event ID to the opportunity document in Firestore for future reference
+    # Save the event ID to the opportunity document in Firestore for future reference.
+    # `update` never creates a bare document (without `found_at`) for an unsaved opportunity.
     opportunity_id = opportunity_data.get('id')
-    if opportunity_id:
-        db.collection('users').document(user_id).collection('opportunities').document(opportunity_id).set({
-            'calendar_event_id': created_event.get('id')
-        }, merge=True)
+    if save_event_id and opportunity_id:
+        try:
+            db.collection('users').document(user_id).collection('opportunities').document(opportunity_id).update({
+                'calendar_event_id': created_event.get('id')
+            })
+        except NotFound:
+            logger.warning("Opportunity %s not found; calendar event %s was not linked to it", opportunity_id, created_event.get('id'))
 
     return created_event.get('id')
@@ -1,26 +1,16 @@
 import genkit
-from genkit.plugins import googleai
 import json
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-# Initialize Genkit and the Google AI plugin.
-# By not passing an explicit API key, the plugin will automatically
-# use the Application Default Credentials (ADC) of the service account.
-if not genkit.get_plugin("googleai"):
-    genkit.init(plugins=[googleai.init()])
+from app.core import model_gateway
+from app.core.metrics import instrumented
 
-gemini_pro = googleai.gemini_pro
-
-@genkit.flow()
-def generate_tailored_cover_letter(
-    base_profile_data: dict, 
-    job_analysis_data: dict, 
+def _build_cover_letter_prompt(
+    base_profile_data: dict,
+    job_analysis_data: dict,
     voice_profile: Optional[dict] = None
 ) -> str:
-    """
-    Acts as an expert career coach to write a tailored cover letter,
-    adapting to the user's unique writing style.
-    """
+    """Builds the cover letter prompt shared by the blocking and streaming variants."""
 
     # Construct the core prompt
     prompt = f"""
@@ -57,7 +47,36 @@ def generate_tailored_cover_letter(
     # Final instruction to the model
     prompt += "\\n\\nNow, write the cover letter. The output should be only the full text of the letter itself."
 
+    return prompt
+
+@genkit.flow()
+@instrumented()
+async def generate_tailored_cover_letter(
+    base_profile_data: dict, 
+    job_analysis_data: dict, 
+    voice_profile: Optional[dict] = None
+) -> str:
+    """
+    Acts as an expert career coach to write a tailored cover letter,
+    adapting to the user's unique writing style.
+    """
+    prompt = _build_cover_letter_prompt(base_profile_data, job_analysis_data, voice_profile)
+
     # Generate the cover letter using the AI model
-    response = gemini_pro.generate(prompt)
+    response = await model_gateway.generate(prompt)
     
     return response.text()
+
+@instrumented()
+async def stream_tailored_cover_letter(
+    base_profile_data: dict,
+    job_analysis_data: dict,
+    voice_profile: Optional[dict] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of `generate_tailored_cover_letter` that yields text
+    chunks as the model produces them.
+    """
+    prompt = _build_cover_letter_prompt(base_profile_data, job_analysis_data, voice_profile)
+    async for chunk in model_gateway.stream(prompt):
+        yield chunk
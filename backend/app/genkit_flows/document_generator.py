@@ -1,25 +1,12 @@
 import genkit
-from genkit.plugins import googleai
-import os
-from dotenv import load_dotenv
+from typing import AsyncIterator
 
-# Load environment variables from .env file
-load_dotenv()
+from app.core import model_gateway
+from app.core.metrics import instrumented
 
-# Initialize the Google AI plugin if not already initialized
-if not genkit.get_plugin("googleai"):
-    genkit.init(plugins=[googleai.init(api_key=os.getenv("GEMINI_API_KEY"))])
-
-# Define the Gemini Pro model
-gemini_pro = googleai.gemini_pro
-
-@genkit.flow()
-def generate_tailored_resume(base_profile_data: dict, comparison_analysis: dict) -> str:
-    """
-    Acts as an expert resume writer to generate a tailored resume.
-    """
-    
-    prompt = f"""
+def _build_tailored_resume_prompt(base_profile_data: dict, comparison_analysis: dict) -> str:
+    """Builds the tailored resume prompt shared by the blocking and streaming variants."""
+    return f"""
     As an expert resume writer, your task is to rewrite the provided base profile data into a new, tailored resume.
     You must use the provided comparison analysis to guide your writing.
 
@@ -39,7 +26,26 @@ def generate_tailored_resume(base_profile_data: dict, comparison_analysis: dict)
     {comparison_analysis}
     ---
     """
+
+@genkit.flow()
+@instrumented()
+async def generate_tailored_resume(base_profile_data: dict, comparison_analysis: dict) -> str:
+    """
+    Acts as an expert resume writer to generate a tailored resume.
+    """
     
-    response = gemini_pro.generate(prompt)
+    prompt = _build_tailored_resume_prompt(base_profile_data, comparison_analysis)
+    
+    response = await model_gateway.generate(prompt)
     
     return response.text()
+
+@instrumented()
+async def stream_tailored_resume(base_profile_data: dict, comparison_analysis: dict) -> AsyncIterator[str]:
+    """
+    Streaming variant of `generate_tailored_resume` that yields text chunks
+    as the model produces them.
+    """
+    prompt = _build_tailored_resume_prompt(base_profile_data, comparison_analysis)
+    async for chunk in model_gateway.stream(prompt):
+        yield chunk
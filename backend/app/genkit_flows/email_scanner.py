@@ -2,11 +2,18 @@ import genkit
 from genkit.plugins import googleai
 from app.core.secrets import get_user_secret
 from app.core.db import db
-import os
+from app.core.job_registry import job_registry
+from app.core.metrics import instrumented
+from app.core.model_routing import model_router
+from app.core.repositories import FIRESTORE_MAX_BATCH_WRITES
+from typing import Dict, Iterable, List, Optional, Set
+import asyncio
 import base64
-import json
+import hashlib
+import logging
+import os
+import time
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from google.cloud.firestore import SERVER_TIMESTAMP
 
@@ -14,10 +21,17 @@ from google.cloud.firestore import SERVER_TIMESTAMP
 from .calendar_manager import createCalendarEvent
 from .notifier import sendNewOpportunityNotification
 
-# Initialize Genkit and the Gemini Pro model
-if not genkit.get_plugin("googleai"):
-    genkit.init(plugins=[googleai.init(api_key=os.getenv("GEMINI_API_KEY"))])
-gemini_pro = googleai.gemini_pro
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Unread messages examined per scan
+EMAIL_SCAN_MAX_MESSAGES = int(os.getenv("EMAIL_SCAN_MAX_MESSAGES", "10"))
+# Attempts per opportunity when a batched write fails and items are retried one by one
+EMAIL_SCAN_WRITE_ATTEMPTS = int(os.getenv("EMAIL_SCAN_WRITE_ATTEMPTS", "3"))
+# Delay before the first retry; doubled on each further attempt
+EMAIL_SCAN_RETRY_DELAY_SECONDS = float(os.getenv("EMAIL_SCAN_RETRY_DELAY_SECONDS", "0.5"))
+# Gmail accepts at most this many calls in one batch HTTP request
+GMAIL_MAX_BATCH_REQUESTS = 100
 
 def get_gmail_service(user_id: str):
     """Creates a Gmail API service client for a given user."""
@@ -26,12 +40,25 @@ def get_gmail_service(user_id: str):
     if not creds_json:
         raise Exception("User has not authenticated with Google.")
     
+    # Imported here: the API discovery client is slow to import
+    from googleapiclient.discovery import build
+
     credentials = Credentials.from_authorized_user_info(creds_json)
     return build('gmail', 'v1', credentials=credentials)
 
 
+def _job_details_confidence(details: dict) -> float:
+    """An empty object (no job found) or one naming the company and title is trusted."""
+    if not isinstance(details, dict):
+        return 0.0
+    if not any(details.values()) or (details.get("company") and details.get("title")):
+        return 1.0
+    return 0.0
+
+
 @genkit.flow()
-def extract_job_details_from_email(email_content: str) -> dict:
+@instrumented()
+async def extract_job_details_from_email(email_content: str) -> dict:
     """Uses an AI model to extract structured job details from email text."""
     # This flow remains the same
     prompt = f"""
@@ -45,89 +72,224 @@ def extract_job_details_from_email(email_content: str) -> dict:
     {email_content}
     ---
     """
-    response = gemini_pro.generate(
-        prompt=prompt,
-        config=googleai.GenerationConfig(response_mime_type="application/json")
-    )
     try:
-        return json.loads(response.text())
-    except (json.JSONDecodeError, TypeError):
+        return await model_router.generate(
+            "extract_job_details_from_email",
+            prompt,
+            config=googleai.GenerationConfig(response_mime_type="application/json"),
+            confidence=_job_details_confidence,
+        )
+    except ValueError:
         return {}
 
 
+def opportunity_id(user_id: str, message_id: str) -> str:
+    """Deterministic ID of the opportunity found in a message, so a re-scan never duplicates it."""
+    return hashlib.sha256(f"{user_id}:{message_id}".encode("utf-8")).hexdigest()
+
+
+def _message_body(message: dict) -> str:
+    """Returns the decoded text/plain part of a Gmail message, or an empty string."""
+    # Simplified body extraction logic
+    for part in message.get('payload', {}).get('parts', []) or []:
+        if part.get('mimeType') == 'text/plain':
+            encoded_body = part.get('body', {}).get('data', '')
+            return base64.urlsafe_b64decode(encoded_body).decode('utf-8') if encoded_body else ""
+    return ""
+
+
+def _fetch_messages(service, message_ids: List[str]) -> Dict[str, dict]:
+    """Fetches the messages with batch HTTP requests instead of one request per message."""
+    messages = {}
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            logger.warning("Failed to fetch message %s: %s", request_id, exception)
+        else:
+            messages[request_id] = response
+
+    for start in range(0, len(message_ids), GMAIL_MAX_BATCH_REQUESTS):
+        batch = service.new_batch_http_request(callback=collect)
+        for message_id in message_ids[start:start + GMAIL_MAX_BATCH_REQUESTS]:
+            batch.add(service.users().messages().get(userId='me', id=message_id, format='full'), request_id=message_id)
+        batch.execute()
+    return messages
+
+
+def _existing_opportunities(user_ref, ids: Iterable[str]) -> Set[str]:
+    """Returns which of the opportunity IDs are already saved, in one `get_all` round-trip."""
+    collection = user_ref.collection('opportunities')
+    snapshots = db.get_all([collection.document(i) for i in ids], field_paths=['status'])
+    return {snapshot.id for snapshot in snapshots if snapshot.exists}
+
+
+def _write_with_retry(ref, data: dict) -> bool:
+    for attempt in range(EMAIL_SCAN_WRITE_ATTEMPTS):
+        try:
+            ref.set(data)
+            return True
+        except Exception as e:
+            logger.warning("Failed to save opportunity %s (attempt %d): %s", ref.id, attempt + 1, e)
+            if attempt + 1 < EMAIL_SCAN_WRITE_ATTEMPTS:
+                time.sleep(EMAIL_SCAN_RETRY_DELAY_SECONDS * 2 ** attempt)
+    return False
+
+
+def _save_opportunities(user_ref, opportunities: Dict[str, dict]) -> List[str]:
+    """
+    Writes the opportunities in batched writes. If a batch fails, its items
+    are retried one by one, so one bad item does not lose the others.
+    Returns the IDs that were saved. The IDs are deterministic, so a
+    retried write never creates a duplicate.
+    """
+    collection = user_ref.collection('opportunities')
+    items = list(opportunities.items())
+    saved = []
+    for start in range(0, len(items), FIRESTORE_MAX_BATCH_WRITES):
+        chunk = items[start:start + FIRESTORE_MAX_BATCH_WRITES]
+        batch = db.batch()
+        for opp_id, data in chunk:
+            batch.set(collection.document(opp_id), data)
+        try:
+            batch.commit()
+            saved += [opp_id for opp_id, _ in chunk]
+            continue
+        except Exception as e:
+            logger.warning("Batched write of %d opportunities failed, retrying individually: %s", len(chunk), e)
+        saved += [opp_id for opp_id, data in chunk if _write_with_retry(collection.document(opp_id), data)]
+    return saved
+
+
+def _link_calendar_events(user_ref, event_ids: Dict[str, str]) -> None:
+    """Records the calendar event IDs on their saved opportunities in batched updates."""
+    collection = user_ref.collection('opportunities')
+    items = list(event_ids.items())
+    for start in range(0, len(items), FIRESTORE_MAX_BATCH_WRITES):
+        batch = db.batch()
+        for opp_id, event_id in items[start:start + FIRESTORE_MAX_BATCH_WRITES]:
+            batch.update(collection.document(opp_id), {'calendar_event_id': event_id})
+        try:
+            batch.commit()
+        except Exception as e:
+            # The opportunities are saved, so a rescan will not create the events again
+            logger.warning("Failed to record calendar event IDs on %d opportunities: %s", len(items), e)
+
+
+async def _extract_opportunity(user_id: str, message_id: str, message: dict) -> Optional[dict]:
+    """
+    Extracts the job details from a message and registers its job description
+    in the user's registry. A failed extraction only drops this message, which
+    stays unread for the next scan.
+    """
+    email_body = _message_body(message)
+    if not email_body:
+        return None
+    try:
+        job_details = await extract_job_details_from_email.run(email_body)
+    except Exception as e:
+        logger.warning("Failed to extract job details from message %s: %s", message_id, e)
+        return None
+    if not (job_details and job_details.get("title")):
+        return None
+    # Register the ad so later analyses of this job reuse one canonical entry
+    try:
+        job_entry = await job_registry.resolve(user_id, email_body)
+        job_details['jobDescriptionId'] = job_entry['id']
+    except Exception as e:
+        logger.warning("Failed to register job description for message %s: %s", message_id, e)
+    return job_details
+
+
+async def _create_calendar_event(user_id: str, job_details: dict) -> None:
+    """Creates the deadline reminder; the caller records its ID with the other new opportunities' in one batch."""
+    try:
+        job_details['calendar_event_id'] = await createCalendarEvent.run(user_id, job_details, save_event_id=False)
+    except Exception as e:
+        logger.warning("Failed to create calendar event for opportunity %s: %s", job_details['id'], e)
+
+
+async def _notify(user_data: dict, job_details: dict) -> None:
+    try:
+        await sendNewOpportunityNotification.run(user_data, job_details)
+    except Exception as e:
+        logger.warning("Failed to send notification for opportunity %s: %s", job_details['id'], e)
+
+
 @genkit.flow()
+@instrumented()
 async def scanUserEmails(user_id: str) -> list:
     """
     Scans a user's unread emails for jobs, saves them, creates calendar events, and sends notifications.
+    Each stage is batched: the messages are fetched in one Gmail batch request,
+    saved opportunities are skipped with one `get_all`, the new ones are
+    saved in one batched write, their calendar event IDs are recorded in
+    another, and the messages are marked as read with one `batchModify`.
+    Events are only created for saved opportunities, so a failed save never
+    leaves an event that the next scan would create again.
     """
     try:
         # 1. Get user data for notifications
         user_ref = db.collection('users').document(user_id)
-        user_doc = user_ref.get()
+        user_doc = await asyncio.to_thread(user_ref.get)
         if not user_doc.exists:
             raise Exception(f"User with ID {user_id} not found in Firestore.")
         user_data = user_doc.to_dict()
 
-        service = get_gmail_service(user_id)
+        service = await asyncio.to_thread(get_gmail_service, user_id)
         # Refined query to be more specific
         query = "is:unread (from:greenhouse.io OR from:lever.co OR subject:('Your application for'))"
-        results = service.users().messages().list(userId='me', q=query, maxResults=10).execute()
-        messages = results.get('messages', [])
-        
-        saved_opportunities = []
-        if not messages:
+        results = await asyncio.to_thread(
+            service.users().messages().list(userId='me', q=query, maxResults=EMAIL_SCAN_MAX_MESSAGES).execute
+        )
+        message_ids = [message_info['id'] for message_info in results.get('messages', [])]
+        if not message_ids:
             return []
 
-        for message_info in messages:
-            msg = service.users().messages().get(userId='me', id=message_info['id'], format='full').execute()
-            
-            # Simplified body extraction logic
-            parts = msg.get('payload', {}).get('parts', [])
-            encoded_body = ""
-            if parts:
-                for part in parts:
-                    if part.get('mimeType') == 'text/plain':
-                        encoded_body = part.get('body', {}).get('data', '')
-                        break
-            
-            if not encoded_body:
-                continue
-
-            email_body = base64.urlsafe_b64decode(encoded_body).decode('utf-8')
-            job_details = await extract_job_details_from_email.run(email_body)
-
-            if job_details and job_details.get("title"):
-                # Save to Firestore
-                update_time, opp_ref = user_ref.collection('opportunities').add({
-                    **job_details,
-                    'status': 'new',
-                    'found_at': SERVER_TIMESTAMP,
-                })
-                
-                # Add the new document ID for subsequent flows
-                job_details['id'] = opp_ref.id
-                saved_opportunities.append(job_details)
-
-                # 2. Create Calendar Event (if a deadline was found)
-                if job_details.get("deadline"):
-                    try:
-                        await createCalendarEvent.run(user_id, job_details)
-                    except Exception as e:
-                        print(f"Failed to create calendar event for opportunity {opp_ref.id}: {e}")
-                
-                # 3. Send Notification Email
-                try:
-                    await sendNewOpportunityNotification.run(user_data, job_details)
-                except Exception as e:
-                    print(f"Failed to send notification for opportunity {opp_ref.id}: {e}")
-                
-                # Mark email as read
-                service.users().messages().modify(userId='me', id=message_info['id'], body={'removeLabelIds': ['UNREAD']}).execute()
+        # 2. Skip messages already ingested by an earlier scan whose mark-as-read failed
+        ids = {message_id: opportunity_id(user_id, message_id) for message_id in message_ids}
+        existing = await asyncio.to_thread(_existing_opportunities, user_ref, ids.values())
+        new_message_ids = [message_id for message_id in message_ids if ids[message_id] not in existing]
+        messages = await asyncio.to_thread(_fetch_messages, service, new_message_ids) if new_message_ids else {}
+
+        # 3. Extract the job details of every new message concurrently
+        fetched_ids = [message_id for message_id in new_message_ids if message_id in messages]
+        extracted = await asyncio.gather(*(_extract_opportunity(user_id, message_id, messages[message_id]) for message_id in fetched_ids))
+        found = {}
+        for message_id, job_details in zip(fetched_ids, extracted):
+            if job_details:
+                # Add the document ID for subsequent flows
+                job_details['id'] = ids[message_id]
+                found[message_id] = job_details
+
+        # 4. Save every new opportunity in one batched write
+        documents = {}
+        for message_id, details in found.items():
+            fields = {k: v for k, v in details.items() if k != 'id'}
+            documents[details['id']] = {**fields, 'message_id': message_id, 'status': 'new', 'found_at': SERVER_TIMESTAMP}
+        saved = set(await asyncio.to_thread(_save_opportunities, user_ref, documents))
+        saved_opportunities = [details for details in found.values() if details['id'] in saved]
+
+        # 5. Create Calendar Events for saved opportunities with a deadline, then record their IDs
+        with_deadline = [details for details in saved_opportunities if details.get("deadline")]
+        await asyncio.gather(*(_create_calendar_event(user_id, details) for details in with_deadline))
+        event_ids = {details['id']: details['calendar_event_id'] for details in with_deadline if details.get('calendar_event_id')}
+        if event_ids:
+            await asyncio.to_thread(_link_calendar_events, user_ref, event_ids)
+
+        # 6. Send Notification Emails
+        await asyncio.gather(*(_notify(user_data, details) for details in saved_opportunities))
+
+        # Mark the emails of saved (or previously saved) opportunities as read
+        read_ids = [message_id for message_id in message_ids if ids[message_id] in saved or ids[message_id] in existing]
+        if read_ids:
+            await asyncio.to_thread(
+                service.users().messages().batchModify(userId='me', body={'ids': read_ids, 'removeLabelIds': ['UNREAD']}).execute
+            )
 
         return saved_opportunities
     except HttpError as error:
-        print(f"An error occurred with the Gmail API: {error}")
+        logger.error("An error occurred with the Gmail API: %s", error)
         return []
     except Exception as e:
-        print(f"An unexpected error occurred during email scanning: {e}")
+        logger.exception("An unexpected error occurred during email scanning: %s", e)
         return []
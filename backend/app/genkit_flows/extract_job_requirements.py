@@ -1,19 +1,14 @@
 import genkit
 from genkit.plugins import googleai
-import os
-from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from typing import List
 
-# Load environment variables
-load_dotenv()
+from app.core.flow_cache import flow_cache
+from app.core.metrics import instrumented
+from app.core.model_routing import completeness, model_router
 
-# Initialize Google AI plugin if needed
-if not genkit.get_plugin("googleai"):
-    genkit.init(plugins=[googleai.init(api_key=os.getenv("GEMINI_API_KEY"))])
-
-# Define the model to use
-gemini_pro = googleai.gemini_pro
+# Bump when the prompt or output schema changes so cached results are invalidated
+PROMPT_VERSION = "v1"
 
 # Define the structured output model for job requirements
 class JobRequirements(BaseModel):
@@ -22,7 +17,9 @@ class JobRequirements(BaseModel):
     experienceLevel: str = Field(description="The required experience level (e.g., 'Entry-level', 'Mid-level', 'Senior', '5+ years').")
 
 @genkit.flow(output_schema=JobRequirements)
-def extractJobRequirements(jobDescription: str) -> JobRequirements:
+@instrumented()
+@flow_cache.cached("extractJobRequirements", version=PROMPT_VERSION, model=JobRequirements)
+async def extractJobRequirements(jobDescription: str) -> JobRequirements:
     """
     Extracts structured information from a job description string.
     """
@@ -36,12 +33,13 @@ def extractJobRequirements(jobDescription: str) -> JobRequirements:
     ---
     """
     
-    response = gemini_pro.generate(
-        prompt=prompt,
+    # Answered by the fast model tier unless its output is invalid or mostly empty
+    return await model_router.generate(
+        "extractJobRequirements",
+        prompt,
+        JobRequirements,
         config=googleai.GenerationConfig(
             response_mime_type="application/json",
         ),
-        output_schema=JobRequirements
+        confidence=completeness,
     )
-    
-    return response.output()
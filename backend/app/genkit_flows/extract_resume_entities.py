@@ -1,19 +1,14 @@
 import genkit
 from genkit.plugins import googleai
-import os
-from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
 
-# Load environment variables
-load_dotenv()
+from app.core.flow_cache import flow_cache
+from app.core.metrics import instrumented
+from app.core.model_routing import completeness, model_router
 
-# Initialize Google AI plugin if needed
-if not genkit.get_plugin("googleai"):
-    genkit.init(plugins=[googleai.init(api_key=os.getenv("GEMINI_API_KEY"))])
-
-# Define the model to use
-gemini_pro = googleai.gemini_pro
+# Bump when the prompt or output schema changes so cached results are invalidated
+PROMPT_VERSION = "v1"
 
 # Define the structured output model for resume entities
 class ResumeEntities(BaseModel):
@@ -22,7 +17,9 @@ class ResumeEntities(BaseModel):
     education: List[Dict[str, Any]] = Field(description="A list of educational qualifications, including degrees and institutions.")
 
 @genkit.flow(output_schema=ResumeEntities)
-def extractResumeEntities(resumeText: str) -> ResumeEntities:
+@instrumented()
+@flow_cache.cached("extractResumeEntities", version=PROMPT_VERSION, model=ResumeEntities)
+async def extractResumeEntities(resumeText: str) -> ResumeEntities:
     """
     Extracts structured entities (skills, experience, education) from a resume text.
     """
@@ -36,12 +33,13 @@ def extractResumeEntities(resumeText: str) -> ResumeEntities:
     ---
     """
     
-    response = gemini_pro.generate(
-        prompt=prompt,
+    # Answered by the fast model tier unless its output is invalid or mostly empty
+    return await model_router.generate(
+        "extractResumeEntities",
+        prompt,
+        ResumeEntities,
         config=googleai.GenerationConfig(
             response_mime_type="application/json",
         ),
-        output_schema=ResumeEntities
+        confidence=completeness,
     )
-    
-    return response.output()
@@ -1,20 +1,17 @@
 import genkit
-from genkit.plugins import googleai
-import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+from app.core import model_gateway
+from app.core.flow_cache import flow_cache
+from app.core.metrics import instrumented
 
-# Initialize the Google AI plugin
-genkit.init(plugins=[googleai.init(api_key=os.getenv("GEMINI_API_KEY"))])
-
-# Define the Gemini Pro model
-gemini_pro = googleai.gemini_pro
+# Bump when the prompt changes so cached results are invalidated
+PROMPT_VERSION = "v1"
 
 # Define the Job Analyzer Genkit flow
 @genkit.flow()
-def analyze_job_description(job_description: str) -> dict:
+@instrumented()
+@flow_cache.cached("analyze_job_description", version=PROMPT_VERSION)
+async def analyze_job_description(job_description: str) -> dict:
     """
     Analyzes a job description to extract key information.
     """
@@ -31,6 +28,6 @@ def analyze_job_description(job_description: str) -> dict:
     {job_description}
     """
     
-    response = gemini_pro.generate(prompt)
+    response = await model_gateway.generate(prompt)
     
     return response.text()
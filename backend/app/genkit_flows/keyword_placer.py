@@ -1,15 +1,10 @@
 import genkit
 from genkit.plugins import googleai
-import os
-from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from typing import List
 
-# Load environment variables and initialize Genkit if needed
-load_dotenv()
-if not genkit.get_plugin("googleai"):
-    genkit.init(plugins=[googleai.init(api_key=os.getenv("GEMINI_API_KEY"))])
-gemini_pro = googleai.gemini_pro
+from app.core.metrics import instrumented
+from app.core.model_routing import model_router
 
 # --- Pydantic Schemas for Structured Output ---
 
@@ -26,7 +21,8 @@ class KeywordPlacementResponse(BaseModel):
 # --- Genkit Flow ---
 
 @genkit.flow(output_schema=KeywordPlacementResponse)
-def suggestKeywordPlacement(resumeText: str, list_of_missing_keywords: List[str]) -> KeywordPlacementResponse:
+@instrumented()
+async def suggestKeywordPlacement(resumeText: str, list_of_missing_keywords: List[str]) -> KeywordPlacementResponse:
     """
     Analyzes a resume and a list of missing keywords to suggest the most
     contextually appropriate placement for each keyword.
@@ -54,10 +50,17 @@ def suggestKeywordPlacement(resumeText: str, list_of_missing_keywords: List[str]
     Generate the suggestions now.
     """
     
-    response = gemini_pro.generate(
-        prompt=prompt,
-        output_schema=KeywordPlacementResponse,
-        config=googleai.GenerationConfig(response_mime_type="application/json")
+    # Escalate to the strong model tier when most keywords got no suggestion
+    requested = {keyword.casefold() for keyword in list_of_missing_keywords}
+
+    def coverage(response: KeywordPlacementResponse) -> float:
+        covered = {s.keyword.casefold() for s in response.suggestions} & requested
+        return len(covered) / len(requested) if requested else 1.0
+
+    return await model_router.generate(
+        "suggestKeywordPlacement",
+        prompt,
+        KeywordPlacementResponse,
+        config=googleai.GenerationConfig(response_mime_type="application/json"),
+        confidence=coverage,
     )
-    
-    return response.output()
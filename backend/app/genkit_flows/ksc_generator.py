@@ -1,18 +1,10 @@
-    import genkit
+import genkit
 from genkit.plugins import googleai
-import os
-from dotenv import load_dotenv
 from pydantic import BaseModel
+from typing import AsyncIterator
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Initialize the Google AI plugin if not already initialized
-if not genkit.get_plugin("googleai"):
-    genkit.init(plugins=[googleai.init(api_key=os.getenv("GEMINI_API_KEY"))])
-
-# Define the Gemini Pro model
-gemini_pro = googleai.gemini_pro
+from app.core import model_gateway
+from app.core.metrics import instrumented
 
 # Define the structured output model using Pydantic
 class STAR_Response(BaseModel):
@@ -21,13 +13,9 @@ class STAR_Response(BaseModel):
     action: str
     result: str
 
-@genkit.flow(output_schema=STAR_Response)
-def generateKscResponse(user_profile_data: dict, ksc_statement: str) -> STAR_Response:
-    """
-    Acts as an expert career coach to generate a STAR response for a KSC statement.
-    """
-    
-    prompt = f"""
+def _build_ksc_prompt(user_profile_data: dict, ksc_statement: str) -> str:
+    """Builds the STAR response prompt shared by the blocking and streaming variants."""
+    return f"""
     As an expert career coach and a master of the STAR interview technique, your task is to generate a response for a Key Selection Criterion (KSC).
 
     **Objective:**
@@ -43,13 +31,36 @@ def generateKscResponse(user_profile_data: dict, ksc_statement: str) -> STAR_Res
 
     Now, generate the STAR response based on the user's experience.
     """
+
+@genkit.flow(output_schema=STAR_Response)
+@instrumented()
+async def generateKscResponse(user_profile_data: dict, ksc_statement: str) -> STAR_Response:
+    """
+    Acts as an expert career coach to generate a STAR response for a KSC statement.
+    """
+    
+    prompt = _build_ksc_prompt(user_profile_data, ksc_statement)
     
     # Generate the response using the Gemini model, ensuring JSON output
-    response = gemini_pro.generate(
+    response = await model_gateway.generate(
         prompt=prompt,
         config=googleai.GenerationConfig(
             response_mime_type="application/json",
         ),
     )
     
-    return response.output()
+    return model_gateway.structured_output(response, STAR_Response)
+
+@instrumented()
+async def stream_ksc_response(user_profile_data: dict, ksc_statement: str) -> AsyncIterator[STAR_Response]:
+    """
+    Streaming variant of `generateKscResponse`. Yields partial STAR responses
+    as their fields complete, then the validated full response.
+    """
+    prompt = _build_ksc_prompt(user_profile_data, ksc_statement)
+    async for response in model_gateway.stream_structured(
+        prompt,
+        STAR_Response,
+        config=googleai.GenerationConfig(response_mime_type="application/json"),
+    ):
+        yield response
@@ -1,16 +1,19 @@
 import genkit
+from app.core.metrics import instrumented
 import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+import logging
+
+logger = logging.getLogger(__name__)
 
 @genkit.flow()
+@instrumented()
 def sendNewOpportunityNotification(user_data: dict, opportunity_data: dict) -> None:
     """
     Sends an email notification to the user about a new job opportunity.
     """
     sendgrid_api_key = os.getenv("SENDGRID_API_KEY")
     if not sendgrid_api_key:
-        print("SENDGRID_API_KEY not set. Skipping email notification.")
+        logger.info("SENDGRID_API_KEY not set. Skipping email notification.")
         return
 
     user_email = user_data.get("email")
@@ -49,6 +52,10 @@ def sendNewOpportunityNotification(user_data: dict, opportunity_data: dict) -> N
     </html>
     """
 
+    # Imported here: only needed when SendGrid is configured
+    from sendgrid import SendGridAPIClient
+    from sendgrid.helpers.mail import Mail
+
     message = Mail(
         from_email='notifications@careercopilot.com',  # Must be a verified sender in SendGrid
         to_emails=user_email,
@@ -59,9 +66,9 @@ def sendNewOpportunityNotification(user_data: dict, opportunity_data: dict) -> N
     try:
         sg = SendGridAPIClient(sendgrid_api_key)
         response = sg.send(message)
-        print(f"Notification email sent to {user_email}, status code: {response.status_code}")
+        logger.info("Notification email sent to %s, status code: %s", user_email, response.status_code)
     except Exception as e:
-        print(f"Error sending notification email: {e}")
+        logger.error("Error sending notification email: %s", e)
         # Decide if you want to raise an exception or just log the error
         # For this use case, we'll just log it to avoid breaking the main flow
         # raise e
@@ -1,20 +1,13 @@
 import genkit
-from genkit.plugins import googleai
-import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Initialize the Google AI plugin if not already initialized
-if not genkit.get_plugin("googleai"):
-    genkit.init(plugins=[googleai.init(api_key=os.getenv("GEMINI_API_KEY"))])
-
-# Define the Gemini Pro model
-gemini_pro = googleai.gemini_pro
+from app.core import model_gateway
+from app.core.singleflight import singleflight
+from app.core.metrics import instrumented
 
 @genkit.flow()
-def compare_resume_to_job(resume_text: str, job_analysis_data: dict) -> dict:
+@instrumented()
+@singleflight.coalesce("compare_resume_to_job")
+async def compare_resume_to_job(resume_text: str, job_analysis_data: dict) -> dict:
     """
     Acts as an expert career coach to compare a resume to a job analysis.
     """
@@ -40,7 +33,7 @@ def compare_resume_to_job(resume_text: str, job_analysis_data: dict) -> dict:
     ---
     """
     
-    response = gemini_pro.generate(prompt)
+    response = await model_gateway.generate(prompt)
     
     # The output from the model is expected to be a string representation of a JSON object.
     # We will return it as such, and the API endpoint will parse it.
@@ -0,0 +1,103 @@
+import os
+import zlib
+from collections import Counter
+from typing import Dict, List, Protocol, Tuple
+
+import numpy as np
+
+from .skill_matcher import normalize_tokens
+
+# --- Configuration ---
+SEMANTIC_EMBEDDING_BACKEND = os.getenv("SEMANTIC_EMBEDDING_BACKEND", "hashed-ngrams")
+# Cosine similarities at or below the floor map to 0, at or above the ceiling to 100
+SEMANTIC_SCORE_FLOOR = float(os.getenv("SEMANTIC_SCORE_FLOOR", "0.05"))
+SEMANTIC_SCORE_CEILING = float(os.getenv("SEMANTIC_SCORE_CEILING", "0.55"))
+
+_STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being but by can could did do does
+for from had has have he her his how i if in into is it its may me more most must my no not of
+on or our out over she should so some such than that the their them then there these they this
+those through to under up us very was we were what when where which while who will with would
+you your ability able experience including role team work working years
+""".split())
+
+
+class EmbeddingBackend(Protocol):
+    """Turns texts into L2-normalized row vectors."""
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        ...
+
+
+class HashedNgramBackend:
+    """
+    Default embedding backend: lemmatized word unigrams and bigrams hashed
+    into a fixed-size vector (the "hashing trick"), with sublinear TF scaling
+    and L2 normalization. Needs no model or network and takes a few
+    milliseconds for a full resume.
+    """
+
+    def __init__(self, dimensions: int = 2 ** 16):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> List[str]:
+        tokens = [t for t in normalize_tokens(text) if t not in _STOPWORDS]
+        bigrams = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return tokens + bigrams
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if not features:
+                continue
+            buckets = np.fromiter(
+                (zlib.crc32(f.encode("utf-8")) % self.dimensions for f in features),
+                dtype=np.int64,
+                count=len(features),
+            )
+            counts = np.bincount(buckets, minlength=self.dimensions).astype(np.float32)
+            np.log1p(counts, out=counts)
+            norm = np.linalg.norm(counts)
+            vectors[row] = counts / norm if norm else counts
+        return vectors
+
+
+_backends: Dict[str, EmbeddingBackend] = {"hashed-ngrams": HashedNgramBackend()}
+
+
+def register_embedding_backend(name: str, backend: EmbeddingBackend) -> None:
+    """Registers an embedding backend (e.g. a sentence-embedding model) by name."""
+    _backends[name] = backend
+
+
+def get_embedding_backend(name: str = None) -> EmbeddingBackend:
+    name = name or SEMANTIC_EMBEDDING_BACKEND
+    if name not in _backends:
+        raise ValueError(f"Unknown semantic embedding backend '{name}'.")
+    return _backends[name]
+
+
+def _shared_terms(resume_text: str, job_description: str, limit: int = 5) -> List[str]:
+    """Returns the job description's most frequent terms that also appear in the resume."""
+    resume_terms = set(normalize_tokens(resume_text))
+    job_terms = Counter(t for t in normalize_tokens(job_description) if t not in _STOPWORDS and len(t) > 2)
+    return [term for term, _ in job_terms.most_common() if term in resume_terms][:limit]
+
+
+def local_semantic_similarity(resume_text: str, job_description: str, backend: str = None) -> Tuple[int, str]:
+    """
+    Computes a 0-100 semantic similarity score and a one-line explanation
+    locally, without a model call.
+    """
+    vectors = get_embedding_backend(backend).embed([resume_text, job_description])
+    cosine = float(np.dot(vectors[0], vectors[1]))
+    scaled = (cosine - SEMANTIC_SCORE_FLOOR) / (SEMANTIC_SCORE_CEILING - SEMANTIC_SCORE_FLOOR)
+    score = int(round(min(max(scaled, 0.0), 1.0) * 100))
+
+    shared = _shared_terms(resume_text, job_description)
+    if shared:
+        explanation = f"Local similarity analysis found shared key terms: {', '.join(shared)}."
+    else:
+        explanation = "Local similarity analysis found little overlap between the resume and the job description."
+    return score, explanation
@@ -0,0 +1,234 @@
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# --- Skill Taxonomy ---
+# Canonical skill name -> known aliases. Matching is done on normalized,
+# lemmatized tokens, so casing, punctuation and simple plurals don't need
+# their own entries. Aliases must be other names for the same skill, not
+# related skills or broader concepts, or a resume gets credit it hasn't earned.
+SKILL_TAXONOMY: Dict[str, List[str]] = {
+    "JavaScript": ["js", "ecmascript", "es6"],
+    "TypeScript": ["ts"],
+    "Python": ["python3", "py"],
+    "Java": [],
+    "C++": ["cpp"],
+    "C#": ["csharp", "c sharp"],
+    ".NET": ["dotnet", "dot net"],
+    "Go": ["golang"],
+    "Ruby on Rails": ["rails", "ror"],
+    "Node.js": ["node", "nodejs", "node js"],
+    "React": ["react.js", "reactjs", "react js"],
+    "Angular": ["angularjs", "angular.js"],
+    "Vue.js": ["vue", "vuejs"],
+    "HTML": ["html5"],
+    "CSS": ["css3"],
+    "SQL": ["structured query language"],
+    "PostgreSQL": ["postgres", "postgre sql", "psql"],
+    "MySQL": ["my sql"],
+    "Microsoft SQL Server": ["mssql", "ms sql", "sql server"],
+    "MongoDB": ["mongo"],
+    "Amazon Web Services": ["aws"],
+    "Google Cloud Platform": ["gcp", "google cloud"],
+    "Microsoft Azure": ["azure"],
+    "Kubernetes": ["k8s"],
+    "Docker": [],
+    "Continuous Integration": ["ci", "ci/cd", "cicd"],
+    "Machine Learning": ["ml"],
+    "Artificial Intelligence": ["ai"],
+    "Natural Language Processing": ["nlp"],
+    "Amazon S3": ["s3"],
+    "REST APIs": ["rest", "restful", "restful api", "rest api"],
+    "GraphQL": ["gql"],
+    "Microsoft Excel": ["excel", "ms excel"],
+    "Microsoft Office": ["ms office", "office 365", "microsoft 365"],
+    "Project Management": ["pm"],
+    "Agile": ["agile methodology", "agile methodologies"],
+    "Scrum": [],
+    "User Experience Design": ["ux", "ux design"],
+    "User Interface Design": ["ui", "ui design"],
+    "Search Engine Optimization": ["seo"],
+    "Customer Relationship Management": ["crm"],
+    "Key Performance Indicators": ["kpi", "kpis"],
+    "Continuous Deployment": ["cd"],
+}
+
+# Single-token spellings that are too ambiguous to count when found in free text
+# (e.g. "go" or "excel" used as verbs). They still match extracted skill lists.
+_AMBIGUOUS_IN_TEXT = frozenset({"go", "rest", "node", "excel", "office", "rails"})
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*|\.[a-z][a-z0-9]*|[+#]+")
+
+
+def _tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """Splits text into lowercase tokens with their character offsets."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return [(m.group(0), m.start(), m.end()) for m in _TOKEN_PATTERN.finditer(text)]
+
+
+# Plurals that the suffix rules below would otherwise leave alone
+_LEMMA_EXCEPTIONS = {"apis": "api", "kpis": "kpi", "sdks": "sdk"}
+
+
+def _lemmatize(token: str) -> str:
+    """
+    Light-weight lemmatizer that folds common English plural forms. It is
+    applied to the taxonomy and to inputs alike, so names that merely look
+    plural (e.g. "Kubernetes") still match themselves.
+    """
+    if token in _LEMMA_EXCEPTIONS:
+        return _LEMMA_EXCEPTIONS[token]
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith(("sses", "shes", "ches", "xes")):
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def normalize_tokens(text: str) -> Tuple[str, ...]:
+    """Returns the normalized, lemmatized token sequence of a skill or phrase."""
+    return tuple(_lemmatize(token) for token, _, _ in _tokenize(text))
+
+
+class TokenMatcher:
+    """
+    Aho-Corasick automaton over token sequences. Finds every occurrence of
+    any registered pattern in a single pass over the text, so scanning is
+    linear in the number of tokens plus the number of matches.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[str, int]]] = [[]]
+        self._built = False
+
+    def add(self, tokens: Tuple[str, ...], key: str) -> None:
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((key, len(tokens)))
+        self._built = False
+
+    def build(self) -> "TokenMatcher":
+        queue = deque()
+        for next_state in self._goto[0].values():
+            self._fail[next_state] = 0
+            queue.append(next_state)
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(token, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+        self._built = True
+        return self
+
+    def find(self, tokens: List[str]) -> Iterable[Tuple[str, int, int]]:
+        """Yields (key, start_token, end_token) for every pattern occurrence."""
+        if not self._built:
+            self.build()
+        state = 0
+        for position, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for key, length in self._outputs[state]:
+                yield key, position - length + 1, position + 1
+
+
+class SkillIndex:
+    """
+    Precompiled index mapping every known spelling of a skill (canonical
+    name or alias) to its canonical name.
+    """
+
+    def __init__(self, taxonomy: Dict[str, List[str]] = SKILL_TAXONOMY):
+        self._canonical: Dict[Tuple[str, ...], str] = {}
+        self._variants: Dict[str, List[Tuple[str, ...]]] = {}
+        for canonical, aliases in taxonomy.items():
+            for term in [canonical, *aliases]:
+                tokens = normalize_tokens(term)
+                if tokens:
+                    self._canonical.setdefault(tokens, canonical)
+                    self._variants.setdefault(canonical, []).append(tokens)
+
+    def canonicalize(self, skill: str) -> str:
+        """Returns the canonical name of a skill, or its normalized form if unknown."""
+        tokens = normalize_tokens(skill)
+        return self._canonical.get(tokens, " ".join(tokens))
+
+    def variants(self, skill: str) -> List[Tuple[str, ...]]:
+        """Returns every token sequence that should be treated as this skill."""
+        canonical = self.canonicalize(skill)
+        return self._variants.get(canonical) or [normalize_tokens(skill)]
+
+
+skill_index = SkillIndex()
+
+
+def match_skills(
+    job_skills: List[str],
+    resume_skills: List[str],
+    resume_text: Optional[str] = None,
+    index: SkillIndex = skill_index,
+) -> Dict[str, object]:
+    """
+    Matches job skills against the resume's extracted skills and, when given,
+    the raw resume text. A job skill counts as matched if any of its spellings
+    appears in either. Runs in linear time over the skills and the text.
+
+    Returns the matched and missing job skills (in their original order) and,
+    for each skill found in the text, its [start, end] character offsets.
+    """
+    resume_canonical = {index.canonicalize(skill) for skill in resume_skills}
+    job_canonical = {skill: index.canonicalize(skill) for skill in job_skills}
+
+    # Positions are collected per canonical skill, so duplicate or aliased job
+    # skills share one set of patterns in the automaton
+    canonical_positions: Dict[str, List[List[int]]] = {}
+    if resume_text:
+        matcher = TokenMatcher()
+        for skill, canonical in job_canonical.items():
+            if canonical in canonical_positions:
+                continue
+            canonical_positions[canonical] = []
+            for tokens in index.variants(skill):
+                if len(tokens) == 1 and (len(tokens[0]) <= 2 or tokens[0] in _AMBIGUOUS_IN_TEXT):
+                    continue
+                matcher.add(tokens, canonical)
+        text_tokens = _tokenize(resume_text)
+        lemmas = [_lemmatize(token) for token, _, _ in text_tokens]
+        for canonical, start, end in matcher.find(lemmas):
+            canonical_positions[canonical].append([text_tokens[start][1], text_tokens[end - 1][2]])
+
+    matched, missing = [], []
+    positions: Dict[str, List[List[int]]] = {}
+    for skill in job_skills:
+        canonical = job_canonical[skill]
+        found_in_text = canonical_positions.get(canonical)
+        if found_in_text:
+            positions[skill] = found_in_text
+        if canonical in resume_canonical or found_in_text:
+            matched.append(skill)
+        else:
+            missing.append(skill)
+
+    return {"matched": matched, "missing": missing, "positions": positions}
@@ -1,64 +1,230 @@
 import genkit
 from genkit.plugins import googleai
+from google.cloud.firestore import SERVER_TIMESTAMP
 from app.core.db import db
+from app.core import model_gateway
+from app.core.metrics import instrumented
+from app.core.repositories import FIRESTORE_MAX_BATCH_WRITES
+from pydantic import BaseModel, Field
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple, TypeVar
+import asyncio
+import logging
 import os
-import json
 
-# Initialize Genkit and the Gemini Pro model
-if not genkit.get_plugin("googleai"):
-    genkit.init(plugins=[googleai.init(api_key=os.getenv("GEMINI_API_KEY"))])
-gemini_pro = googleai.gemini_pro
+logger = logging.getLogger(__name__)
 
-@genkit.flow()
-def generate_voice_profile(user_id: str) -> dict:
+# --- Configuration ---
+# Total number of document tokens sent to the model in one run
+VOICE_PROFILE_TOKEN_BUDGET = int(os.getenv("VOICE_PROFILE_TOKEN_BUDGET", "48000"))
+# Size of each chunk analyzed by a single model call
+VOICE_PROFILE_CHUNK_TOKENS = int(os.getenv("VOICE_PROFILE_CHUNK_TOKENS", "8000"))
+# Smallest excerpt worth taking from a document when the budget is tight
+VOICE_PROFILE_MIN_DOC_TOKENS = int(os.getenv("VOICE_PROFILE_MIN_DOC_TOKENS", "500"))
+VOICE_PROFILE_MAX_CONCURRENCY = int(os.getenv("VOICE_PROFILE_MAX_CONCURRENCY", "4"))
+
+# Rough characters-per-token ratio for English prose
+CHARS_PER_TOKEN = 4
+
+class VoiceProfile(BaseModel):
+    tone: str = Field(description="A short description of the overall tone (e.g., 'professional and direct', 'casual and friendly', 'academic and formal').")
+    common_phrases: List[str] = Field(description="A list of 5-10 recurring phrases or expressions the user frequently uses.")
+    professional_vocabulary: List[str] = Field(description="A list of 10-15 key technical, industry-specific, or advanced vocabulary terms they use.")
+
+class DocumentStyle(VoiceProfile):
+    document_id: str = Field(description="The ID of the document this style summary describes.")
+
+class ChunkStyles(BaseModel):
+    documents: List[DocumentStyle]
+
+T = TypeVar("T")
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _sample_within_budget(items: Sequence[T], token_budget: int) -> List[T]:
     """
-    Analyzes all of a user's documents to create a voice profile.
+    Keeps an evenly spaced sample of at most as many items as the budget can
+    give a minimum-size excerpt each.
     """
-    try:
-        # 1. Fetch all of the user's documents from Firestore
-        docs_ref = db.collection('users').document(user_id).collection('documents')
-        docs = docs_ref.stream()
-        
-        all_text = ""
-        doc_count = 0
-        for doc in docs:
-            text = doc.to_dict().get("extractedText")
-            if text:
-                all_text += text + "\\n\\n---\\n\\n"
-                doc_count += 1
-        
-        if doc_count < 1 or not all_text.strip():
-            raise ValueError("Not enough document content to generate a voice profile.")
+    max_docs = max(1, token_budget // VOICE_PROFILE_MIN_DOC_TOKENS)
+    if len(items) <= max_docs:
+        return list(items)
+    step = len(items) / max_docs
+    return [items[int(i * step)] for i in range(max_docs)]
+
+def _fit_to_budget(documents: List[Tuple[str, str]], token_budget: int) -> List[Tuple[str, str]]:
+    """
+    Selects (document_id, excerpt) pairs that fit the token budget. When
+    there are more documents than the budget can cover, an evenly spaced
+    sample is taken. The budget is then shared fairly: short documents are
+    kept whole and the remainder is split evenly among the longer ones.
+    No excerpt is longer than one chunk.
+    """
+    documents = _sample_within_budget(documents, token_budget)
+
+    excerpts = []
+    remaining = token_budget
+    by_length = sorted(documents, key=lambda document: len(document[1]))
+    for i, (document_id, text) in enumerate(by_length):
+        share = min(remaining // (len(by_length) - i), VOICE_PROFILE_CHUNK_TOKENS)
+        take = min(_estimate_tokens(text), share)
+        excerpts.append((document_id, text[:take * CHARS_PER_TOKEN]))
+        remaining -= take
+    return excerpts
+
+def _pack_into_chunks(excerpts: List[Tuple[str, str]], chunk_tokens: int) -> List[List[Tuple[str, str]]]:
+    """Packs whole document excerpts into chunks of at most `chunk_tokens` tokens."""
+    chunks, current, current_tokens = [], [], 0
+    for document_id, excerpt in excerpts:
+        tokens = _estimate_tokens(excerpt)
+        if current and current_tokens + tokens > chunk_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append((document_id, excerpt))
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def _extract_chunk_styles(chunk: List[Tuple[str, str]]) -> List[DocumentStyle]:
+    """Map step: describes the writing style of each document in a chunk."""
+    documents = "\n\n".join(f'[Document "{document_id}"]\n{excerpt}' for document_id, excerpt in chunk)
+    prompt = f"""
+    Analyze the following documents, which were all written by a single user.
+    Your task is to describe the writing style of EACH document as a JSON object with a "documents" list.
+
+    Each entry in the list must include the following fields:
+    - "document_id": The ID shown in the document's header.
+    - "tone": A short description of the overall tone (e.g., "professional and direct", "casual and friendly", "academic and formal").
+    - "common_phrases": A list of 5-10 recurring phrases or expressions the user frequently uses.
+    - "professional_vocabulary": A list of 10-15 key technical, industry-specific, or advanced vocabulary terms they use.
 
-        # 2. Create the prompt for the Gemini model
-        prompt = f"""
-        Analyze the following text block, which contains multiple documents written by a single user. 
-        Your task is to create a JSON object that accurately describes their writing style.
+    Here are the documents:
+    ---
+    {documents}
+    ---
+    """
+    response = await model_gateway.generate(
+        prompt=prompt,
+        output_schema=ChunkStyles,
+        config=googleai.GenerationConfig(response_mime_type="application/json")
+    )
+    chunk_ids = {document_id for document_id, _ in chunk}
+    return [style for style in model_gateway.structured_output(response, ChunkStyles).documents if style.document_id in chunk_ids]
+
+def _most_common(values: List[str], limit: int) -> List[str]:
+    """Ranks values by how many documents mention them, keeping the first spelling seen."""
+    counts = Counter(value.strip().casefold() for value in values if value.strip())
+    spelling = {}
+    for value in values:
+        spelling.setdefault(value.strip().casefold(), value.strip())
+    return [spelling[key] for key, _ in counts.most_common(limit)]
+
+def _merge_profiles(profiles: List[VoiceProfile]) -> VoiceProfile:
+    """Reduce step: merges per-document style summaries into a single profile."""
+    return VoiceProfile(
+        tone=_most_common([p.tone for p in profiles], 1)[0],
+        common_phrases=_most_common([phrase for p in profiles for phrase in p.common_phrases], 10),
+        professional_vocabulary=_most_common([term for p in profiles for term in p.professional_vocabulary], 15),
+    )
+
+async def _summarize_documents(user_id: str, document_ids: List[str]) -> Dict[str, dict]:
+    """
+    Extracts a style summary for as many of the given documents as the token
+    budget covers and persists it on each document as `styleSummary`. Only
+    those documents' text is read. Returns the new summaries and the update
+    time of every processed document.
+    """
+    docs_ref = db.collection('users').document(user_id).collection('documents')
+    # Documents left out of this run's budget are picked up by the next one
+    document_ids = _sample_within_budget(document_ids, VOICE_PROFILE_TOKEN_BUDGET)
+    refs = [docs_ref.document(document_id) for document_id in document_ids]
+    snapshots = await asyncio.to_thread(lambda: list(db.get_all(refs, field_paths=["extractedText"])))
+    documents = [(s.id, s.to_dict().get("extractedText")) for s in snapshots if s.exists]
+    with_text = [(document_id, text) for document_id, text in documents if text and text.strip()]
+
+    # Map: extract style features from each chunk of documents concurrently
+    chunks = _pack_into_chunks(_fit_to_budget(with_text, VOICE_PROFILE_TOKEN_BUDGET), VOICE_PROFILE_CHUNK_TOKENS)
+    semaphore = asyncio.Semaphore(VOICE_PROFILE_MAX_CONCURRENCY)
+
+    async def extract(chunk):
+        async with semaphore:
+            return await _extract_chunk_styles(chunk)
 
-        The JSON object must include the following fields:
-        - "tone": A short description of the overall tone (e.g., "professional and direct", "casual and friendly", "academic and formal").
-        - "common_phrases": A list of 5-10 recurring phrases or expressions the user frequently uses.
-        - "professional_vocabulary": A list of 10-15 key technical, industry-specific, or advanced vocabulary terms they use.
+    styles = [style for chunk_styles in await asyncio.gather(*(extract(c) for c in chunks)) for style in chunk_styles]
 
-        Here is the text block:
-        ---
-        {all_text}
-        ---
-        """
+    # Persist the summaries next to each document, in batches within
+    # Firestore's write limit. Documents without text are recorded too, so
+    # they are not re-read on the next run.
+    summaries = {style.document_id: style.model_dump(exclude={"document_id"}) for style in styles}
+    processed = list(summaries) + [document_id for document_id, text in documents if not (text and text.strip())]
+    update_times = {}
+    for start in range(0, len(processed), FIRESTORE_MAX_BATCH_WRITES):
+        group = processed[start:start + FIRESTORE_MAX_BATCH_WRITES]
+        batch = db.batch()
+        for document_id in group:
+            summary = summaries.get(document_id)
+            batch.update(docs_ref.document(document_id), {
+                "styleSummary": {**summary, "createdAt": SERVER_TIMESTAMP} if summary else None
+            })
+        write_results = await asyncio.to_thread(batch.commit)
+        update_times.update((document_id, result.update_time) for document_id, result in zip(group, write_results))
+    return {"summaries": summaries, "update_times": update_times}
 
-        # 3. Call the model and get the response
-        response = gemini_pro.generate(prompt)
-        voice_profile_data = json.loads(response.text())
+@genkit.flow(output_schema=VoiceProfile)
+@instrumented()
+async def generateVoiceProfile(user_id: str, full_refresh: bool = False) -> VoiceProfile:
+    """
+    Analyzes a user's documents to create a voice profile, incrementally.
 
-        # 4. Save the profile to the user's main document
+    Each document gets a persisted `styleSummary`, and the user's
+    `voice_profile_sources` records the update time of every document already
+    folded into the profile. Only new or changed documents are sent to the
+    model; the profile is then re-merged from the stored summaries.
+    """
+    try:
+        # 1. List the user's documents with their existing style summaries (no text)
         user_ref = db.collection('users').document(user_id)
-        user_ref.set({
-            'voice_profile': voice_profile_data
-        }, merge=True)
+        docs_ref = user_ref.collection('documents')
+        user_doc, listing = await asyncio.gather(
+            asyncio.to_thread(user_ref.get),
+            asyncio.to_thread(lambda: list(docs_ref.select(["styleSummary"]).stream())),
+        )
+        sources = {} if full_refresh or not user_doc.exists else (user_doc.to_dict().get("voice_profile_sources") or {})
+
+        # 2. Find the documents that are new or changed since they were summarized
+        summaries = {}
+        pending = []
+        for doc in listing:
+            if sources.get(doc.id) == doc.update_time:
+                summaries[doc.id] = doc.to_dict().get("styleSummary")
+            else:
+                pending.append(doc.id)
+
+        # 3. Summarize only those documents
+        update_times = {doc.id: doc.update_time for doc in listing if doc.id in summaries}
+        if pending:
+            processed = await _summarize_documents(user_id, pending)
+            summaries.update(processed["summaries"])
+            update_times.update(processed["update_times"])
+
+        # 4. Merge every stored summary into the voice profile
+        profiles = [VoiceProfile(**summary) for summary in summaries.values() if summary]
+        if not profiles:
+            raise ValueError("Not enough document content to generate a voice profile.")
+        voice_profile = _merge_profiles(profiles)
+
+        # 5. Save the profile and the record of folded-in documents. Passing the
+        # field names to `merge` replaces the sources map, dropping deleted documents.
+        await asyncio.to_thread(user_ref.set, {
+            'voice_profile': voice_profile.model_dump(),
+            'voice_profile_sources': update_times,
+        }, merge=['voice_profile', 'voice_profile_sources'])
 
-        return voice_profile_data
+        return voice_profile
 
     except Exception as e:
-        print(f"An error occurred during voice profile generation for user {user_id}: {e}")
+        logger.exception("An error occurred during voice profile generation for user %s: %s", user_id, e)
         # Re-raise the exception so the calling endpoint can handle it
         raise e
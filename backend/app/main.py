@@ -1,11 +1,15 @@
-from fastapi import FastAPI, APIRouter, Request
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi.errors import RateLimitExceeded
 from app.core.limiter import limiter, _rate_limit_exceeded_handler, strict_limiter, _not_authenticated_handler, NotAuthenticatedException
-from app.api.v1 import profile, documents, users, jobs, integrations, opportunities, settings, ksc, analysis
+from app.core.metrics import MetricsMiddleware, render_latest
+from app.core.lazy_routers import LazyRouterMiddleware, LazyRouters
+from app.core.lifespan import lifespan, warm_up
+from app.core.security import AuthenticationMiddleware
 import os
 
-app = FastAPI(title="Careercopilot API")
+app = FastAPI(title="Careercopilot API", lifespan=lifespan)
 
 # Add CORS middleware
 origins = [
@@ -26,26 +30,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Verifies bearer tokens once per request, before the rate limiter reads them
+app.add_middleware(AuthenticationMiddleware)
+
+# Per-endpoint latency, and endpoint labels for flow and model metrics
+app.add_middleware(MetricsMiddleware)
+
+
 app.state.limiter = limiter
 app.state.strict_limiter = strict_limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_exception_handler(NotAuthenticatedException, _not_authenticated_handler)
 
 
-api_router = APIRouter()
-api_router.include_router(profile.router, prefix="/profile", tags=["profile"])
-api_router.include_router(documents.router, prefix="/documents", tags=["documents"])
-api_router.include_router(users.router, prefix="/users", tags=["users"])
-api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
-api_router.include_router(integrations.router, prefix="/integrations", tags=["integrations"])
-api_router.include_router(opportunities.router, prefix="/opportunities", tags=["opportunities"])
-api_router.include_router(settings.router, prefix="/settings", tags=["settings"])
-api_router.include_router(ksc.router, prefix="/ksc", tags=["ksc"])
-api_router.include_router(analysis.router, prefix="/analysis", tags=["analysis"])
-
-
-app.include_router(api_router, prefix="/api/v1")
+# API routers are imported on the first request to their prefix, or by the
+# startup warm-up, so importing the app (and serving /health) stays fast
+api_routers = LazyRouters(app, prefix="/api/v1")
+api_routers.add("/profile", "app.api.v1.profile", tags=["profile"])
+api_routers.add("/documents", "app.api.v1.documents", tags=["documents"])
+api_routers.add("/users", "app.api.v1.users", tags=["users"])
+api_routers.add("/jobs", "app.api.v1.jobs", tags=["jobs"])
+api_routers.add("/integrations", "app.api.v1.integrations", tags=["integrations"])
+api_routers.add("/opportunities", "app.api.v1.opportunities", tags=["opportunities"])
+api_routers.add("/settings", "app.api.v1.settings", tags=["settings"])
+api_routers.add("/ksc", "app.api.v1.ksc", tags=["ksc"])
+api_routers.add("/analysis", "app.api.v1.analysis", tags=["analysis"])
+app.add_middleware(LazyRouterMiddleware, routers=api_routers, load_all_paths=(app.openapi_url, app.docs_url, app.redoc_url))
+warm_up.component("routers")(api_routers.load_all)
 
 @app.get("/health", tags=["Health"])
 async def health_check():
     return {"status": "ok"}
+
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness probe: 503 until the startup warm-up has finished, with per-component timings."""
+    report = warm_up.status()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Exposes flow, model and HTTP metrics in the Prometheus text format."""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
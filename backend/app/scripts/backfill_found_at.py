@@ -0,0 +1,29 @@
+"""
+One-off backfill of `found_at` on opportunities written without it, which
+the listing and export otherwise skip. Safe to re-run.
+
+    python -m app.scripts.backfill_found_at
+"""
+import asyncio
+import logging
+
+from app.core.db import async_db
+from app.core.repositories import opportunity_repository
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill() -> int:
+    fixed = 0
+    # list_documents also returns users that only exist as a parent of subcollections
+    async for user_ref in async_db.collection("users").list_documents():
+        count = await opportunity_repository.backfill_found_at(user_ref.id)
+        if count:
+            logger.info("Backfilled found_at on %d opportunities of user %s", count, user_ref.id)
+        fixed += count
+    return fixed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Backfilled found_at on %d opportunities", asyncio.run(backfill()))
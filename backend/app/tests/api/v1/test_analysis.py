@@ -0,0 +1,57 @@
+import pytest
+
+from app.api.v1 import analysis
+from app.genkit_flows.ats_scoring import AtsResult, ScoreBreakdown
+
+
+def _result(score: float) -> AtsResult:
+    return AtsResult(
+        overallScore=score,
+        breakdown=ScoreBreakdown(keywordScore=score, semanticScore=score, formattingScore=score),
+        matchedKeywords=[], missingKeywords=[], recommendations=[],
+    )
+
+
+class _Registry:
+    async def resolve(self, uid, text):
+        return {"id": f"jd-{text}", "text": text, "uid": uid}
+
+    async def get(self, uid, entry_id):
+        return None
+
+
+@pytest.mark.asyncio
+async def test_batch_ranks_successes_reports_failures_and_saves_once(monkeypatch):
+    """Results are ranked by score with failures last, and only successful analyses are saved, in one call."""
+    scores = {"low": 40, "high": 90, "opportunity text": 65}
+    saved = []
+
+    async def score_resume_against_jobs(resume_text, job_descriptions, jobEntries=None):
+        assert resume_text == "resume" and [entry["text"] for entry in jobEntries] == job_descriptions
+        return [_result(scores[jd]) if jd in scores else RuntimeError("model unavailable") for jd in job_descriptions]
+
+    async def get_many(uid, opportunity_ids):
+        return {"opp-1": {"jobDescription": "opportunity text"}, "missing": None}
+
+    async def create_many(uid, document_id, analyses):
+        saved.append((uid, document_id, analyses))
+        return [f"analysis-{i}" for i in range(len(analyses))]
+
+    monkeypatch.setattr(analysis, "job_registry", _Registry())
+    monkeypatch.setattr(analysis, "score_resume_against_jobs", score_resume_against_jobs)
+    monkeypatch.setattr(analysis.opportunity_repository, "get_many", get_many)
+    monkeypatch.setattr(analysis.analysis_repository, "create_many", create_many)
+
+    request = analysis.AtsBatchScoreRequest(job_descriptions=["low", "bad", "high"], opportunity_ids=["opp-1", "missing"])
+    ranked = await analysis.get_batch_ats_scores("doc-1", request, {"content": "resume"}, {"uid": "u1"})
+
+    assert [(item.rank, item.jobIndex, item.opportunityId) for item in ranked] == [
+        (1, 2, None), (2, None, "opp-1"), (3, 0, None), (None, 1, None), (None, None, "missing"),
+    ]
+    assert "model unavailable" in ranked[3].error and ranked[4].error == "Opportunity not found."
+    assert len(saved) == 1
+    uid, document_id, analyses = saved[0]
+    assert (uid, document_id) == ("u1", "doc-1")
+    assert [a["jobDescriptionId"] for a in analyses] == ["jd-low", "jd-high", "jd-opportunity text"]
+    assert analyses[2]["opportunityId"] == "opp-1"
+    assert {item.analysisId for item in ranked if item.rank} == {"analysis-0", "analysis-1", "analysis-2"}
@@ -0,0 +1,32 @@
+import asyncio
+import importlib
+
+import pytest
+
+
+def test_documents_router_imports_and_registers_streaming_routes():
+    """The router module imports cleanly and exposes the SSE generation endpoints."""
+    documents = importlib.import_module("app.api.v1.documents")
+    paths = {route.path for route in documents.router.routes}
+    assert {"/cover-letter/stream", "/tailored-resume/stream", "/{document_id}/download-pdf"} <= paths
+
+
+@pytest.mark.asyncio
+async def test_closing_the_stream_stops_the_generation():
+    """A client disconnect (the stream closed early) closes the model stream instead of leaving it running."""
+    documents = importlib.import_module("app.api.v1.documents")
+    closed = asyncio.Event()
+
+    async def chunks():
+        try:
+            yield "Dear hiring manager,"
+            await asyncio.Event().wait()
+        finally:
+            closed.set()
+
+    response = documents._stream_generated_document("u1", "cover_letter", "p1", chunks())
+    body = response.body_iterator
+    assert await body.__anext__() == documents.sse_comment("stream-open")
+    assert "Dear hiring manager," in await body.__anext__()
+    await body.aclose()
+    assert closed.is_set()
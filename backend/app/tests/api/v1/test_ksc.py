@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from app.api.v1 import ksc
+
+
+@pytest.mark.asyncio
+async def test_closing_the_stream_cancels_pending_generations(monkeypatch):
+    """A client disconnect (the stream closed early) cancels criteria still being generated."""
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def stream_ksc_response(user_profile_data, statement):
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        yield
+
+    async def get_profile_variation(uid, profile_variation_id):
+        return {"name": "Ada"}
+
+    monkeypatch.setattr(ksc, "stream_ksc_response", stream_ksc_response)
+    monkeypatch.setattr(ksc, "_get_profile_variation", get_profile_variation)
+    request = ksc.KscGenerateRequest(profile_variation_id="p1", ksc_statements=["Leadership"])
+    response = await ksc.stream_ksc_responses(request, {"uid": "u1"})
+
+    body = response.body_iterator
+    first = asyncio.ensure_future(body.__anext__())
+    await started.wait()
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    await body.aclose()
+    await asyncio.wait_for(cancelled.wait(), 1)
@@ -3,6 +3,7 @@ from httpx import AsyncClient
 from unittest.mock import MagicMock
 
 from app.main import app
+from app.core import db
 from app.core.dependencies import get_current_user
 
 @pytest.fixture
@@ -18,7 +19,7 @@ def mock_get_current_user():
 @pytest.fixture
 async def client(monkeypatch, mock_db, mock_get_current_user):
     """Async test client for the app with mocked dependencies."""
-    monkeypatch.setattr(db, "db", mock_db)
+    monkeypatch.setattr(db.async_db, "_client", mock_db)
     app.dependency_overrides[get_current_user] = mock_get_current_user
 
     async with AsyncClient(app=app, base_url="http://test") as ac:
@@ -0,0 +1,84 @@
+import logging
+import time
+
+import pytest
+from pydantic import BaseModel
+
+from app.core.flow_cache import FirestoreCacheTier, FlowResultCache, LRUCache, content_key
+
+
+class Entities(BaseModel):
+    skills: list
+
+
+def test_content_key_ignores_whitespace_differences():
+    """Inputs that only differ in whitespace should share a cache key."""
+    assert content_key("flow", "v1", "Senior  Python\nDeveloper ") == content_key("flow", "v1", "Senior Python Developer")
+    assert content_key("flow", "v1", "text") != content_key("flow", "v2", "text")
+
+
+def test_lru_cache_evicts_by_size_and_ttl(monkeypatch):
+    """The LRU tier drops the least recently used entry and expired entries."""
+    cache = LRUCache(max_entries=2, ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    now = time.monotonic()
+    monkeypatch.setattr("app.core.flow_cache.time.monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+
+
+def test_cached_decorator_skips_repeat_calls():
+    """A repeated call with equivalent input is served from the cache."""
+    cache = FlowResultCache(memory=LRUCache())
+    calls = []
+
+    @cache.cached("extract", version="v1", model=Entities)
+    def extract(text: str) -> Entities:
+        calls.append(text)
+        return Entities(skills=[text])
+
+    first = extract("python")
+    second = extract(text="  python ")
+
+    assert calls == ["python"]
+    assert second == first
+    assert cache.stats()["flows"]["extract"] == {"memory_hits": 1, "persistent_hits": 0, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_cached_decorator_supports_async_flows():
+    """Async flows are cached the same way as sync flows."""
+    cache = FlowResultCache(memory=LRUCache())
+    calls = []
+
+    @cache.cached("analyze", version="v1")
+    async def analyze(text: str) -> str:
+        calls.append(text)
+        return text.upper()
+
+    assert await analyze("job ad") == "JOB AD"
+    assert await analyze("job ad") == "JOB AD"
+    assert len(calls) == 1
+
+
+def test_persistent_tier_failures_are_logged_not_raised(monkeypatch, caplog):
+    """An unavailable Firestore tier reads as a miss and drops the write, with a warning for each."""
+    tier = FirestoreCacheTier()
+
+    def unavailable(key):
+        raise RuntimeError("Firestore unavailable")
+
+    monkeypatch.setattr(tier, "_ref", unavailable)
+    with caplog.at_level(logging.WARNING, logger="app.core.flow_cache"):
+        assert tier.get("key-1") is None
+        tier.set("key-1", "flow", "v1", {"a": 1})
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "Flow cache read failed for key-1: Firestore unavailable",
+        "Flow cache write failed for key-1: Firestore unavailable",
+    ]
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from app.core.flow_graph import FlowGraph, FlowGraphError
+
+
+@pytest.mark.asyncio
+async def test_independent_nodes_run_concurrently():
+    """Nodes without dependencies start together, so latency is the critical path."""
+    async def slow(value):
+        await asyncio.sleep(0.1)
+        return value
+
+    graph = FlowGraph("test")
+    graph.add("a", lambda: slow(1))
+    graph.add("b", lambda: slow(2))
+    graph.add("c", lambda: slow(3))
+    graph.add("total", lambda a, b, c: a + b + c, deps=["a", "b", "c"])
+
+    results = await graph.run()
+
+    assert results["total"] == 6
+    assert graph.total_ms < 250
+    assert graph.timings["total"]["start_ms"] >= graph.timings["a"]["end_ms"]
+
+
+@pytest.mark.asyncio
+async def test_node_failure_propagates():
+    """An exception in one node fails the whole run."""
+    def boom():
+        raise ValueError("model error")
+
+    graph = FlowGraph("test")
+    graph.add("a", boom)
+    graph.add("b", lambda a: a, deps=["a"])
+
+    with pytest.raises(ValueError):
+        await graph.run()
+
+
+@pytest.mark.asyncio
+async def test_cycles_and_unknown_dependencies_are_rejected():
+    """Invalid graphs are rejected before any node runs."""
+    graph = FlowGraph("test")
+    graph.add("a", lambda b: b, deps=["b"])
+    graph.add("b", lambda a: a, deps=["a"])
+    with pytest.raises(FlowGraphError):
+        await graph.run()
+
+    graph = FlowGraph("test")
+    graph.add("a", lambda missing: missing, deps=["missing"])
+    with pytest.raises(FlowGraphError):
+        await graph.run()
@@ -0,0 +1,58 @@
+import pytest
+
+from app.core import db as db_module
+from app.core.job_registry import JobDescriptionRegistry, content_hash, estimated_similarity, lsh_bands, minhash
+from benchmarks.fakes import FakeFirestore
+
+JOB_AD = """
+Senior Data Engineer. We are looking for an experienced engineer to design, build and
+operate the batch and streaming pipelines behind our analytics platform. You will work
+with product managers and analysts to model data, own our orchestration and warehouse
+tooling, and mentor two junior engineers. Requirements: five or more years of Python and
+SQL, hands-on experience with Airflow or Dagster, BigQuery or Snowflake, and a cloud
+provider such as GCP or AWS. Nice to have: dbt, Kafka and Terraform. Applications close
+on 14 March. Salary range 150,000 to 170,000 plus equity. Hybrid, two days in the office.
+"""
+
+
+def test_content_hash_ignores_case_and_whitespace():
+    """Exact reposts that only differ in case or spacing share one entry ID."""
+    assert content_hash(JOB_AD) == content_hash("  " + JOB_AD.upper().replace("\n", " "))
+
+
+def test_minhash_matches_lightly_edited_reposts():
+    """A repost with a new closing date is a near duplicate; another ad is not."""
+    repost = JOB_AD.replace("14 March", "2 April")
+    other = "Registered nurse for night shifts in a busy emergency department. " * 8
+
+    original = minhash(JOB_AD)
+    assert estimated_similarity(original, minhash(repost)) >= 0.8
+    assert set(lsh_bands(original)) & set(lsh_bands(minhash(repost)))
+    assert estimated_similarity(original, minhash(other)) < 0.2
+    assert not set(lsh_bands(original)) & set(lsh_bands(minhash(other)))
+
+
+@pytest.mark.asyncio
+async def test_entries_and_near_duplicates_are_scoped_per_user(monkeypatch):
+    """A user's repost reuses their entry; another user's identical or similar ad never does."""
+    firestore = FakeFirestore()
+    monkeypatch.setattr(db_module.db, "_client", firestore)
+    registry = JobDescriptionRegistry()
+
+    first = await registry.resolve("u1", JOB_AD)
+    assert (await registry.resolve("u1", JOB_AD.replace("14 March", "2 April")))["id"] == first["id"]
+
+    other = await registry.resolve("u2", JOB_AD.replace("14 March", "2 April"))
+    assert other["id"] != first["id"] and other["uid"] == "u2"
+    assert await registry.get("u2", first["id"]) is None
+    assert not list(firestore.collection("jobDescriptions").stream())
+
+    computed = []
+
+    async def compute():
+        computed.append(1)
+        return "analysis"
+
+    assert await registry.get_or_compute(first, "analysis", "v1", compute) == "analysis"
+    assert await registry.get_or_compute(first, "analysis", "v1", compute) == "analysis"
+    assert computed == [1]
@@ -0,0 +1,44 @@
+from typing import List
+
+from pydantic import BaseModel
+
+from app.core.json_stream import IncrementalJsonParser, loads_tolerant
+
+
+class StarResponse(BaseModel):
+    situation: str
+    task: str
+    action: str
+    result: str
+
+
+class Requirements(BaseModel):
+    skills: List[str]
+    years: int
+
+
+def test_loads_tolerant_repairs_common_model_output():
+    """Code fences, surrounding prose, trailing commas and truncation are all tolerated."""
+    assert loads_tolerant('```json\n{"skills": ["Python", "SQL",],}\n```') == {"skills": ["Python", "SQL"]}
+    assert loads_tolerant('Here you go: [1, 2, 3] Hope this helps!') == [1, 2, 3]
+    # A truncated document keeps everything that was complete
+    assert loads_tolerant('{"skills": ["Python", "SQ') == {"skills": ["Python"]}
+    assert loads_tolerant('{"years": 5, "skills": ["Python"]') == {"years": 5, "skills": ["Python"]}
+
+
+def test_incremental_parser_yields_partial_models_as_fields_complete():
+    """Fields appear in partial models as soon as they are complete; the result is fully validated."""
+    document = '{"situation": "At Acme", "task": "Migrate jobs", "action": "I led it", "result": "60% fewer failures"}'
+    parser = IncrementalJsonParser(StarResponse)
+    partials = [p for p in (parser.feed(document[i:i + 7]) for i in range(0, len(document), 7)) if p is not None]
+
+    assert any(p.situation == "At Acme" and p.task is None for p in partials)
+    assert all(p.situation in (None, "At Acme") for p in partials)
+    assert parser.result() == StarResponse(situation="At Acme", task="Migrate jobs", action="I led it", result="60% fewer failures")
+
+    numbers = IncrementalJsonParser(Requirements)
+    numbers.feed('{"skills": ["Python"], "years": 1')
+    # A number at the end of a chunk may still be growing
+    assert numbers.snapshot() == {"skills": ["Python"]}
+    numbers.feed("2}")
+    assert numbers.result() == Requirements(skills=["Python"], years=12)
@@ -0,0 +1,55 @@
+import sys
+import types
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core.lazy_routers import LazyRouterMiddleware, LazyRouters
+
+
+@pytest.mark.asyncio
+async def test_routers_load_on_first_request_to_their_prefix(monkeypatch):
+    """A router's module is imported by the first request to its prefix, or by a request for the schema."""
+    def fake_module(name: str, path: str) -> None:
+        module = types.ModuleType(name)
+        module.router = APIRouter()
+        module.router.get(path)(lambda: {"router": name})
+        monkeypatch.setitem(sys.modules, name, module)
+
+    app = FastAPI()
+    app.get("/health")(lambda: {"status": "ok"})
+    routers = LazyRouters(app, prefix="/api/v1")
+    routers.add("/jobs", "lazy_jobs", tags=["jobs"])
+    routers.add("/ksc", "lazy_ksc", tags=["ksc"])
+    app.add_middleware(LazyRouterMiddleware, routers=routers, load_all_paths=(app.openapi_url,))
+    fake_module("lazy_jobs", "/list")
+    fake_module("lazy_ksc", "/list")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/health")).status_code == 200
+        assert routers.pending == ["/api/v1/jobs", "/api/v1/ksc"]
+
+        assert (await client.get("/api/v1/jobs/list")).json() == {"router": "lazy_jobs"}
+        assert routers.pending == ["/api/v1/ksc"]
+
+        schema = (await client.get("/openapi.json")).json()
+        assert "/api/v1/ksc/list" in schema["paths"]
+        assert routers.pending == []
+
+
+@pytest.mark.asyncio
+async def test_load_all_skips_routers_that_fail_to_import(monkeypatch):
+    """A broken router is logged and left pending; the routers after it still load."""
+    app = FastAPI()
+    routers = LazyRouters(app, prefix="/api/v1")
+    routers.add("/broken", "lazy_broken_router_that_does_not_exist")
+    routers.add("/ok", "lazy_ok")
+    module = types.ModuleType("lazy_ok")
+    module.router = APIRouter()
+    module.router.get("/ping")(lambda: "pong")
+    monkeypatch.setitem(sys.modules, "lazy_ok", module)
+
+    await routers.load_all()
+    assert routers.pending == ["/api/v1/broken"]
+    assert "/api/v1/ok/ping" in app.openapi()["paths"]
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.lifespan import WarmUp
+
+
+@pytest.mark.asyncio
+async def test_warm_up_runs_components_concurrently_and_reports_timings():
+    """Sync and async components warm up in parallel; failures are reported without blocking readiness."""
+    warm_up = WarmUp(timeout=5)
+    # Each component waits for the other to start, so both only succeed
+    # when they run side by side rather than one after the other
+    sync_started, async_started = threading.Event(), threading.Event()
+
+    @warm_up.component("sync_client")
+    def sync_client():
+        sync_started.set()
+        if not async_started.wait(timeout=2):
+            raise TimeoutError("async_keys did not start")
+
+    @warm_up.component("async_keys")
+    async def async_keys():
+        async_started.set()
+        if not await asyncio.to_thread(sync_started.wait, 2):
+            raise TimeoutError("sync_client did not start")
+
+    @warm_up.component("broken")
+    def broken():
+        raise RuntimeError("no credentials")
+
+    assert warm_up.status()["components"]["sync_client"] == {"status": "pending"}
+    warm_up.start()
+    assert not warm_up.ready
+    await asyncio.wait_for(warm_up._task, timeout=5)
+
+    status = warm_up.status()
+    assert status["ready"]
+    assert status["components"]["sync_client"]["status"] == "ok"
+    assert status["components"]["async_keys"]["status"] == "ok"
+    assert status["components"]["async_keys"]["ms"] >= 0
+    assert status["components"]["broken"]["status"] == "error"
+    assert status["total_ms"] >= status["components"]["async_keys"]["ms"]
@@ -0,0 +1,51 @@
+import pytest
+from fastapi import HTTPException
+from limits.storage import MemoryStorage
+from starlette.requests import Request
+
+from app.core.limiter import ModelTokenBudget
+
+
+def _request(content_length: int) -> Request:
+    headers = [(b"content-length", str(content_length).encode())]
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers, "client": ("10.0.0.1", 1234)})
+
+
+def test_token_budget_is_shared_between_workers():
+    """Two workers on the same storage draw from one budget, charged by cost rather than by request."""
+    storage = MemoryStorage()
+    worker_a = ModelTokenBudget("1000/minute", storage=storage)
+    worker_b = ModelTokenBudget("1000/minute", storage=storage)
+
+    assert worker_a.charge("user-1", 600) is None
+    assert worker_b.charge("user-1", 300) is None
+    retry_after = worker_b.charge("user-1", 200)
+    assert retry_after is not None and 0 <= retry_after <= 60
+    # Other users and cheap requests are unaffected
+    assert worker_a.charge("user-2", 900) is None
+    assert worker_a.charge("user-1", 100) is None
+
+
+def test_dependency_charges_estimated_tokens():
+    """Endpoints are charged their fixed prompt cost plus the payload size in tokens."""
+    budget = ModelTokenBudget("1000/minute", storage=MemoryStorage())
+    charge = budget.dependency(prompt_tokens=200, input_multiplier=2)
+
+    # 200 + (800 bytes / 4 chars per token) * 2 = 600 tokens
+    charge(_request(800), {"uid": "user-1"})
+    with pytest.raises(HTTPException) as exc_info:
+        charge(_request(800), {"uid": "user-1"})
+    assert exc_info.value.status_code == 429
+    assert int(exc_info.value.headers["Retry-After"]) > 0
+    # Charged per user, not per client address
+    charge(_request(800), {"uid": "user-2"})
+
+
+def test_budget_keeps_one_counter_per_user():
+    """The budget uses a counter strategy, so a large charge is one entry rather than one per token."""
+    storage = MemoryStorage()
+    budget = ModelTokenBudget("500000/hour", storage=storage)
+    assert budget.charge("user-1", 20000) is None
+    assert sum(len(entries) for entries in storage.events.values()) == 0
+    with pytest.raises(ValueError):
+        ModelTokenBudget("1000/minute", storage=storage, strategy="moving-window")
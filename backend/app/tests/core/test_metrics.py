@@ -0,0 +1,54 @@
+import pytest
+
+from app.core import metrics
+from app.core.metrics import instrumented
+
+
+def _flow_runs(flow: str, status: str) -> float:
+    return metrics.registry.get_sample_value(
+        "careercopilot_flow_duration_seconds_count", {"flow": flow, "endpoint": "none", "status": status}
+    ) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_streaming_flows_own_their_model_calls_until_closed():
+    """An instrumented async generator owns the calls it makes, not the consumer's, and is measured once it closes."""
+    seen = []
+
+    @instrumented("streamTest")
+    async def stream(count: int):
+        try:
+            for i in range(count):
+                seen.append(("flow", metrics._current_flow.get()))
+                yield i
+        finally:
+            seen.append(("close", metrics._current_flow.get()))
+
+    before = _flow_runs("streamTest", "ok")
+    async for _ in stream(2):
+        seen.append(("consumer", metrics._current_flow.get()))
+    assert seen == [("flow", "streamTest"), ("consumer", "none"), ("flow", "streamTest"), ("consumer", "none"), ("close", "streamTest")]
+    assert _flow_runs("streamTest", "ok") == before + 1
+
+    # A consumer that stops early still closes the flow and records the run
+    seen.clear()
+    items = stream(5)
+    assert await items.__anext__() == 0
+    await items.aclose()
+    assert seen == [("flow", "streamTest"), ("close", "streamTest")]
+    assert _flow_runs("streamTest", "ok") == before + 2
+
+
+@pytest.mark.asyncio
+async def test_streaming_flow_errors_are_recorded():
+    """An error raised while streaming is recorded against the flow and propagates."""
+
+    @instrumented("failingStreamTest")
+    async def stream():
+        yield 1
+        raise RuntimeError("model unavailable")
+
+    with pytest.raises(RuntimeError):
+        async for _ in stream():
+            pass
+    assert _flow_runs("failingStreamTest", "error") == 1
@@ -0,0 +1,59 @@
+import pytest
+from pydantic import BaseModel
+
+from app.core.model_backends import FixtureNotFoundError, FixtureStore, RecordingModel, ReplayModel
+
+
+class Requirements(BaseModel):
+    skills: list
+
+
+class LiveResponse:
+    def __init__(self, text: str, output=None):
+        self._text = text
+        self._output = output
+
+    def text(self) -> str:
+        return self._text
+
+    def output(self):
+        return self._output
+
+
+class LiveModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt: str, output_schema=None, **kwargs):
+        self.calls += 1
+        if output_schema is not None:
+            return LiveResponse('{"skills": ["Python"]}', output_schema(skills=["Python"]))
+        return LiveResponse(f"echo: {prompt}")
+
+
+@pytest.mark.asyncio
+async def test_recorded_calls_replay_without_the_live_model(tmp_path):
+    """Responses recorded from the live model are served back in replay mode, keyed by prompt and schema."""
+    store = FixtureStore(tmp_path)
+    live = LiveModel()
+    recorder = RecordingModel(live, store)
+    await recorder.generate(prompt="Extract skills", output_schema=Requirements)
+    await recorder.generate(prompt="Say hi")
+    assert live.calls == 2
+
+    replay = ReplayModel(store)
+    structured = await replay.generate(prompt="Extract skills", output_schema=Requirements)
+    assert structured.output() == Requirements(skills=["Python"])
+    assert (await replay.generate(prompt="Say hi")).text() == "echo: Say hi"
+    assert "".join([chunk async for chunk in await replay.generate_stream(prompt="Say hi")]) == "echo: Say hi"
+    assert live.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_replay_miss_raises_or_uses_fallback(tmp_path):
+    """Unrecorded prompts fail loudly unless a synthetic fallback is configured."""
+    with pytest.raises(FixtureNotFoundError):
+        await ReplayModel(FixtureStore(tmp_path)).generate(prompt="unknown")
+
+    replay = ReplayModel(FixtureStore(tmp_path), fallback=lambda prompt, schema: {"text": "synthetic"})
+    assert (await replay.generate(prompt="unknown")).text() == "synthetic"
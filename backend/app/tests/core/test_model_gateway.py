@@ -0,0 +1,56 @@
+import asyncio
+import logging
+
+import pytest
+
+from app.core import model_gateway
+
+
+class _FlakyModel:
+    """Times out on the first call, then answers."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.calls == 1:
+            raise asyncio.TimeoutError()
+        return "response"
+
+
+@pytest.mark.asyncio
+async def test_retries_are_logged_and_timed_without_the_backoff(monkeypatch, caplog):
+    """Each attempt is recorded with its own duration; the backoff is excluded and the retry is logged."""
+    calls = []
+    monkeypatch.setattr(model_gateway, "init_genkit", lambda: None)
+    monkeypatch.setattr(model_gateway, "_retry_delay", lambda attempt: 0.2)
+    monkeypatch.setattr(model_gateway.metrics, "record_model_retry", lambda error: None)
+    monkeypatch.setattr(model_gateway.metrics, "record_model_call", lambda duration, prompt, response=None, error=None: calls.append((duration, response, error)))
+    model = _FlakyModel()
+
+    with caplog.at_level(logging.WARNING, logger="app.core.model_gateway"):
+        assert await model_gateway.generate("prompt", model=model, max_retries=1) == "response"
+
+    assert [(response, type(error)) for _, response, error in calls] == [(None, asyncio.TimeoutError), ("response", type(None))]
+    assert all(duration < 0.1 for duration, _, _ in calls)
+    assert "retry 1/1 in 0.20s" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_non_transient_errors_are_not_retried(monkeypatch):
+    """Errors outside TRANSIENT_ERRORS are recorded once and raised immediately."""
+    monkeypatch.setattr(model_gateway, "init_genkit", lambda: None)
+    monkeypatch.setattr(model_gateway.metrics, "record_model_call", lambda *args, **kwargs: None)
+
+    class _Broken:
+        calls = 0
+
+        async def generate(self, prompt, **kwargs):
+            _Broken.calls += 1
+            raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await model_gateway.generate("prompt", model=_Broken(), max_retries=3)
+    assert _Broken.calls == 1
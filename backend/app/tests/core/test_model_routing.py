@@ -0,0 +1,134 @@
+import json
+import logging
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from app.core import model_routing
+from app.core.model_routing import FAST, STRONG, ModelRouter, completeness
+
+
+class _Answer(BaseModel):
+    title: str
+    skills: List[str] = []
+    seniority: Optional[str] = None
+
+
+class _Response:
+    def __init__(self, text: str):
+        self._text = text
+
+    def text(self) -> str:
+        return self._text
+
+    def output(self):
+        return json.loads(self._text)
+
+
+class _Gateway:
+    """Fake gateway answering each tier with a canned response and recording the tiers called."""
+
+    def __init__(self, answers: dict):
+        self.answers = answers
+        self.tiers = []
+
+    async def generate(self, prompt, output_schema=None, config=None, model=None):
+        # The router passes no model for the strong tier
+        tier = STRONG if model is None else FAST
+        self.tiers.append(tier)
+        answer = self.answers[tier]
+        if isinstance(answer, Exception):
+            raise answer
+        return _Response(answer)
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """Installs a fake gateway and fast model, and records route and escalation metrics."""
+    events = []
+    monkeypatch.setattr(model_routing, "fast_model", object())
+    monkeypatch.setattr(model_routing.metrics, "record_model_route", lambda flow, tier: events.append(("route", tier)))
+    monkeypatch.setattr(model_routing.metrics, "record_model_escalation", lambda flow, tier, reason: events.append((reason, tier)))
+
+    def install(answers: dict) -> _Gateway:
+        fake = _Gateway(answers)
+        monkeypatch.setattr(model_routing.model_gateway, "generate", fake.generate)
+        fake.events = events
+        return fake
+
+    return install
+
+
+STRONG_ANSWER = json.dumps({"title": "Data Engineer", "skills": ["SQL"], "seniority": "senior"})
+ROUTER = ModelRouter({"extract": [FAST, STRONG]}, min_confidence=0.5)
+
+
+@pytest.mark.asyncio
+async def test_a_valid_confident_fast_answer_is_not_escalated(gateway):
+    """The fast tier's answer is used when it validates and is confident enough."""
+    fake = gateway({FAST: json.dumps({"title": "Data Engineer", "skills": ["SQL", "Python"]})})
+    answer = await ROUTER.generate("extract", "prompt", _Answer, confidence=completeness)
+
+    assert answer.skills == ["SQL", "Python"]
+    assert fake.tiers == [FAST] and fake.events == [("route", FAST)]
+
+
+@pytest.mark.asyncio
+async def test_an_invalid_fast_answer_escalates_to_the_strong_tier(gateway):
+    """A fast answer that fails schema validation is retried on the strong tier."""
+    fake = gateway({FAST: json.dumps({"skills": "not a list"}), STRONG: STRONG_ANSWER})
+    answer = await ROUTER.generate("extract", "prompt", _Answer, confidence=completeness)
+
+    assert answer.title == "Data Engineer"
+    assert fake.tiers == [FAST, STRONG] and fake.events == [("invalid", FAST), ("route", STRONG)]
+
+
+@pytest.mark.asyncio
+async def test_a_low_confidence_fast_answer_escalates_but_the_last_tier_is_final(gateway):
+    """A sparse fast answer escalates; the strong tier's answer is accepted whatever its confidence."""
+    fake = gateway({FAST: json.dumps({"title": "Engineer"}), STRONG: json.dumps({"title": "Engineer"})})
+    answer = await ROUTER.generate("extract", "prompt", _Answer, confidence=completeness)
+
+    assert answer.title == "Engineer"
+    assert fake.tiers == [FAST, STRONG] and fake.events == [("low_confidence", FAST), ("route", STRONG)]
+
+
+@pytest.mark.asyncio
+async def test_unrouted_flows_and_disabled_routing_use_only_the_strong_tier(gateway):
+    """Flows without a route, or any flow with routing disabled, never call the fast tier; a final invalid answer raises."""
+    fake = gateway({STRONG: STRONG_ANSWER})
+    await ROUTER.generate("unrouted", "prompt", _Answer)
+    await ModelRouter({"extract": [FAST, STRONG]}, enabled=False).generate("extract", "prompt", _Answer)
+    assert fake.tiers == [STRONG, STRONG]
+
+    fake = gateway({STRONG: json.dumps({"skills": []})})
+    with pytest.raises(ValidationError):
+        await ROUTER.generate("unrouted", "prompt", _Answer)
+
+
+@pytest.mark.asyncio
+async def test_a_failed_fast_call_escalates_but_a_failed_last_call_raises(gateway):
+    """An error from the fast tier's model call is escalated like an invalid answer; the strong tier's error is final."""
+    fake = gateway({FAST: TimeoutError("fast tier timed out"), STRONG: STRONG_ANSWER})
+    answer = await ROUTER.generate("extract", "prompt", _Answer, confidence=completeness)
+
+    assert answer.title == "Data Engineer"
+    assert fake.tiers == [FAST, STRONG] and fake.events == [("error", FAST), ("route", STRONG)]
+
+    gateway({FAST: TimeoutError("fast tier timed out"), STRONG: TimeoutError("strong tier timed out")})
+    with pytest.raises(TimeoutError, match="strong"):
+        await ROUTER.generate("extract", "prompt", _Answer)
+
+
+@pytest.mark.asyncio
+async def test_a_missing_fast_model_skips_the_fast_tier(gateway, monkeypatch, caplog):
+    """An unknown MODEL_FAST_TIER is logged and routes every flow to the strong tier once."""
+    monkeypatch.setattr(model_routing, "MODEL_FAST_TIER", "gemini_flsh")
+    with caplog.at_level(logging.ERROR, logger="app.core.model_routing"):
+        monkeypatch.setattr(model_routing, "fast_model", model_routing._select_fast_model())
+    assert model_routing.fast_model is None and "gemini_flsh" in caplog.text
+
+    fake = gateway({STRONG: STRONG_ANSWER})
+    await ROUTER.generate("extract", "prompt", _Answer, confidence=completeness)
+    assert fake.tiers == [STRONG] and fake.events == [("route", STRONG)]
@@ -0,0 +1,224 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from google.api_core.exceptions import AlreadyExists
+
+from app.core import repositories
+from app.core.lazy import LazyClient
+from app.core.repositories import decode_cursor, encode_cursor
+from app.core.repositories import AnalysisRepository, DocumentRepository, OpportunityRepository, UserRepository
+
+
+class _Snapshot:
+    def __init__(self, ref, data):
+        self.id = ref.id
+        self.reference = ref
+        self.exists = data is not None
+        self._data = data
+        self.create_time = (data or {}).get("_created")
+
+    def to_dict(self):
+        return dict(self._data) if self.exists else None
+
+
+class _Query:
+    """
+    Equality filters, projection, a limit and a start_after cursor. Ordered
+    queries sort by found_at then ID, descending, and like Firestore leave
+    out documents without found_at.
+    """
+
+    def __init__(self, client, path, filters=(), fields=None, limit=None, after=None, ordered=False):
+        self.client, self.path, self.filters, self.fields, self._limit, self.after = client, path, filters, fields, limit, after
+        self.ordered = ordered
+
+    def _with(self, **changes):
+        state = {"filters": self.filters, "fields": self.fields, "limit": self._limit, "after": self.after, "ordered": self.ordered, **changes}
+        return _Query(self.client, self.path, **state)
+
+    def where(self, field, op, value):
+        return self._with(filters=self.filters + ((field, value),))
+
+    def select(self, fields):
+        return self._with(fields=fields)
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._with(ordered=True)
+
+    def limit(self, count):
+        return self._with(limit=count)
+
+    def start_after(self, values):
+        return self._with(after=(values["found_at"], values["__name__"]))
+
+    async def stream(self):
+        self.client.calls.append("stream")
+        prefix = self.path + "/"
+        rows = [(path[len(prefix):], data) for path, data in self.client.documents.items()
+                if path.startswith(prefix) and "/" not in path[len(prefix):]]
+        if self.ordered:
+            rows = sorted((row for row in rows if "found_at" in row[1]), key=lambda row: (row[1]["found_at"], row[0]), reverse=True)
+        rows = [row for row in rows if all(row[1].get(f) == v for f, v in self.filters)]
+        if self.after:
+            rows = [row for row in rows if (row[1]["found_at"], row[0]) < self.after]
+        for document_id, data in rows[:self._limit]:
+            snapshot = _Snapshot(_Ref(self.client, prefix + document_id), data)
+            if self.fields:
+                snapshot._data = {f: data[f] for f in self.fields if f in data}
+            yield snapshot
+
+
+class _Ref(_Query):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return _Ref(self.client, f"{self.path}/{name}")
+
+    def document(self, document_id):
+        return _Ref(self.client, f"{self.path}/{document_id}")
+
+    async def get(self, field_paths=None):
+        self.client.calls.append("get")
+        return _Snapshot(self, self.client.documents.get(self.path))
+
+    async def set(self, data, merge=False):
+        self.client.calls.append("set")
+        self.client.documents[self.path] = {**(self.client.documents.get(self.path) or {}), **data} if merge else dict(data)
+
+    async def create(self, data):
+        if self.path in self.client.documents:
+            raise AlreadyExists(self.path)
+        await self.set(data)
+
+
+class _Batch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref.path, data, merge))
+
+    async def commit(self):
+        self.client.calls.append(f"commit:{len(self.writes)}")
+        for path, data, merge in self.writes:
+            self.client.documents[path] = {**(self.client.documents.get(path) or {}), **data} if merge else dict(data)
+
+
+class AsyncFakeFirestore:
+    """Async in-memory client covering the calls the repositories make."""
+
+    def __init__(self):
+        self.documents = {}
+        self.calls = []
+
+    def collection(self, name):
+        return _Ref(self, name)
+
+    def batch(self):
+        return _Batch(self)
+
+    async def get_all(self, references, field_paths=None):
+        self.calls.append("get_all")
+        for ref in references:
+            yield _Snapshot(ref, self.documents.get(ref.path))
+
+
+@pytest.fixture
+def client():
+    fake = AsyncFakeFirestore()
+    lazy = LazyClient(lambda: None)
+    lazy.override(fake)
+    return lazy
+
+
+@pytest.mark.asyncio
+async def test_users_are_created_once_and_merged(client):
+    """Creating an existing user fails; merges keep the other fields."""
+    users = UserRepository(client)
+    assert await users.create("u1", {"email": "a@example.com"}) == {"email": "a@example.com"}
+    with pytest.raises(AlreadyExists):
+        await users.create("u1", {"email": "b@example.com"})
+    await users.merge("u1", {"preferences": {"themeId": "modern"}})
+    assert await users.get("u1") == {"email": "a@example.com", "preferences": {"themeId": "modern"}}
+    assert await users.get("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_multi_document_reads_use_one_round_trip(client):
+    """`get_many` reads all documents with a single get_all, in request order, None for missing ones."""
+    documents = DocumentRepository(client)
+    first = await documents.create("u1", {"type": "resume"})
+    second = await documents.create("u1", {"type": "ksc"})
+    client.calls.clear()
+
+    found = await documents.get_many("u1", [second["id"], "missing", first["id"]])
+    assert list(found) == [second["id"], "missing", first["id"]]
+    assert found["missing"] is None and found[first["id"]]["type"] == "resume"
+    assert client.calls == ["get_all"]
+    assert await OpportunityRepository(client).get_many("u1", []) == {}
+
+
+@pytest.mark.asyncio
+async def test_analyses_are_written_in_bounded_batches(client, monkeypatch):
+    """Analyses are saved in as few batches as the write limit allows, and their IDs returned in order."""
+    monkeypatch.setattr(repositories, "FIRESTORE_MAX_BATCH_WRITES", 2)
+    analyses = AnalysisRepository(client)
+    ids = await analyses.create_many("u1", "doc-1", [{"score": i} for i in range(5)])
+    assert client.calls == ["commit:2", "commit:2", "commit:1"]
+    assert [client.documents[f"users/u1/documents/doc-1/analyses/{i}"]["score"] for i in ids] == [0, 1, 2, 3, 4]
+    assert await analyses.create_many("u1", "doc-1", []) == []
+
+
+@pytest.mark.asyncio
+async def test_opportunities_are_paged_by_cursor_with_filters_and_projection(client):
+    """Pages follow found_at (newest first, ties by ID) without gaps or repeats, and honor filters and fields."""
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for i in range(7):
+        # Two opportunities per timestamp exercise the ID tie-break
+        client.documents[f"users/u1/opportunities/opp-{i}"] = {
+            "title": f"Job {i}", "company": "Acme" if i % 2 else "Globex", "status": "new",
+            "description": "long text", "found_at": start + timedelta(minutes=i // 2),
+        }
+    client.documents["users/u2/opportunities/other"] = {"title": "Not mine", "found_at": start}
+    opportunities = OpportunityRepository(client)
+
+    ids, cursor = [], None
+    while True:
+        items, cursor = await opportunities.page("u1", 3, cursor, fields=["title"])
+        ids += [item["id"] for item in items]
+        assert all(set(item) == {"id", "title", "found_at"} for item in items)
+        if cursor is None:
+            break
+    assert ids == ["opp-6", "opp-5", "opp-4", "opp-3", "opp-2", "opp-1", "opp-0"]
+
+    items, cursor = await opportunities.page("u1", 10, company="Acme", status="new")
+    assert [item["id"] for item in items] == ["opp-5", "opp-3", "opp-1"] and cursor is None
+
+    exported = [item["id"] async for item in opportunities.stream("u1", company="Globex", page_size=2)]
+    assert exported == ["opp-6", "opp-4", "opp-2", "opp-0"]
+
+
+@pytest.mark.asyncio
+async def test_opportunities_without_found_at_are_backfilled_into_listings(client):
+    """Listings skip opportunities missing found_at until the backfill sets it from their creation time."""
+    created = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    client.documents["users/u1/opportunities/new"] = {"title": "New", "found_at": created + timedelta(days=1)}
+    client.documents["users/u1/opportunities/legacy"] = {"title": "Legacy", "calendar_event_id": "e1", "_created": created}
+    opportunities = OpportunityRepository(client)
+    assert [item["id"] for item in (await opportunities.page("u1", 10))[0]] == ["new"]
+
+    assert await opportunities.backfill_found_at("u1") == 1
+    assert client.documents["users/u1/opportunities/legacy"]["calendar_event_id"] == "e1"
+    assert [item["id"] for item in (await opportunities.page("u1", 10))[0]] == ["new", "legacy"]
+    assert await opportunities.backfill_found_at("u1") == 0
+
+
+def test_cursor_round_trip_and_rejection():
+    """Cursors are opaque but round-trip; malformed ones raise ValueError."""
+    found_at = datetime(2025, 1, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(found_at, "opp-1")) == (found_at, "opp-1")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
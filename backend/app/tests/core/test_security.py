@@ -0,0 +1,119 @@
+import time
+
+import pytest
+from starlette.requests import Request
+
+from app.core import security
+from app.core.security import AuthenticationError, TokenCache, verify_request
+
+
+def _request(token: str = None) -> Request:
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_token_cache_honors_expiry_revocation_window_and_size(monkeypatch):
+    """Entries expire with the token or after the revocation window, and the cache stays bounded."""
+    now = time.time()
+    cache = TokenCache(max_entries=2, revocation_window=60)
+    cache.put("short", {"uid": "a", "exp": now + 10})
+    cache.put("long", {"uid": "b", "exp": now + 3600})
+    assert cache.get("short") == {"uid": "a", "exp": now + 10}
+
+    monkeypatch.setattr("app.core.security.time.time", lambda: now + 30)
+    assert cache.get("short") is None
+    assert cache.get("long")["uid"] == "b"
+    monkeypatch.setattr("app.core.security.time.time", lambda: now + 61)
+    assert cache.get("long") is None
+
+    cache.put("x", {"exp": now + 3600})
+    cache.put("y", {"exp": now + 3600})
+    cache.put("z", {"exp": now + 3600})
+    assert cache.get("x") is None and cache.get("z") is not None
+
+
+def test_one_verification_per_request_and_per_token(monkeypatch):
+    """The limiter and the dependency share one verification; failures are not retried within a request."""
+    calls = []
+
+    def verify_id_token(token, check_revoked=False):
+        calls.append(token)
+        if token == "bad":
+            raise ValueError("Invalid token")
+        return {"uid": "user-1", "exp": time.time() + 3600}
+
+    monkeypatch.setattr(security, "init_firebase", lambda: None)
+    monkeypatch.setattr(security.auth, "verify_id_token", verify_id_token)
+    monkeypatch.setattr(security, "token_cache", TokenCache())
+
+    request = _request("good")
+    assert verify_request(request)["uid"] == "user-1"
+    assert verify_request(request, "good")["uid"] == "user-1"
+    # A later request with the same token is served from the cache
+    assert verify_request(_request("good"))["uid"] == "user-1"
+    assert calls == ["good"]
+
+    bad = _request("bad")
+    for _ in range(2):
+        with pytest.raises(AuthenticationError):
+            verify_request(bad)
+    assert calls == ["good", "bad"]
+
+    with pytest.raises(AuthenticationError):
+        verify_request(_request())
+
+
+def _signed_tokens(*claim_sets: dict, key_id: str = "key-1"):
+    """Signs each claim set with one fresh RSA key and returns the tokens and the key's certificate map."""
+    from datetime import datetime, timedelta, timezone
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+    from google.auth import crypt, jwt
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(1).not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    signer = crypt.RSASigner.from_string(pem, key_id=key_id)
+    tokens = [jwt.encode(signer, claims).decode() for claims in claim_sets]
+    return tokens, {key_id: cert.public_bytes(serialization.Encoding.PEM).decode()}
+
+
+@pytest.mark.asyncio
+async def test_async_verification_checks_signatures_locally(monkeypatch):
+    """Tokens are verified against the pre-fetched keys; the revocation lookup runs once per cache miss."""
+    now = int(time.time())
+    claims = {"iss": "https://securetoken.google.com/demo", "aud": "demo", "sub": "user-1", "iat": now, "exp": now + 3600, "auth_time": now}
+    (token, wrong_issuer, wrong_audience), certs = _signed_tokens(
+        claims,
+        {**claims, "iss": "https://securetoken.google.com/other"},
+        {**claims, "aud": "other"},
+    )
+    (forged,), _ = _signed_tokens(claims)
+
+    revocation_checks = []
+    monkeypatch.setattr(security, "FIREBASE_PROJECT_ID", "demo")
+    monkeypatch.setattr(security, "TOKEN_CHECK_REVOKED", True)
+    monkeypatch.setattr(security, "token_cache", TokenCache())
+    monkeypatch.setattr(security, "_check_revoked", lambda c: revocation_checks.append(c["uid"]))
+    monkeypatch.setattr(security.signing_keys, "certs", certs)
+    monkeypatch.setattr(security.signing_keys, "_expires_at", time.time() + 3600)
+    monkeypatch.setattr(security.signing_keys, "_fetched_at", time.time())
+
+    assert (await security.verify_token_async(token))["uid"] == "user-1"
+    assert (await security.verify_token_async(token))["uid"] == "user-1"
+    assert revocation_checks == ["user-1"]
+
+    # Validly signed tokens for another project are rejected on their claims
+    for token in (forged, wrong_issuer, wrong_audience):
+        with pytest.raises(AuthenticationError):
+            await security.verify_token_async(token)
+    assert revocation_checks == ["user-1"]
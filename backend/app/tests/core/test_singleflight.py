@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    """Callers with the same arguments get one execution's result; others run separately."""
+    group = SingleFlight()
+    executions = []
+
+    @group.coalesce("score")
+    async def score(text: str) -> str:
+        executions.append(text)
+        await asyncio.sleep(0.01)
+        return text.upper()
+
+    results = await asyncio.gather(score("resume"), score(text="resume"), score("other"))
+
+    assert results == ["RESUME", "RESUME", "OTHER"]
+    assert sorted(executions) == ["other", "resume"]
+    assert group.stats()["flows"]["score"] == {"calls": 3, "executed": 2, "collapsed": 1, "remote_collapsed": 0}
+    assert group.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_collapsed_callers_receive_the_same_exception():
+    """A failed call raises for every caller that was waiting on it, and is not remembered."""
+    group = SingleFlight()
+    attempts = []
+
+    @group.coalesce("score")
+    async def score(text: str) -> str:
+        attempts.append(text)
+        await asyncio.sleep(0.01)
+        raise ValueError("model unavailable")
+
+    results = await asyncio.gather(score("resume"), score("resume"), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+    with pytest.raises(ValueError):
+        await score("resume")
+    assert len(attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_same_key_in_different_namespaces_is_not_collapsed():
+    """Calls are only shared within a namespace, even when their keys are identical."""
+    group = SingleFlight()
+    executions = []
+
+    async def run(namespace: str) -> str:
+        executions.append(namespace)
+        await asyncio.sleep(0.01)
+        return namespace
+
+    results = await asyncio.gather(group.do("score", "same-key", lambda: run("score")), group.do("rank", "same-key", lambda: run("rank")))
+
+    assert results == ["score", "rank"]
+    assert sorted(executions) == ["rank", "score"]
+    assert group.stats()["in_flight"] == 0
+
+
+class _BrokenLease:
+    """A lease whose reads and releases fail; `held_by_other` decides whether acquiring it succeeds."""
+
+    def __init__(self, held_by_other: bool):
+        self.held_by_other = held_by_other
+
+    def acquire(self, key):
+        if not self.held_by_other:
+            return None
+        return {"status": "running", "expiresAt": datetime.now(timezone.utc) + timedelta(seconds=60)}
+
+    def read(self, key):
+        raise RuntimeError("Firestore unavailable")
+
+    def release(self, key, value=None, error=None):
+        raise RuntimeError("Firestore unavailable")
+
+
+@pytest.mark.asyncio
+async def test_lease_failures_do_not_fail_the_call(monkeypatch):
+    """A caller falls back to running locally when the lease can't be read, and keeps its result when it can't be released."""
+    monkeypatch.setattr("app.core.singleflight.SINGLEFLIGHT_POLL_INTERVAL_SECONDS", 0)
+
+    async def score() -> str:
+        return "RESUME"
+
+    async def fail() -> str:
+        raise ValueError("model unavailable")
+
+    waiting = SingleFlight(lease=_BrokenLease(held_by_other=True))
+    assert await waiting.do("score", "key", score) == "RESUME"
+    assert waiting.stats()["flows"]["score"]["executed"] == 1
+
+    holding = SingleFlight(lease=_BrokenLease(held_by_other=False))
+    assert await holding.do("score", "key", score) == "RESUME"
+    with pytest.raises(ValueError):
+        await holding.do("score", "key", fail)
@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+
+from app.genkit_flows import ats_scoring
+from app.genkit_flows.ats_scoring import AtsResult, FusedAtsAnalysis, ScoreBreakdown, SemanticAnalysis
+from app.genkit_flows.extract_job_requirements import JobRequirements
+from app.genkit_flows.extract_resume_entities import ResumeEntities
+from app.genkit_flows.keyword_placer import KeywordPlacementSuggestion
+
+
+@pytest.fixture
+def semantic(monkeypatch):
+    """Stubs the local scorer at a settable score and records model calls."""
+    state = {"local_score": 90, "llm_calls": 0}
+
+    async def llm_semantic_analysis(resumeText, jobDescription):
+        state["llm_calls"] += 1
+        return SemanticAnalysis(similarityScore=70, explanation="model")
+
+    monkeypatch.setattr(ats_scoring, "_llm_semantic_analysis", llm_semantic_analysis)
+    monkeypatch.setattr(ats_scoring, "local_semantic_similarity", lambda resume, job: (state["local_score"], "local"))
+    return state
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode, local_score, expected, llm_calls", [
+    ("llm", 90, "model", 1),
+    ("local", 65, "local", 0),
+    ("hybrid", 90, "local", 0),
+    ("hybrid", 65, "model", 1),
+])
+async def test_semantic_mode_selects_the_scorer(semantic, monkeypatch, mode, local_score, expected, llm_calls):
+    """llm always asks the model, local never does, and hybrid escalates only borderline local scores."""
+    monkeypatch.setattr(ats_scoring, "ATS_SEMANTIC_MODE", mode)
+    semantic["local_score"] = local_score
+
+    result = await ats_scoring._semantic_analysis("resume", "job")
+    assert result.explanation == expected and semantic["llm_calls"] == llm_calls
+
+
+@pytest.mark.asyncio
+async def test_unknown_semantic_mode_is_rejected(semantic, monkeypatch):
+    """A misspelled mode fails loudly instead of silently scoring locally."""
+    monkeypatch.setattr(ats_scoring, "ATS_SEMANTIC_MODE", "hybird")
+    with pytest.raises(ValueError, match="hybird"):
+        await ats_scoring._semantic_analysis("resume", "job")
+
+
+@pytest.mark.asyncio
+async def test_unknown_execution_mode_is_rejected(monkeypatch):
+    """A misspelled execution mode fails loudly instead of silently running the graph."""
+    monkeypatch.setattr(ats_scoring, "ATS_EXECUTION_MODE", "fuse")
+    with pytest.raises(ValueError, match="fuse"):
+        await ats_scoring._run_ats_pipeline("resume", "job")
+    with pytest.raises(ValueError, match="fuse"):
+        await ats_scoring.score_resume_against_jobs("resume", ["job"])
+
+
+def _result(score: float) -> AtsResult:
+    return AtsResult(
+        overallScore=score,
+        breakdown=ScoreBreakdown(keywordScore=score, semanticScore=score, formattingScore=score),
+        matchedKeywords=[], missingKeywords=[], recommendations=[],
+    )
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Stubs resume extraction and the per-job pipeline, recording their calls."""
+    calls = {"extract": 0, "jobs": []}
+
+    class _Extract:
+        async def run(self, resumeText):
+            calls["extract"] += 1
+            return "entities"
+
+    async def run_ats_pipeline(resumeText, jobDescription, profileKeywords=None, resume_entities=None, job_entry=None, mode=None):
+        calls["jobs"].append((jobDescription, resume_entities, job_entry))
+        await asyncio.sleep(0.01)
+        if jobDescription == "bad":
+            raise RuntimeError("model unavailable")
+        return _result(len(jobDescription))
+
+    monkeypatch.setattr(ats_scoring, "ATS_EXECUTION_MODE", "graph")
+    monkeypatch.setattr(ats_scoring, "extractResumeEntities", _Extract())
+    monkeypatch.setattr(ats_scoring, "_run_ats_pipeline", run_ats_pipeline)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_batch_extracts_the_resume_once_and_isolates_failures(pipeline):
+    """The resume is extracted once; results keep the input order and a failed job yields its exception."""
+    results = await ats_scoring.score_resume_against_jobs("resume", ["short", "bad", "much longer"], jobEntries=[None, None, {"id": "jd-1"}])
+
+    assert pipeline["extract"] == 1
+    assert [r.overallScore if isinstance(r, AtsResult) else type(r) for r in results] == [5, RuntimeError, 11]
+    assert sorted(pipeline["jobs"]) == [("bad", "entities", None), ("much longer", "entities", {"id": "jd-1"}), ("short", "entities", None)]
+
+
+@pytest.mark.asyncio
+async def test_batch_jobs_coalesce_with_identical_single_requests(pipeline):
+    """A batch job and a concurrent atsScoring call for the same pair share one pipeline run."""
+    single, batch = await asyncio.gather(
+        ats_scoring.atsScoring.run(resumeText="resume", jobDescription="same job"),
+        ats_scoring.score_resume_against_jobs("resume", ["same job"]),
+    )
+    assert single.overallScore == batch[0].overallScore == 8
+    assert len(pipeline["jobs"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_fused_mode_matches_graph_mode_with_one_model_call(monkeypatch):
+    """Given the same model answers, fused mode returns the graph's AtsResult from a single model call."""
+    requirements = JobRequirements(requiredSkills=["Python", "SQL"], preferredSkills=["Kafka"], experienceLevel="Senior")
+    entities = ResumeEntities(skills=["Python"], experience=[{"title": "Engineer"}], education=[])
+    semantic = SemanticAnalysis(similarityScore=62, explanation="Partial overlap.")
+    placements = [KeywordPlacementSuggestion(keyword=k, suggested_location="Skills", example_sentence=f"Used {k}.") for k in ("SQL", "Kafka")]
+
+    class _Flow:
+        def __init__(self, value):
+            self.value = value
+
+        async def run(self, **kwargs):
+            return self.value
+
+    async def llm_semantic_analysis(resumeText, jobDescription):
+        return semantic
+
+    monkeypatch.setattr(ats_scoring, "ATS_SEMANTIC_MODE", "llm")
+    monkeypatch.setattr(ats_scoring, "extractJobRequirements", _Flow(requirements))
+    monkeypatch.setattr(ats_scoring, "extractResumeEntities", _Flow(entities))
+    monkeypatch.setattr(ats_scoring, "_llm_semantic_analysis", llm_semantic_analysis)
+    monkeypatch.setattr(ats_scoring, "suggestKeywordPlacement", _Flow(type("Placement", (), {"suggestions": placements})()))
+    graph = await ats_scoring._run_ats_pipeline("Python engineer", "Senior data role", mode="graph")
+
+    fused_answer = FusedAtsAnalysis(
+        jobRequirements=requirements, resumeEntities=entities, semanticAnalysis=semantic,
+        # A suggestion for a skill the resume has is dropped, as graph mode never asks for one
+        keywordPlacementSuggestions=placements + [KeywordPlacementSuggestion(keyword="Python", suggested_location="Skills", example_sentence="")],
+    )
+    prompts = []
+
+    async def generate(prompt, **kwargs):
+        prompts.append(prompt)
+        return type("Response", (), {"output": lambda self: fused_answer})()
+
+    monkeypatch.setattr(ats_scoring.model_gateway, "generate", generate)
+    fused = await ats_scoring._run_ats_pipeline("Python engineer", "Senior data role", mode="fused")
+
+    assert len(prompts) == 1
+    assert fused == graph
+    assert fused.missingKeywords == ["SQL", "Kafka"] and fused.keyword_placement_suggestions == placements
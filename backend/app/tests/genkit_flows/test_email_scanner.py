@@ -0,0 +1,133 @@
+import pytest
+
+from app.core import db as db_module
+from app.genkit_flows import email_scanner
+from benchmarks.fakes import FakeFirestore, FakeGmailService
+
+
+class _FlowStub:
+    def __init__(self, fn):
+        self.fn = fn
+        self.calls = []
+
+    async def run(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        return self.fn(*args, **kwargs)
+
+
+@pytest.fixture
+def scan(monkeypatch):
+    """Runs scans against an in-memory Firestore and inbox, counting batched writes."""
+    firestore = FakeFirestore()
+    firestore.collection("users").document("u1").set({"email": "u1@example.com"})
+    monkeypatch.setattr(db_module.db, "_client", firestore)
+    commits = []
+    new_batch = firestore.batch
+
+    def batch():
+        write_batch = new_batch()
+        commit = write_batch.commit
+        write_batch.commit = lambda: commits.append(len(write_batch._writes)) or commit()
+        return write_batch
+
+    monkeypatch.setattr(firestore, "batch", batch)
+    inbox = FakeGmailService({f"m{i}": f"Job ad {i}" for i in range(3)})
+    monkeypatch.setattr(email_scanner, "get_gmail_service", lambda user_id: inbox)
+    monkeypatch.setattr(email_scanner, "extract_job_details_from_email", _FlowStub(
+        lambda body: {"title": "Engineer", "company": "Acme", "deadline": "2025-01-31" if body.endswith("0") else None}
+    ))
+    monkeypatch.setattr(email_scanner.job_registry, "resolve", _async(lambda user_id, text: {"id": "jd-1"}))
+    calendar = _FlowStub(lambda user_id, details, save_event_id=True: f"event-{details['id'][:6]}")
+    monkeypatch.setattr(email_scanner, "createCalendarEvent", calendar)
+    monkeypatch.setattr(email_scanner, "sendNewOpportunityNotification", _FlowStub(lambda user, details: None))
+    return firestore, inbox, commits, calendar
+
+
+class _FailingBatch:
+    def set(self, ref, data):
+        pass
+
+    def update(self, ref, data):
+        pass
+
+    def commit(self):
+        raise RuntimeError("Firestore unavailable")
+
+
+def _async(fn):
+    async def wrapper(*args, **kwargs):
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def _opportunities(firestore):
+    return {s.id: s.to_dict() for s in firestore.collection("users").document("u1").collection("opportunities").stream()}
+
+
+@pytest.mark.asyncio
+async def test_scan_saves_opportunities_then_links_calendar_events(scan):
+    """Opportunities are saved in one batched write and their event IDs recorded in another; all messages are marked read."""
+    firestore, inbox, commits, calendar = scan
+    saved = await email_scanner.scanUserEmails.run("u1")
+
+    assert commits == [3, 1]
+    assert len(saved) == 3 and not inbox.unread
+    opportunities = _opportunities(firestore)
+    first = opportunities[email_scanner.opportunity_id("u1", "m0")]
+    assert first["calendar_event_id"].startswith("event-") and first["message_id"] == "m0"
+    assert all(kwargs == {"save_event_id": False} for _, kwargs in calendar.calls)
+
+
+@pytest.mark.asyncio
+async def test_rescan_is_idempotent(scan):
+    """Messages whose opportunities were already saved are not extracted or written again."""
+    firestore, inbox, commits, calendar = scan
+    await email_scanner.scanUserEmails.run("u1")
+    inbox.unread = set(inbox.inbox)
+    extracted = len(email_scanner.extract_job_details_from_email.calls)
+
+    assert await email_scanner.scanUserEmails.run("u1") == []
+    assert len(email_scanner.extract_job_details_from_email.calls) == extracted
+    assert commits == [3, 1] and len(_opportunities(firestore)) == 3 and not inbox.unread
+    assert len(calendar.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_per_item(scan, monkeypatch):
+    """When the batched write fails, each opportunity is retried on its own."""
+    firestore, inbox, _, _ = scan
+    monkeypatch.setattr(email_scanner, "EMAIL_SCAN_RETRY_DELAY_SECONDS", 0)
+    monkeypatch.setattr(firestore, "batch", lambda: _FailingBatch())
+
+    saved = await email_scanner.scanUserEmails.run("u1")
+    assert len(saved) == 3 and len(_opportunities(firestore)) == 3 and not inbox.unread
+
+
+@pytest.mark.asyncio
+async def test_no_calendar_event_for_an_unsaved_opportunity(scan, monkeypatch):
+    """An opportunity that could not be saved gets no calendar event and its message stays unread."""
+    firestore, inbox, commits, calendar = scan
+    monkeypatch.setattr(email_scanner, "_save_opportunities", lambda user_ref, documents: [
+        opp_id for opp_id in documents if opp_id != email_scanner.opportunity_id("u1", "m0")
+    ])
+
+    saved = await email_scanner.scanUserEmails.run("u1")
+    assert len(saved) == 2 and calendar.calls == [] and commits == []
+    assert inbox.unread == {"m0"}
+
+
+@pytest.mark.asyncio
+async def test_failed_extraction_only_drops_its_message(scan, monkeypatch):
+    """A model error on one message leaves it unread; the other opportunities are still saved."""
+    firestore, inbox, _, _ = scan
+
+    def extract(body):
+        if body.endswith("1"):
+            raise TimeoutError("model timed out")
+        return {"title": "Engineer", "company": "Acme"}
+
+    monkeypatch.setattr(email_scanner, "extract_job_details_from_email", _FlowStub(extract))
+
+    saved = await email_scanner.scanUserEmails.run("u1")
+    assert len(saved) == 2 and len(_opportunities(firestore)) == 2
+    assert inbox.unread == {"m1"}
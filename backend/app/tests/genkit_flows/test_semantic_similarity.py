@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from app.genkit_flows.semantic_similarity import HashedNgramBackend, get_embedding_backend, local_semantic_similarity
+
+RESUME = "Data engineer who built Airflow pipelines in Python and SQL, loading BigQuery for the analytics team."
+JOB = "We need a data engineer to build Python and SQL pipelines with Airflow and BigQuery."
+UNRELATED = "Registered nurse caring for patients on night shifts in a busy emergency department."
+
+
+def test_hashed_ngram_vectors_are_normalized_and_empty_text_is_zero():
+    """Each text becomes an L2-normalized vector; text with only stopwords embeds to zeros."""
+    vectors = HashedNgramBackend(dimensions=1024).embed([RESUME, "the and of", ""])
+    assert vectors.shape == (3, 1024)
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[1].any() and not vectors[2].any()
+
+
+def test_local_similarity_ranks_related_texts_higher_and_explains_shared_terms():
+    """Identical texts score 100, a matching resume beats an unrelated one, and the explanation names shared terms."""
+    assert local_semantic_similarity(JOB, JOB)[0] == 100
+
+    related, explanation = local_semantic_similarity(RESUME, JOB)
+    unrelated, unrelated_explanation = local_semantic_similarity(UNRELATED, JOB)
+    assert related > unrelated
+    assert unrelated == 0 and "little overlap" in unrelated_explanation
+    assert "python" in explanation and "pipeline" in explanation
+
+
+def test_unknown_embedding_backend_is_rejected():
+    """Only registered backends can be selected."""
+    with pytest.raises(ValueError):
+        get_embedding_backend("missing")
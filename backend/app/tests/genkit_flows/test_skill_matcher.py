@@ -0,0 +1,52 @@
+from app.genkit_flows.skill_matcher import SkillIndex, TokenMatcher, match_skills, skill_index
+
+
+def test_aliases_map_to_the_same_canonical_skill():
+    """Common abbreviations and spellings resolve to one canonical skill."""
+    assert skill_index.canonicalize("JS") == skill_index.canonicalize("JavaScript")
+    assert skill_index.canonicalize("Postgres") == skill_index.canonicalize("PostgreSQL")
+    assert skill_index.canonicalize("REST API") == skill_index.canonicalize("RESTful APIs")
+    assert skill_index.canonicalize("Terraform") == "terraform"
+
+
+def test_match_skills_uses_aliases_and_resume_text():
+    """Skills match through aliases in the skill list and phrases in the text."""
+    resume_text = "Trained machine learning models and deployed them on K8s."
+    result = match_skills(
+        ["JavaScript", "PostgreSQL", "Machine Learning", "Kubernetes", "Terraform"],
+        ["JS", "Postgres"],
+        resume_text,
+    )
+
+    assert result["matched"] == ["JavaScript", "PostgreSQL", "Machine Learning", "Kubernetes"]
+    assert result["missing"] == ["Terraform"]
+    start, end = result["positions"]["Machine Learning"][0]
+    assert resume_text[start:end] == "machine learning"
+
+
+def test_related_skills_are_not_aliases():
+    """A broader concept or a related framework does not count as the skill itself."""
+    assert match_skills(["Docker"], ["Containerization"], "Experience with containerization.")["missing"] == ["Docker"]
+    assert skill_index.canonicalize("ASP.NET") != skill_index.canonicalize(".NET")
+
+
+def test_ambiguous_single_words_do_not_match_free_text():
+    """Words like "go" only count when they appear in the extracted skill list."""
+    assert match_skills(["Go"], [], "Ready to go live.")["missing"] == ["Go"]
+    assert match_skills(["Go"], ["Golang"], "Ready to go live.")["matched"] == ["Go"]
+
+
+def test_token_matcher_finds_overlapping_patterns():
+    """The automaton reports every overlapping occurrence in one pass."""
+    matcher = TokenMatcher()
+    matcher.add(("a", "b", "c"), "abc")
+    matcher.add(("b", "c"), "bc")
+    matcher.add(("b", "d"), "bd")
+
+    assert list(matcher.find(["a", "b", "c", "b", "d"])) == [("abc", 0, 3), ("bc", 1, 3), ("bd", 3, 5)]
+
+
+def test_custom_taxonomy():
+    """A skill index can be built from a custom taxonomy."""
+    index = SkillIndex({"Bookkeeping": ["book keeping"]})
+    assert match_skills(["Bookkeeping"], ["Book-keeping"], index=index)["matched"] == ["Bookkeeping"]
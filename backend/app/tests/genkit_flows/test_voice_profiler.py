@@ -0,0 +1,104 @@
+import pytest
+
+from app.core import db as db_module
+from app.genkit_flows import voice_profiler
+from app.genkit_flows.voice_profiler import CHARS_PER_TOKEN, DocumentStyle, VoiceProfile
+from app.genkit_flows.voice_profiler import _estimate_tokens, _fit_to_budget, _merge_profiles, _pack_into_chunks
+from benchmarks.fakes import FakeFirestore
+
+
+@pytest.fixture
+def firestore(monkeypatch):
+    """An in-memory Firestore that records the documents read and the size of each committed batch."""
+    fake = FakeFirestore()
+    monkeypatch.setattr(db_module.db, "_client", fake)
+    fake.reads, fake.commits = [], []
+    get_all, new_batch = fake.get_all, fake.batch
+
+    def recording_get_all(references, field_paths=None):
+        references = list(references)
+        fake.reads += [ref.id for ref in references]
+        return get_all(references, field_paths)
+
+    def batch():
+        write_batch = new_batch()
+        commit = write_batch.commit
+        write_batch.commit = lambda: fake.commits.append(len(write_batch._writes)) or commit()
+        return write_batch
+
+    monkeypatch.setattr(fake, "get_all", recording_get_all)
+    monkeypatch.setattr(fake, "batch", batch)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_only_documents_within_the_budget_are_read_and_written_in_bounded_batches(firestore, monkeypatch):
+    """Text is read only for the sampled documents, empty ones count toward the cap, and writes are batched."""
+    docs_ref = firestore.collection("users").document("u1").collection("documents")
+    for i in range(12):
+        docs_ref.document(f"doc-{i:02}").set({"extractedText": "" if i % 4 == 1 else f"Resume text {i}. " * 50})
+    monkeypatch.setattr(voice_profiler, "VOICE_PROFILE_TOKEN_BUDGET", voice_profiler.VOICE_PROFILE_MIN_DOC_TOKENS * 4)
+    monkeypatch.setattr(voice_profiler, "FIRESTORE_MAX_BATCH_WRITES", 3)
+
+    async def extract_chunk_styles(chunk):
+        return [DocumentStyle(document_id=document_id, tone="direct", common_phrases=[], professional_vocabulary=[]) for document_id, _ in chunk]
+
+    monkeypatch.setattr(voice_profiler, "_extract_chunk_styles", extract_chunk_styles)
+    processed = await voice_profiler._summarize_documents("u1", [f"doc-{i:02}" for i in range(12)])
+
+    assert firestore.reads == ["doc-00", "doc-03", "doc-06", "doc-09"]
+    assert set(processed["update_times"]) == set(firestore.reads)
+    assert set(processed["summaries"]) == {"doc-00", "doc-03", "doc-06"}
+    assert firestore.commits == [3, 1]
+
+
+def _text(tokens):
+    return "x" * (tokens * CHARS_PER_TOKEN)
+
+
+def test_fit_to_budget_keeps_short_documents_whole_and_splits_the_rest(monkeypatch):
+    """Short documents are kept whole, long ones share what is left, and the total stays within budget."""
+    monkeypatch.setattr(voice_profiler, "VOICE_PROFILE_MIN_DOC_TOKENS", 100)
+    monkeypatch.setattr(voice_profiler, "VOICE_PROFILE_CHUNK_TOKENS", 10_000)
+    documents = [("long-1", _text(5000)), ("short", _text(200)), ("long-2", _text(5000))]
+
+    excerpts = dict(_fit_to_budget(documents, 3000))
+    assert excerpts["short"] == documents[1][1]
+    # The short document takes 201 estimated tokens; the long ones split the other 2799
+    assert sorted(len(excerpts[document_id]) // CHARS_PER_TOKEN for document_id in ("long-1", "long-2")) == [1399, 1400]
+    assert sum(_estimate_tokens(text) for text in excerpts.values()) <= 3000 + len(excerpts)
+
+
+def test_fit_to_budget_samples_evenly_and_caps_excerpts_at_one_chunk(monkeypatch):
+    """Past the budget's document cutoff an evenly spaced sample is kept, and no excerpt exceeds a chunk."""
+    monkeypatch.setattr(voice_profiler, "VOICE_PROFILE_MIN_DOC_TOKENS", 100)
+    monkeypatch.setattr(voice_profiler, "VOICE_PROFILE_CHUNK_TOKENS", 250)
+    documents = [(f"doc-{i}", _text(1000)) for i in range(10)]
+
+    excerpts = _fit_to_budget(documents, 500)
+    assert sorted(document_id for document_id, _ in excerpts) == ["doc-0", "doc-2", "doc-4", "doc-6", "doc-8"]
+    assert all(len(text) == 100 * CHARS_PER_TOKEN for _, text in excerpts)
+    assert [len(text) for _, text in _fit_to_budget(documents[:1], 5000)] == [250 * CHARS_PER_TOKEN]
+
+
+def test_pack_into_chunks_splits_at_the_chunk_boundary():
+    """Excerpts are packed in order, a chunk closes before it would overflow, and oversized excerpts get their own chunk."""
+    excerpts = [("a", _text(40)), ("b", _text(58)), ("c", _text(1)), ("d", _text(150)), ("e", _text(10))]
+
+    chunks = _pack_into_chunks(excerpts, 100)
+    assert [[document_id for document_id, _ in chunk] for chunk in chunks] == [["a", "b"], ["c"], ["d"], ["e"]]
+    assert _pack_into_chunks([], 100) == []
+
+
+def test_merge_profiles_ranks_by_document_count_and_keeps_first_spelling():
+    """The most common tone wins; phrases and terms are ranked case-insensitively and capped."""
+    profiles = [
+        VoiceProfile(tone="direct", common_phrases=["Drove outcomes", "team player"], professional_vocabulary=["Kubernetes"]),
+        VoiceProfile(tone="formal", common_phrases=["drove outcomes "], professional_vocabulary=["kubernetes", "SQL"]),
+        VoiceProfile(tone="direct", common_phrases=[" "], professional_vocabulary=[f"term-{i}" for i in range(20)]),
+    ]
+
+    merged = _merge_profiles(profiles)
+    assert merged.tone == "direct"
+    assert merged.common_phrases == ["Drove outcomes", "team player"]
+    assert merged.professional_vocabulary[0] == "Kubernetes" and len(merged.professional_vocabulary) == 15
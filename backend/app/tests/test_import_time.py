@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Cold import of app.main must stay under this many seconds (best of a few runs)
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "2.0"))
+
+# Modules that must only be imported when a route needs them
+HEAVY_MODULES = ["weasyprint", "pdfplumber", "docx", "googleapiclient.discovery", "sendgrid", "genkit", "app.genkit_flows", "app.api.v1.documents"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+def _cold_import() -> dict:
+    backend_dir = Path(__file__).resolve().parents[2]
+    result = subprocess.run([sys.executable, "-c", _PROBE], cwd=backend_dir, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_app_main_cold_import_stays_within_budget():
+    """Importing the app is fast and does not pull in the routers' heavy dependencies."""
+    runs = [_cold_import() for _ in range(3)]
+    best = min(run["seconds"] for run in runs)
+    assert best < IMPORT_TIME_BUDGET_SECONDS, f"Cold import of app.main took {best:.2f}s (budget {IMPORT_TIME_BUDGET_SECONDS}s)"
+
+    loaded = set(runs[0]["modules"])
+    assert not [m for m in HEAVY_MODULES if m in loaded]
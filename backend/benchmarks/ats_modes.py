@@ -0,0 +1,122 @@
+"""
+Compares the two ATS execution modes: the multi-call dependency graph and
+the single fused model call. Each mode scores the same resume/job pairs
+against the replay model backend; the report shows latency, model calls and
+prompt tokens per run, and how closely the fused scores agree with the graph
+scores. Agreement is only meaningful with fixtures recorded from the live
+model (MODEL_BACKEND=record); synthetic responses agree trivially. Run from
+the backend directory:
+
+    python -m benchmarks.ats_modes --requests 50 --concurrency 5 --pairs pairs.json
+
+`--pairs` takes a JSON list of {"resume": ..., "job_description": ...}
+objects; by default the built-in sample pair is used.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Imported first: it configures the app for offline runs
+from .flows import JOB_DESCRIPTION, RESUME, _print_report, run_scenario, synthetic_fixture
+
+from app.core import model_gateway, model_routing
+from app.core.metrics import CHARS_PER_TOKEN
+from app.core.model_backends import FixtureStore, ReplayModel
+from app.genkit_flows.ats_scoring import AtsResult, _run_ats_pipeline
+
+MODES = ("graph", "fused")
+
+
+class CountingModel:
+    """Counts the calls and prompt tokens that reach the wrapped model."""
+
+    def __init__(self, model: Any):
+        self.model = model
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    def _count(self, prompt: str) -> None:
+        self.calls += 1
+        self.prompt_tokens += len(prompt) // CHARS_PER_TOKEN
+
+    async def generate(self, prompt: str, **kwargs) -> Any:
+        self._count(prompt)
+        return await self.model.generate(prompt=prompt, **kwargs)
+
+    async def generate_stream(self, prompt: str, **kwargs) -> Any:
+        self._count(prompt)
+        return await self.model.generate_stream(prompt=prompt, **kwargs)
+
+
+def _load_pairs(path: Optional[str]) -> List[Tuple[str, str]]:
+    if not path:
+        return [(RESUME, JOB_DESCRIPTION)]
+    return [(p["resume"], p["job_description"]) for p in json.loads(Path(path).read_text(encoding="utf-8"))]
+
+
+def _jaccard(a: List[str], b: List[str]) -> float:
+    a, b = {k.casefold() for k in a}, {k.casefold() for k in b}
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def _agreement(reference: List[AtsResult], candidate: List[AtsResult]) -> Dict[str, float]:
+    """How closely the candidate mode reproduces the reference mode's results."""
+    return {
+        "overall_score_mae": statistics.mean(abs(r.overallScore - c.overallScore) for r, c in zip(reference, candidate)),
+        "semantic_score_mae": statistics.mean(abs(r.breakdown.semanticScore - c.breakdown.semanticScore) for r, c in zip(reference, candidate)),
+        "matched_keywords_jaccard": statistics.mean(_jaccard(r.matchedKeywords, c.matchedKeywords) for r, c in zip(reference, candidate)),
+        "missing_keywords_jaccard": statistics.mean(_jaccard(r.missingKeywords, c.missingKeywords) for r, c in zip(reference, candidate)),
+    }
+
+
+async def main(args: argparse.Namespace) -> dict:
+    strong = CountingModel(ReplayModel(FixtureStore(), latency_ms=args.model_latency_ms, jitter_ms=args.model_latency_ms * 0.25, fallback=synthetic_fixture))
+    fast = CountingModel(ReplayModel(FixtureStore(), latency_ms=args.fast_model_latency_ms, jitter_ms=args.fast_model_latency_ms * 0.25, fallback=synthetic_fixture))
+    model_gateway.default_model = strong
+    model_routing.fast_model = fast
+
+    pairs = _load_pairs(args.pairs)
+    reports, scored = [], {}
+    for mode in MODES:
+        # One pass over the pairs for the call counts and the agreement check
+        calls, tokens = strong.calls + fast.calls, strong.prompt_tokens + fast.prompt_tokens
+        scored[mode] = [await _run_ats_pipeline(resume, job, mode=mode) for resume, job in pairs]
+        calls = (strong.calls + fast.calls - calls) / len(pairs)
+        tokens = (strong.prompt_tokens + fast.prompt_tokens - tokens) / len(pairs)
+
+        async def run(i: int, mode: str = mode) -> None:
+            resume, job = pairs[i % len(pairs)]
+            await _run_ats_pipeline(resume, job, mode=mode)
+
+        report = await run_scenario(mode, run, args.requests, args.concurrency)
+        report.update(model_calls_per_run=calls, prompt_tokens_per_run=tokens)
+        reports.append(report)
+
+    return {"modes": reports, "agreement": _agreement(scored["graph"], scored["fused"])}
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--model-latency-ms", type=float, default=float(os.getenv("MODEL_REPLAY_LATENCY_MS", "500")))
+    parser.add_argument("--fast-model-latency-ms", type=float, default=float(os.getenv("MODEL_REPLAY_FAST_LATENCY_MS", "200")))
+    parser.add_argument("--pairs", help="JSON file with the resume/job pairs to score")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = _parse_args()
+    result = asyncio.run(main(arguments))
+    if arguments.json:
+        print(json.dumps(result, indent=2))
+    else:
+        _print_report(result["modes"])
+        for report in result["modes"]:
+            print(f"{report['scenario']:<10} {report['model_calls_per_run']:.1f} model calls/run, {report['prompt_tokens_per_run']:.0f} prompt tokens/run")
+        print("fused vs graph: " + ", ".join(f"{k}={v:.3f}" for k, v in result["agreement"].items()))
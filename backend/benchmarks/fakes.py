@@ -0,0 +1,254 @@
+"""
+In-memory stand-ins for Firestore and the Gmail API, covering the subset of
+the client APIs the flows use. Each call can sleep for a configurable time
+to approximate network round-trips.
+"""
+import base64
+import time
+import uuid
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference: "FakeDocumentReference", data: Optional[dict], update_time: Optional[datetime]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.update_time = update_time
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[dict]:
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        value = self._data
+        for part in field.split("."):
+            value = (value or {}).get(part)
+        return value
+
+
+class FakeWriteResult:
+    def __init__(self, update_time: datetime):
+        self.update_time = update_time
+
+
+class FakeDocumentReference:
+    def __init__(self, client: "FakeFirestore", path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name: str) -> "FakeCollectionReference":
+        return FakeCollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths: Optional[Iterable[str]] = None) -> FakeDocumentSnapshot:
+        self._client._round_trip()
+        data, update_time = self._client._read(self.path)
+        return FakeDocumentSnapshot(self, data, update_time)
+
+    def set(self, data: dict, merge: Any = False) -> FakeWriteResult:
+        self._client._round_trip()
+        return self._client._write(self.path, data, merge=bool(merge))
+
+    def create(self, data: dict) -> FakeWriteResult:
+        self._client._round_trip()
+        return self._client._write(self.path, data, must_not_exist=True)
+
+    def update(self, data: dict) -> FakeWriteResult:
+        self._client._round_trip()
+        return self._client._write(self.path, data, merge=True, must_exist=True)
+
+    def delete(self) -> None:
+        self._client._round_trip()
+        self._client._delete(self.path)
+
+
+class FakeQuery:
+    def __init__(self, collection: "FakeCollectionReference", filters: List[Tuple[str, str, Any]] = None, limit: Optional[int] = None):
+        self._collection = collection
+        self._filters = filters or []
+        self._limit = limit
+
+    def where(self, field: str, op: str, value: Any) -> "FakeQuery":
+        return FakeQuery(self._collection, self._filters + [(field, op, value)], self._limit)
+
+    def limit(self, count: int) -> "FakeQuery":
+        return FakeQuery(self._collection, self._filters, count)
+
+    def select(self, field_paths: Iterable[str]) -> "FakeQuery":
+        return self
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "FakeQuery":
+        return self
+
+    def _matches(self, snapshot: FakeDocumentSnapshot) -> bool:
+        for field, op, value in self._filters:
+            actual = snapshot.get(field)
+            if op == "==" and actual != value:
+                return False
+            if op == "array_contains" and value not in (actual or []):
+                return False
+            if op == "array_contains_any" and not set(value) & set(actual or []):
+                return False
+        return True
+
+    def stream(self) -> Iterable[FakeDocumentSnapshot]:
+        self._collection._client._round_trip()
+        matches = [s for s in self._collection._snapshots() if self._matches(s)]
+        return iter(matches[:self._limit] if self._limit is not None else matches)
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client: "FakeFirestore", path: str):
+        self._client = client
+        self.path = path
+        super().__init__(self)
+
+    def document(self, document_id: Optional[str] = None) -> FakeDocumentReference:
+        return FakeDocumentReference(self._client, f"{self.path}/{document_id or uuid.uuid4().hex}")
+
+    def add(self, data: dict) -> Tuple[datetime, FakeDocumentReference]:
+        ref = self.document()
+        result = ref.set(data)
+        return result.update_time, ref
+
+    def _snapshots(self) -> List[FakeDocumentSnapshot]:
+        prefix = self.path + "/"
+        with self._client._lock:
+            paths = [p for p in self._client._documents if p.startswith(prefix) and "/" not in p[len(prefix):]]
+        return [FakeDocumentSnapshot(self.document(p[len(prefix):]), *self._client._read(p)) for p in paths]
+
+
+class FakeWriteBatch:
+    def __init__(self, client: "FakeFirestore"):
+        self._client = client
+        self._writes = []
+
+    def set(self, ref: FakeDocumentReference, data: dict, merge: Any = False) -> None:
+        self._writes.append((ref, data, bool(merge), False))
+
+    def update(self, ref: FakeDocumentReference, data: dict) -> None:
+        self._writes.append((ref, data, True, True))
+
+    def commit(self) -> List[FakeWriteResult]:
+        self._client._round_trip()
+        return [self._client._write(ref.path, data, merge=merge, must_exist=must_exist) for ref, data, merge, must_exist in self._writes]
+
+
+class FakeFirestore:
+    """A thread-safe in-memory Firestore client."""
+
+    def __init__(self, latency_ms: float = 0):
+        self.latency_ms = latency_ms
+        self._documents: Dict[str, Tuple[dict, datetime]] = {}
+        self._lock = Lock()
+
+    def _round_trip(self) -> None:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def _read(self, path: str) -> Tuple[Optional[dict], Optional[datetime]]:
+        with self._lock:
+            data, update_time = self._documents.get(path, (None, None))
+        return (dict(data) if data is not None else None), update_time
+
+    def _write(self, path: str, data: dict, merge: bool = False, must_exist: bool = False, must_not_exist: bool = False) -> FakeWriteResult:
+        with self._lock:
+            existing = self._documents.get(path)
+            if must_not_exist and existing is not None:
+                raise AlreadyExists(f"Document {path} already exists.")
+            if must_exist and existing is None:
+                raise NotFound(f"Document {path} not found.")
+            document = dict(existing[0]) if merge and existing is not None else {}
+            for field, value in data.items():
+                target = document
+                *parents, leaf = field.split(".")
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[leaf] = value
+            update_time = datetime.now(timezone.utc)
+            self._documents[path] = (document, update_time)
+        return FakeWriteResult(update_time)
+
+    def _delete(self, path: str) -> None:
+        with self._lock:
+            self._documents.pop(path, None)
+
+    def collection(self, name: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, name)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def get_all(self, references: Iterable[FakeDocumentReference], field_paths: Optional[Iterable[str]] = None) -> Iterable[FakeDocumentSnapshot]:
+        self._round_trip()
+        return iter([FakeDocumentSnapshot(ref, *self._read(ref.path)) for ref in references])
+
+
+class _Request:
+    def __init__(self, service: "FakeGmailService", result: Any):
+        self._service = service
+        self._result = result
+
+    def execute(self) -> Any:
+        self._service._round_trip()
+        return self._result() if callable(self._result) else self._result
+
+
+class _BatchHttpRequest:
+    def __init__(self, service: "FakeGmailService", callback: Any):
+        self._service = service
+        self._callback = callback
+        self._requests: List[Tuple[str, _Request]] = []
+
+    def add(self, request: _Request, request_id: Optional[str] = None) -> None:
+        self._requests.append((request_id or str(len(self._requests)), request))
+
+    def execute(self) -> None:
+        # One round-trip for the whole batch
+        self._service._round_trip()
+        for request_id, request in self._requests:
+            result = request._result
+            self._callback(request_id, result() if callable(result) else result, None)
+
+
+class FakeGmailService:
+    """Serves a fixed inbox through `users().messages()` list/get/modify/batchModify and batch HTTP requests."""
+
+    def __init__(self, messages: Dict[str, str], latency_ms: float = 0):
+        self.inbox = messages
+        self.latency_ms = latency_ms
+        self.unread = set(messages)
+
+    def _round_trip(self) -> None:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def users(self) -> "FakeGmailService":
+        return self
+
+    def messages(self) -> "FakeGmailService":
+        return self
+
+    def list(self, userId: str, q: str = "", maxResults: int = 100) -> _Request:
+        return _Request(self, lambda: {"messages": [{"id": i} for i in sorted(self.unread)[:maxResults]]})
+
+    def get(self, userId: str, id: str, format: str = "full") -> _Request:
+        data = base64.urlsafe_b64encode(self.inbox[id].encode("utf-8")).decode("ascii")
+        return _Request(self, {"id": id, "payload": {"parts": [{"mimeType": "text/plain", "body": {"data": data}}]}})
+
+    def modify(self, userId: str, id: str, body: dict) -> _Request:
+        return _Request(self, lambda: self.unread.discard(id) or {})
+
+    def batchModify(self, userId: str, body: dict) -> _Request:
+        return _Request(self, lambda: self.unread.difference_update(body.get("ids", [])) or {})
+
+    def new_batch_http_request(self, callback: Any = None) -> _BatchHttpRequest:
+        return _BatchHttpRequest(self, callback)
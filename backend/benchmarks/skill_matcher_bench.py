@@ -0,0 +1,54 @@
+"""
+Micro-benchmark for ATS keyword matching.
+
+Compares the original nested lowercase scan against the precompiled skill
+index for growing skill lists. Run from the backend directory:
+
+    python -m benchmarks.skill_matcher_bench
+"""
+import random
+import time
+
+from app.genkit_flows.skill_matcher import SKILL_TAXONOMY, match_skills
+
+SIZES = [10, 100, 1000, 5000]
+REPEAT = 5
+
+
+def _naive_match(job_skills, resume_skills):
+    """The keyword matching previously used by `_calculate_keyword_score`."""
+    matched = [skill for skill in job_skills if skill.lower() in (s.lower() for s in resume_skills)]
+    missing = [skill for skill in job_skills if skill.lower() not in (s.lower() for s in resume_skills)]
+    return matched, missing
+
+
+def _make_skills(count: int, rng: random.Random):
+    known = [term for canonical, aliases in SKILL_TAXONOMY.items() for term in [canonical, *aliases]]
+    return [rng.choice(known) if rng.random() < 0.5 else f"skill {rng.randrange(count * 10)}" for _ in range(count)]
+
+
+def _best_of(fn) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'skills':>8} {'naive (ms)':>12} {'index (ms)':>12} {'index skills/s':>16}")
+    for size in SIZES:
+        job_skills = _make_skills(size, rng)
+        resume_skills = _make_skills(size, rng)
+        resume_text = " ".join(_make_skills(size * 5, rng))
+
+        naive = _best_of(lambda: _naive_match(job_skills, resume_skills))
+        indexed = _best_of(lambda: match_skills(job_skills, resume_skills, resume_text))
+        throughput = (len(job_skills) + len(resume_skills)) / indexed
+        print(f"{size:>8} {naive * 1000:>12.2f} {indexed * 1000:>12.2f} {throughput:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
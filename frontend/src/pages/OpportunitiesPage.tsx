@@ -9,21 +9,28 @@ const CalendarIcon = () => (
     </svg>
 );
 
+// Only the fields the cards show are fetched
+const LIST_FIELDS = 'title,company,deadline,source_url,calendar_event_id';
+
 const OpportunitiesPage: React.FC = () => {
     const [opportunities, setOpportunities] = useState<any[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [loading, setLoading] = useState<boolean>(true);
     const [error, setError] = useState<string | null>(null);
 
-    const fetchOpportunities = async (user: User) => {
+    const fetchOpportunities = async (user: User, cursor: string | null = null) => {
         try {
             setLoading(true);
             const token = await user.getIdToken();
-            const response = await fetch('/api/v1/opportunities', {
+            const params = new URLSearchParams({ fields: LIST_FIELDS });
+            if (cursor) params.set('cursor', cursor);
+            const response = await fetch(`/api/v1/opportunities/?${params}`, {
                 headers: { 'Authorization': `Bearer ${token}` },
             });
             if (!response.ok) throw new Error('Failed to fetch opportunities');
             const data = await response.json();
-            setOpportunities(data);
+            setOpportunities((previous) => cursor ? [...previous, ...data.items] : data.items);
+            setNextCursor(data.nextCursor);
         } catch (err: any) {
             setError(err.message);
         } finally {
@@ -31,6 +38,11 @@ const OpportunitiesPage: React.FC = () => {
         }
     };
 
+    const loadMore = () => {
+        const user = getAuth().currentUser;
+        if (user && nextCursor) fetchOpportunities(user, nextCursor);
+    };
+
     useEffect(() => {
         const auth = getAuth();
         const unsubscribe = onAuthStateChanged(auth, (user) => {
@@ -45,7 +57,7 @@ const OpportunitiesPage: React.FC = () => {
     }, []);
 
     const renderContent = () => {
-        if (loading) return <div className="p-4 text-center">Loading opportunities...</div>;
+        if (loading && opportunities.length === 0) return <div className="p-4 text-center">Loading opportunities...</div>;
         if (error) return <div className="p-4 text-center text-red-500">{error}</div>;
         if (opportunities.length === 0) {
             return (
@@ -55,6 +67,7 @@ const OpportunitiesPage: React.FC = () => {
             );
         }
         return (
+            <>
             <div className="grid gap-6 md:grid-cols-2 lg:grid-cols-3">
                 {opportunities.map((opp) => (
                     <div key={opp.id} className="bg-white shadow-md rounded-lg p-6 flex flex-col justify-between">
@@ -67,7 +80,7 @@ const OpportunitiesPage: React.FC = () => {
                              <a href={opp.source_url} target="_blank" rel="noopener noreferrer" className="text-blue-500 hover:text-blue-700 font-semibold">
                                 View Application
                             </a>
-                            {opp.calendarEventId && (
+                            {opp.calendar_event_id && (
                                 <div className="relative group flex items-center">
                                     <CalendarIcon />
                                     <span className="absolute bottom-full mb-2 w-max px-2 py-1 bg-gray-800 text-white text-xs rounded opacity-0 group-hover:opacity-100 transition-opacity">
@@ -79,6 +92,14 @@ const OpportunitiesPage: React.FC = () => {
                     </div>
                 ))}
             </div>
+            {nextCursor && (
+                <div className="mt-6 text-center">
+                    <button onClick={loadMore} disabled={loading} className="px-4 py-2 bg-blue-500 text-white rounded hover:bg-blue-600 disabled:opacity-50">
+                        {loading ? 'Loading...' : 'Load more'}
+                    </button>
+                </div>
+            )}
+            </>
         );
     }
 